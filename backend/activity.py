@@ -0,0 +1,46 @@
+"""
+Batched ingestion of user activity (page views, actions) into
+``user_activity_tracking``.
+
+Clients send arrays of events per request - a JSON array, or NDJSON with one
+event per line - and get 202 as soon as the batch is validated and queued.
+Documents reach MongoDB through ``activity_writer``, which flushes with
+unordered ``insert_many``. Activity is telemetry: when the queue is full
+new events are dropped and counted rather than spilled to disk.
+"""
+import os
+
+from batch_writer import BatchWriter
+from database import db
+
+ACTIVITY_QUEUE_MAX_SIZE = int(os.getenv("ACTIVITY_QUEUE_MAX_SIZE", "100000"))
+ACTIVITY_BATCH_SIZE = int(os.getenv("ACTIVITY_BATCH_SIZE", "1000"))
+ACTIVITY_FLUSH_INTERVAL_SECONDS = float(os.getenv("ACTIVITY_FLUSH_INTERVAL_SECONDS", "0.5"))
+ACTIVITY_SPILL_PATH = os.getenv(
+    "ACTIVITY_SPILL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "activity_spill.jsonl")
+)
+ACTIVITY_MAX_EVENTS_PER_REQUEST = int(os.getenv("ACTIVITY_MAX_EVENTS_PER_REQUEST", "1000"))
+ACTIVITY_MAX_BODY_BYTES = int(os.getenv("ACTIVITY_MAX_BODY_BYTES", str(1024 * 1024)))
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+
+def as_json_array(body: bytes, content_type: str = "") -> bytes:
+    """Normalize a request body to a JSON array so the whole batch is validated in one call.
+
+    JSON arrays pass through; NDJSON bodies (and anything that does not start
+    with ``[``, e.g. a beacon sent as text/plain) have their non-blank lines
+    joined into an array.
+    """
+    body = body.strip()
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type not in NDJSON_CONTENT_TYPES and body.startswith(b"["):
+        return body
+    return b"[" + b",".join(line for line in (line.strip() for line in body.splitlines()) if line) + b"]"
+
+
+activity_writer = BatchWriter(
+    db.user_activity_tracking, "User activity", ACTIVITY_SPILL_PATH,
+    max_queue_size=ACTIVITY_QUEUE_MAX_SIZE, batch_size=ACTIVITY_BATCH_SIZE,
+    flush_interval=ACTIVITY_FLUSH_INTERVAL_SECONDS, overflow="drop"
+)
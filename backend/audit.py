@@ -0,0 +1,94 @@
+"""
+Asynchronous, batched audit-log writer.
+
+Route handlers enqueue audit entries instead of inserting them inline; see
+``batch_writer.BatchWriter``. Entries that arrive while the queue is full are
+spilled to disk rather than dropped, so no audit entry is lost because of a
+burst or a database outage.
+
+Each entry is risk-scored when it is written (``assess_risk``) so compliance
+summaries can aggregate ``risk_level`` straight from an index. Entries
+written before scoring existed are scored in place with the equivalent
+aggregation expression:
+
+Usage:
+    python audit.py backfill-risk
+"""
+import asyncio
+import os
+import sys
+from typing import Any, Dict, List
+
+from batch_writer import BatchWriter
+from database import db
+
+AUDIT_QUEUE_MAX_SIZE = int(os.getenv("AUDIT_QUEUE_MAX_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "1.0"))
+AUDIT_SPILL_PATH = os.getenv(
+    "AUDIT_SPILL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "audit_spill.jsonl")
+)
+AUDIT_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("AUDIT_SHUTDOWN_TIMEOUT_SECONDS", "10"))
+
+audit_writer = BatchWriter(
+    db.audit_logs, "Audit log", AUDIT_SPILL_PATH,
+    max_queue_size=AUDIT_QUEUE_MAX_SIZE, batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL_SECONDS,
+    shutdown_timeout=AUDIT_SHUTDOWN_TIMEOUT_SECONDS, overflow="spill"
+)
+
+# Risk scoring
+HIGH_RISK_ACTIONS = ("delete", "update_sensitive", "export_data")
+SENSITIVE_RESOURCES = ("member", "admin_user", "audit_log")
+MAX_RISK_SCORE = 5
+
+
+def _risk_level(points: int) -> str:
+    return "low" if points <= 1 else "medium" if points <= 3 else "high"
+
+
+def assess_risk(action: str, resource: str, details: Dict[str, Any]) -> Dict[str, Any]:
+    """risk_score (0-5) and risk_level for one audit entry"""
+    points = 0
+    if action in HIGH_RISK_ACTIONS:
+        points += 3
+    if resource in SENSITIVE_RESOURCES:
+        points += 2
+    if (details or {}).get("bulk_operation"):
+        points += 2
+    return {"risk_score": min(points, MAX_RISK_SCORE), "risk_level": _risk_level(points)}
+
+
+def risk_fields_expression() -> Dict[str, Any]:
+    """``assess_risk`` as aggregation expressions, for pipeline updates over stored entries"""
+    points = {"$add": [
+        {"$cond": [{"$in": ["$action", list(HIGH_RISK_ACTIONS)]}, 3, 0]},
+        {"$cond": [{"$in": ["$resource", list(SENSITIVE_RESOURCES)]}, 2, 0]},
+        {"$cond": [{"$ifNull": ["$details.bulk_operation", False]}, 2, 0]},
+    ]}
+    return {
+        "risk_score": {"$min": [points, MAX_RISK_SCORE]},
+        "risk_level": {"$switch": {
+            "branches": [{"case": {"$lte": [points, 1]}, "then": "low"}, {"case": {"$lte": [points, 3]}, "then": "medium"}],
+            "default": "high",
+        }},
+    }
+
+
+async def backfill_risk(database=db) -> int:
+    """Score entries written before risk was stored at write time; returns the number updated"""
+    result = await database.audit_logs.update_many(
+        {"risk_level": {"$exists": False}}, [{"$set": risk_fields_expression()}]
+    )
+    return result.modified_count
+
+
+async def _main(argv: List[str]) -> int:
+    if not argv or argv[0] != "backfill-risk":
+        print(__doc__)
+        return 2
+    print(f"audit_logs: {await backfill_risk(db)} entries scored")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,174 @@
+"""
+Per-request authorization state kept in memory.
+
+``verify_token`` runs on every authenticated request, so everything it needs
+is a dictionary lookup:
+
+* a bounded LRU of already-verified JWTs keyed by the SHA-256 of the token,
+  evicted once the token's ``exp`` passes;
+* a revocation list of token ids (``jti``), persisted in MongoDB so logouts
+  survive restarts and reach every worker;
+* role bitmasks for route guards (authorization is by role; the
+  ``permissions`` arrays on ``admin_users`` are only reported to the client);
+* the profile returned by ``/api/auth/me``, captured at login.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from database import db
+
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "30"))
+
+REVOKED_TOKENS_COLLECTION = "revoked_tokens"
+
+# Role guards
+ROLES = ("SuperAdmin", "GeneralAdmin", "Manager", "Supervisor")
+ROLE_BITS: Dict[str, int] = {role: 1 << index for index, role in enumerate(ROLES)}
+
+
+def role_mask(*roles: str) -> int:
+    mask = 0
+    for role in roles:
+        mask |= ROLE_BITS[role]
+    return mask
+
+
+SUPERADMIN_ROLES = role_mask("SuperAdmin")
+ADMIN_ROLES = role_mask("SuperAdmin", "GeneralAdmin")
+MANAGEMENT_ROLES = role_mask("SuperAdmin", "GeneralAdmin", "Manager")
+FLOOR_ROLES = role_mask("SuperAdmin", "GeneralAdmin", "Manager", "Supervisor")
+
+
+def role_allowed(token_payload: Dict[str, Any], mask: int) -> bool:
+    """True if the caller's role is one of the roles in ``mask``"""
+    return bool(ROLE_BITS.get(token_payload.get("role"), 0) & mask)
+
+
+def token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+class VerifiedTokenCache:
+    """LRU of decoded JWT payloads keyed by token hash; entries die with the token"""
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = token_key(token)
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None or payload.get("exp", 0) <= time.time():
+                if payload is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def set(self, token: str, payload: Dict[str, Any]):
+        with self._lock:
+            self._entries[token_key(token)] = payload
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class RevocationList:
+    """Revoked token ids held in memory for O(1) checks, persisted with a TTL in MongoDB"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._revoked: Dict[str, float] = {}
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        return jti is not None and jti in self._revoked
+
+    async def revoke(self, jti: str, expires_at: float):
+        self._revoked[jti] = expires_at
+        expires = datetime.fromtimestamp(expires_at, timezone.utc).replace(tzinfo=None)
+        await self.collection.update_one(
+            {"jti": jti},
+            {"$set": {"jti": jti, "expires_at": expires, "revoked_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def load(self):
+        """Reload revocations from MongoDB and drop expired ones"""
+        now = datetime.utcnow()
+        revoked = {}
+        async for entry in self.collection.find({"expires_at": {"$gt": now}}, {"_id": 0, "jti": 1, "expires_at": 1}):
+            revoked[entry["jti"]] = entry["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+        self._revoked = revoked
+
+    async def refresh_forever(self, interval: float = REVOCATION_REFRESH_SECONDS):
+        """Pick up logouts made through other workers"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load()
+            except Exception as e:
+                logging.warning(f"Could not refresh token revocation list: {e}")
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+class UserProfileCache:
+    """The /api/auth/me view of each admin user, refreshed on every login"""
+
+    def __init__(self):
+        self._profiles: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def profile(admin_user: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": admin_user["id"],
+            "username": admin_user["username"],
+            "full_name": admin_user["full_name"],
+            "role": admin_user["role"],
+            "permissions": admin_user.get("permissions", []),
+            "last_login": admin_user.get("last_login")
+        }
+
+    def remember(self, admin_user: Dict[str, Any]) -> Dict[str, Any]:
+        profile = self.profile(admin_user)
+        self._profiles[profile["username"]] = profile
+        return profile
+
+    def get(self, username: str) -> Optional[Dict[str, Any]]:
+        return self._profiles.get(username)
+
+    def clear(self):
+        self._profiles.clear()
+
+
+token_cache = VerifiedTokenCache()
+revocation_list = RevocationList(db[REVOKED_TOKENS_COLLECTION])
+user_profiles = UserProfileCache()
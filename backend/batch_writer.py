@@ -0,0 +1,300 @@
+"""
+Asynchronous, batched collection writer.
+
+Producers enqueue documents instead of inserting them inline. A background
+task drains the bounded queue and writes with ``insert_many`` (unordered)
+whenever a batch fills up or the flush interval elapses. Batches that cannot
+reach MongoDB are appended to a local JSONL spill file that is replayed on
+the next start, so nothing is lost because of a database outage. Spilled
+entries keep their ``_id`` and a replay skips those already in the collection,
+so a batch that was partly written, or a replay that fails halfway, is never
+written twice.
+
+What happens when the queue is full depends on the writer: ``overflow="spill"``
+(audit logs) sends the entry to the spill file, ``overflow="drop"`` (telemetry
+such as user activity) discards and counts it so bursts never touch the disk.
+Overflowing entries are spilled in batches by a background task through a
+worker thread, never with blocking file I/O on the event loop; the flusher
+cannot do it because during an outage it is itself waiting on MongoDB.
+
+These writes bypass the event bus, so every batch that reaches MongoDB
+drops the collection's cached list totals (``cache.count_cache``) itself.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from cache import count_cache
+
+DUPLICATE_KEY_ERROR = 11000
+OVERFLOW_POLICIES = ("spill", "drop")
+
+
+class BatchWriter:
+    """Bounded queue + background flusher for one collection"""
+
+    def __init__(self, collection, name: str, spill_path: str, max_queue_size: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, shutdown_timeout: float = 10.0, overflow: str = "spill"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        self.collection = collection
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.shutdown_timeout = shutdown_timeout
+        self.spill_path = spill_path
+        self.overflow = overflow
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._overflow: List[Dict[str, Any]] = []
+        self._spill_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._spill_lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "dropped": 0,
+            "written": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    # Producer side
+
+    def enqueue(self, entry: Dict[str, Any]) -> bool:
+        """Queue a document without blocking; returns False if it was dropped because the queue is full"""
+        self._stats["enqueued"] += 1
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            if self.overflow == "drop":
+                self._stats["dropped"] += 1
+                return False
+            self._overflow.append(entry)
+            if self._spill_task is None or self._spill_task.done():
+                try:
+                    self._spill_task = asyncio.get_running_loop().create_task(self._spill_overflow())
+                except RuntimeError:
+                    pass  # No loop yet; start() spills what overflowed before startup
+        return True
+
+    def enqueue_many(self, entries: List[Dict[str, Any]]) -> int:
+        """Queue several documents; returns how many were accepted"""
+        return sum(self.enqueue(entry) for entry in entries)
+
+    # Lifecycle
+
+    async def start(self):
+        """Replay any spilled entries, then start the background flusher"""
+        if self._task is not None:
+            return
+        self._stopping = False
+        # Rebind the queue to the running loop, keeping anything queued before startup
+        pending = self._take(self._queue.qsize())
+        self._queue = asyncio.Queue(maxsize=self._queue.maxsize)
+        for entry in pending:
+            self._queue.put_nowait(entry)
+        await self._spill_overflow()
+        await self.replay_spill()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Drain the queue on shutdown; whatever cannot be written in time is spilled"""
+        if self._task is None:
+            return
+        self._stopping = True
+        try:
+            await asyncio.wait_for(self._task, timeout if timeout is not None else self.shutdown_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"{self.name} writer did not drain in time; spilling remaining entries")
+        finally:
+            self._task = None
+        if self._spill_task is not None:
+            await self._spill_task
+            self._spill_task = None
+        remaining = self._overflow + self._take(self._queue.qsize())
+        self._overflow = []
+        if remaining:
+            await asyncio.to_thread(self._spill, remaining)
+
+    # Flushing
+
+    def _take(self, limit: int) -> List[Dict[str, Any]]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            try:
+                first = await asyncio.wait_for(self._queue.get(), self.flush_interval)
+            except asyncio.TimeoutError:
+                if self._stopping:
+                    return
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not self._stopping:
+                batch.extend(self._take(self.batch_size - len(batch)))
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            if self._stopping:
+                batch.extend(self._take(self.batch_size - len(batch)))
+
+            await self.flush(batch)
+
+    async def flush(self, batch: List[Dict[str, Any]]) -> bool:
+        """Write one batch; returns False if it had to be spilled"""
+        if not batch:
+            return True
+        started = time.perf_counter()
+        written = await self._insert(batch)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self._stats["flushes"] += 1
+        self._stats["last_flush_ms"] = round(elapsed_ms, 2)
+        self._stats["max_flush_ms"] = round(max(self._stats["max_flush_ms"], elapsed_ms), 2)
+        self._stats["total_flush_ms"] += elapsed_ms
+        if written:
+            self._stats["written"] += len(batch)
+        else:
+            self._stats["failed_flushes"] += 1
+            await asyncio.to_thread(self._spill, batch)
+        return written
+
+    async def _insert(self, batch: List[Dict[str, Any]]) -> bool:
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            count_cache.invalidate(self.collection.name)
+            return True
+        except BulkWriteError as e:
+            count_cache.invalidate(self.collection.name)
+            # Entries already present (e.g. replayed twice) are fine; anything else is retried via the spill file
+            errors = e.details.get("writeErrors", [])
+            if all(error.get("code") == DUPLICATE_KEY_ERROR for error in errors):
+                return True
+            logging.error(f"{self.name} batch partially failed: {len(errors)} write errors")
+            return False
+        except PyMongoError as e:
+            logging.error(f"{self.name} flush failed, spilling {len(batch)} entries: {e}")
+            return False
+
+    # Spill file
+
+    async def _spill_overflow(self):
+        """Spill entries that did not fit in the queue, a batch at a time, off the event loop"""
+        while self._overflow:
+            entries, self._overflow = self._overflow, []
+            try:
+                await asyncio.to_thread(self._spill, entries)
+            except OSError as e:
+                logging.error(f"{self.name} could not spill {len(entries)} overflowing entries: {e}")
+                self._overflow = entries + self._overflow
+                return
+
+    def _spill(self, entries: List[Dict[str, Any]]):
+        with self._spill_lock:
+            with open(self.spill_path, "a", encoding="utf-8") as spill_file:
+                for entry in entries:
+                    # A stable _id lets a replay tell which entries already reached MongoDB
+                    entry.setdefault("_id", ObjectId())
+                    spill_file.write(json_util.dumps(entry) + "\n")
+                spill_file.flush()
+                os.fsync(spill_file.fileno())
+        self._stats["spilled"] += len(entries)
+
+    async def replay_spill(self) -> int:
+        """Write spilled entries back to MongoDB; entries that still fail stay on disk"""
+        replay_path = self.spill_path + ".replaying"
+        entries = []
+        with self._spill_lock:
+            # A leftover replay file means the previous replay was interrupted
+            if os.path.exists(replay_path):
+                with open(replay_path, encoding="utf-8") as spill_file:
+                    entries.extend(json_util.loads(line) for line in spill_file if line.strip())
+            if os.path.exists(self.spill_path):
+                with open(self.spill_path, encoding="utf-8") as spill_file:
+                    entries.extend(json_util.loads(line) for line in spill_file if line.strip())
+            if not entries:
+                return 0
+            # Spill files written before entries kept their _id; an interrupted replay may overlap the spill file
+            for entry in entries:
+                entry.setdefault("_id", ObjectId())
+            entries = list({entry["_id"]: entry for entry in entries}.values())
+            with open(replay_path, "w", encoding="utf-8") as spill_file:
+                spill_file.writelines(json_util.dumps(entry) + "\n" for entry in entries)
+                spill_file.flush()
+                os.fsync(spill_file.fileno())
+            if os.path.exists(self.spill_path):
+                os.remove(self.spill_path)
+
+        replayed = 0
+        for start in range(0, len(entries), self.batch_size):
+            batch = entries[start:start + self.batch_size]
+            try:
+                unwritten = await self._unwritten(batch)
+            except PyMongoError as e:
+                logging.error(f"{self.name} replay failed, keeping {len(entries) - start} entries spilled: {e}")
+                unwritten = None
+            if unwritten is None or (unwritten and not await self._insert(unwritten)):
+                await asyncio.to_thread(self._spill, entries[start:])
+                break
+            replayed += len(unwritten)
+        os.remove(replay_path)
+
+        self._stats["replayed"] += replayed
+        if entries:
+            logging.info(f"Replayed {replayed}/{len(entries)} spilled {self.name} entries")
+        return replayed
+
+    async def _unwritten(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Entries of a spilled batch that are not in the collection yet"""
+        # Duplicate-key errors cannot be relied on: time-series collections have no unique indexes
+        query: Dict[str, Any] = {"_id": {"$in": [entry["_id"] for entry in batch]}}
+        timestamps = [entry.get("timestamp") for entry in batch]
+        if all(isinstance(timestamp, datetime) for timestamp in timestamps):
+            query["timestamp"] = {"$gte": min(timestamps), "$lte": max(timestamps)}
+        existing = {document["_id"] async for document in self.collection.find(query, {"_id": 1})}
+        return [entry for entry in batch if entry["_id"] not in existing]
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth and flush latency, for monitoring"""
+        flushes = self._stats["flushes"]
+        return {
+            "queue_depth": self._queue.qsize(),
+            "overflow_pending": len(self._overflow),
+            "max_queue_size": self._queue.maxsize,
+            "running": self._task is not None and not self._task.done(),
+            "enqueued": self._stats["enqueued"],
+            "dropped": self._stats["dropped"],
+            "written": self._stats["written"],
+            "spilled": self._stats["spilled"],
+            "replayed": self._stats["replayed"],
+            "flushes": flushes,
+            "failed_flushes": self._stats["failed_flushes"],
+            "last_flush_ms": self._stats["last_flush_ms"],
+            "max_flush_ms": self._stats["max_flush_ms"],
+            "avg_flush_ms": round(self._stats["total_flush_ms"] / flushes, 2) if flushes else 0.0,
+            "spill_file_bytes": os.path.getsize(self.spill_path) if os.path.exists(self.spill_path) else 0,
+        }
@@ -0,0 +1,126 @@
+"""
+In-process response cache for small, rarely-changing catalog endpoints.
+
+Entries are keyed by route + query parameters + caller role, bounded by an
+LRU limit and expire after a per-entity TTL. An inline event-bus subscriber
+invalidates the entity named by every write event, so admins see their own
+changes immediately. Routes store the serialized response body (bytes), so a
+hit is served without encoding anything.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2000"))
+CACHE_DEFAULT_TTL_SECONDS = float(os.getenv("CACHE_DEFAULT_TTL_SECONDS", "60"))
+COUNT_CACHE_MAX_ENTRIES = int(os.getenv("COUNT_CACHE_MAX_ENTRIES", "1000"))
+COUNT_CACHE_TTL_SECONDS = float(os.getenv("COUNT_CACHE_TTL_SECONDS", "30"))
+
+# Per-entity time-to-live (seconds)
+CACHE_TTLS: Dict[str, float] = {
+    "gaming_packages": 300,
+    "rewards": 300,
+    "notification_templates": 600,
+    "training_courses": 600,
+    "predictive_models": 300,
+    "data_retention_policies": 900,
+}
+
+
+class TTLCache:
+    """LRU cache with per-entity TTLs, entity invalidation and hit/miss counters"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = CACHE_DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, str, Any]]" = OrderedDict()
+        self._keys_by_entity: Dict[str, Set[Hashable]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def key(entity: str, route: str, role: Optional[str] = None, **params) -> Tuple:
+        """Build a cache key from the entity, route, caller role and query parameters"""
+        normalized = tuple(sorted((name, value) for name, value in params.items() if value is not None))
+        return (entity, route, role, normalized)
+
+    def _entity_stats(self, entity: str) -> Dict[str, int]:
+        if entity not in self._stats:
+            self._stats[entity] = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+        return self._stats[entity]
+
+    def _remove(self, key: Hashable):
+        _, entity, _ = self._entries.pop(key)
+        keys = self._keys_by_entity.get(entity)
+        if keys is not None:
+            keys.discard(key)
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry"""
+        entity = key[0]
+        stats = self._entity_stats(entity)
+        entry = self._entries.get(key)
+        if entry is None:
+            stats["misses"] += 1
+            return None
+
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            stats["expirations"] += 1
+            stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        stats["hits"] += 1
+        return value
+
+    def set(self, key: Tuple, value: Any, ttl: Optional[float] = None):
+        entity = key[0]
+        if key in self._entries:
+            self._remove(key)
+        ttl = ttl if ttl is not None else self.ttls.get(entity, self.default_ttl)
+        self._entries[key] = (time.monotonic() + ttl, entity, value)
+        self._keys_by_entity.setdefault(entity, set()).add(key)
+        self._entity_stats(entity)["sets"] += 1
+
+        while len(self._entries) > self.max_entries:
+            oldest_key = next(iter(self._entries))
+            self._entity_stats(oldest_key[0])["evictions"] += 1
+            self._remove(oldest_key)
+
+    def invalidate(self, entity: str) -> int:
+        """Drop every cached response for an entity; returns the number removed"""
+        keys = self._keys_by_entity.pop(entity, set())
+        for key in keys:
+            self._entries.pop(key, None)
+        self._entity_stats(entity)["invalidations"] += 1
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._keys_by_entity.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit/miss counters per entity plus overall size, for monitoring"""
+        hits = sum(stats["hits"] for stats in self._stats.values())
+        misses = sum(stats["misses"] for stats in self._stats.values())
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "entities": {
+                entity: dict(stats, entries=len(self._keys_by_entity.get(entity, ())))
+                for entity, stats in self._stats.items()
+            },
+        }
+
+
+catalog_cache = TTLCache(ttls=CACHE_TTLS)
+
+# List totals (see pagination.count_total), keyed by collection so writes can drop them
+count_cache = TTLCache(max_entries=COUNT_CACHE_MAX_ENTRIES, default_ttl=COUNT_CACHE_TTL_SECONDS)
@@ -0,0 +1,106 @@
+"""
+Request coalescing for expensive aggregate endpoints.
+
+Dashboards are opened by many people at once (e.g. after a shift briefing)
+and each load runs the same handful of aggregations. ``CoalescingCache``
+makes concurrent identical requests - same endpoint, parameters and role -
+share one in-flight computation (single-flight), and keeps the result for a
+short stale-while-revalidate window:
+
+* younger than ``fresh_seconds``: served as is;
+* younger than ``stale_seconds``: served immediately while one background
+  computation refreshes it;
+* older, or missing: callers wait for the single shared computation.
+
+Errors are not cached; every caller waiting on a failed computation gets the
+exception and the next request tries again.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+AGGREGATE_FRESH_SECONDS = float(os.getenv("AGGREGATE_FRESH_SECONDS", "5"))
+AGGREGATE_STALE_SECONDS = float(os.getenv("AGGREGATE_STALE_SECONDS", "30"))
+AGGREGATE_MAX_ENTRIES = int(os.getenv("AGGREGATE_MAX_ENTRIES", "500"))
+
+
+class CoalescingCache:
+    """Single-flight + stale-while-revalidate keyed by endpoint, parameters and role"""
+
+    def __init__(self, fresh_seconds: float = AGGREGATE_FRESH_SECONDS, stale_seconds: float = AGGREGATE_STALE_SECONDS,
+                 max_entries: int = AGGREGATE_MAX_ENTRIES):
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = max(stale_seconds, fresh_seconds)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._stats = {"fresh_hits": 0, "stale_hits": 0, "coalesced": 0, "computations": 0, "errors": 0}
+
+    @staticmethod
+    def key(endpoint: str, role: Optional[str] = None, **params) -> Tuple:
+        normalized = tuple(sorted((name, value) for name, value in params.items() if value is not None))
+        return (endpoint, role, normalized)
+
+    async def get_or_compute(self, key: Tuple, compute: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.fresh_seconds:
+                self._entries.move_to_end(key)
+                self._stats["fresh_hits"] += 1
+                return entry[1]
+            if age < self.stale_seconds:
+                self._stats["stale_hits"] += 1
+                self._flight(key, compute)  # Revalidate in the background
+                return entry[1]
+
+        task = self._flight(key, compute)
+        # Shielded so one client disconnecting does not cancel the computation for everyone else
+        return await asyncio.shield(task)
+
+    def _flight(self, key: Tuple, compute: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+            return task
+        self._stats["computations"] += 1
+        task = asyncio.create_task(self._compute(key, compute))
+        # Background revalidations may have no waiter; mark their errors as retrieved (already logged)
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._in_flight[key] = task
+        return task
+
+    async def _compute(self, key: Tuple, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+        except Exception as e:
+            self._stats["errors"] += 1
+            logging.warning(f"Aggregate computation for {key[0]} failed: {e}")
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, endpoint: Optional[str] = None):
+        """Forget cached results for one endpoint, or all of them"""
+        for key in [key for key in self._entries if endpoint is None or key[0] == endpoint]:
+            del self._entries[key]
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "fresh_seconds": self.fresh_seconds,
+            "stale_seconds": self.stale_seconds,
+            **self._stats,
+        }
+
+
+aggregate_cache = CoalescingCache()
@@ -0,0 +1,185 @@
+"""
+Async MongoDB data-access layer for the Bally's Casino Admin API.
+
+All route handlers reach MongoDB through the collections exposed here. The
+layer is built on Motor so queries never block the event loop, and every read
+carries a server-side ``maxTimeMS`` so one runaway query cannot hold a pooled
+connection indefinitely.
+"""
+import os
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+load_dotenv()
+
+# Connection settings
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "ballys_casino_admin")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+
+# Query time limits (milliseconds)
+MONGO_MAX_TIME_MS = int(os.getenv("MONGO_MAX_TIME_MS", "5000"))  # Interactive API queries
+MONGO_REPORT_MAX_TIME_MS = int(os.getenv("MONGO_REPORT_MAX_TIME_MS", "60000"))  # Reports and analytics
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent to MongoDB, overall and for the current request.
+
+    Motor runs each operation with a copy of the caller's context, so a
+    counter installed with ``track_request()`` sees exactly the commands issued
+    while handling that request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, int] = {}
+        self._request: ContextVar[Optional[List[int]]] = ContextVar("mongo_request_commands", default=None)
+
+    def track_request(self) -> List[int]:
+        """Start counting commands for the current context; returns the live counter"""
+        counter = [0]
+        self._request.set(counter)
+        return counter
+
+    def started(self, event):
+        with self._lock:
+            self._totals[event.command_name] = self._totals.get(event.command_name, 0) + 1
+        counter = self._request.get()
+        if counter is not None:
+            counter[0] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = dict(self._totals)
+        return {"total": sum(totals.values()), "by_command": totals}
+
+
+command_counter = CommandCounter()
+
+
+class AsyncCollection:
+    """Motor collection wrapper that applies default query time limits.
+
+    Read operations accept an optional ``max_time_ms`` override; everything
+    else (writes, index management, ``watch``) is delegated to Motor as-is.
+    """
+
+    def __init__(self, collection, max_time_ms: int = MONGO_MAX_TIME_MS):
+        self._collection = collection
+        self.max_time_ms = max_time_ms
+
+    def __getattr__(self, name: str):
+        return getattr(self._collection, name)
+
+    @property
+    def name(self) -> str:
+        return self._collection.name
+
+    @property
+    def motor_collection(self):
+        return self._collection
+
+    def with_max_time(self, max_time_ms: int) -> "AsyncCollection":
+        """Return a handle to the same collection with a different time limit"""
+        return AsyncCollection(self._collection, max_time_ms)
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, *args, max_time_ms: Optional[int] = None, **kwargs):
+        cursor = self._collection.find(filter if filter is not None else {}, *args, **kwargs)
+        return cursor.max_time_ms(max_time_ms or self.max_time_ms)
+
+    async def find_one(self, filter: Optional[Dict[str, Any]] = None, *args, max_time_ms: Optional[int] = None, **kwargs):
+        kwargs["max_time_ms"] = max_time_ms or self.max_time_ms
+        return await self._collection.find_one(filter, *args, **kwargs)
+
+    async def count_documents(self, filter: Dict[str, Any], max_time_ms: Optional[int] = None, **kwargs) -> int:
+        kwargs.setdefault("maxTimeMS", max_time_ms or self.max_time_ms)
+        return await self._collection.count_documents(filter, **kwargs)
+
+    async def estimated_document_count(self, max_time_ms: Optional[int] = None, **kwargs) -> int:
+        kwargs.setdefault("maxTimeMS", max_time_ms or self.max_time_ms)
+        return await self._collection.estimated_document_count(**kwargs)
+
+    async def distinct(self, key: str, filter: Optional[Dict[str, Any]] = None,
+                       max_time_ms: Optional[int] = None, **kwargs) -> List[Any]:
+        kwargs.setdefault("maxTimeMS", max_time_ms or self.max_time_ms)
+        return await self._collection.distinct(key, filter, **kwargs)
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], max_time_ms: Optional[int] = None, **kwargs):
+        kwargs.setdefault("maxTimeMS", max_time_ms or self.max_time_ms)
+        return self._collection.aggregate(pipeline, **kwargs)
+
+
+class AsyncDatabase:
+    """Motor database wrapper handing out time-limited collections"""
+
+    def __init__(self, database, max_time_ms: int = MONGO_MAX_TIME_MS):
+        self._database = database
+        self.max_time_ms = max_time_ms
+
+    def __getattr__(self, name: str) -> AsyncCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> AsyncCollection:
+        return AsyncCollection(self._database[name], self.max_time_ms)
+
+    @property
+    def name(self) -> str:
+        return self._database.name
+
+    @property
+    def motor_database(self):
+        return self._database
+
+    async def command(self, *args, **kwargs):
+        return await self._database.command(*args, **kwargs)
+
+    async def list_collection_names(self, **kwargs) -> List[str]:
+        return await self._database.list_collection_names(**kwargs)
+
+
+def create_client(url: str = MONGO_URL, **overrides) -> AsyncIOMotorClient:
+    """Create a Motor client with the configured pool and timeout settings"""
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "event_listeners": [command_counter],
+    }
+    options.update(overrides)
+    return AsyncIOMotorClient(url, **options)
+
+
+client = create_client()
+db = AsyncDatabase(client[DATABASE_NAME])
+
+
+async def ping() -> bool:
+    """Check that MongoDB is reachable"""
+    try:
+        await client.admin.command("ping")
+        return True
+    except Exception:
+        return False
+
+
+def close_client():
+    client.close()
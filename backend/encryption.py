@@ -0,0 +1,299 @@
+"""
+Field-level encryption for personal data, plus blind indexes for lookups.
+
+Sensitive identifiers (``Member.nic_passport``, ``WalkInGuest.id_document``)
+are stored Fernet-encrypted. To answer "is this passport already on file?"
+without decrypting every row, each encrypted field also stores a keyed
+HMAC-SHA256 of the normalized value in ``<field>_bidx``. Equal inputs give
+equal digests, so an indexed equality query finds matches, while the digest
+reveals nothing without the blind-index key.
+
+Bulk work (sample data, imports, backfills) should use the ``*_batch``
+variants, which split the values into chunks and run them across a thread
+pool; the cryptography backend releases the GIL inside OpenSSL. Keys rotate
+through ``MultiFernet``: new data is encrypted with ``ENCRYPTION_KEY``, data
+written under any key in ``ENCRYPTION_PREVIOUS_KEYS`` still decrypts, and
+``decrypt_and_rotate*`` hands back re-encrypted tokens so callers can lazily
+rewrite stale ciphertext.
+
+Usage:
+    python encryption.py backfill-blind-indexes [--batch-size N] [--workers N] [--all]
+
+    --all revisits rows that already have blind indexes, which also re-encrypts
+    any ciphertext still under a previous key.
+"""
+import asyncio
+import functools
+import hashlib
+import hmac
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from pymongo import UpdateOne
+
+load_dotenv()
+
+ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
+ENCRYPTION_PREVIOUS_KEYS = [key.strip() for key in os.getenv("ENCRYPTION_PREVIOUS_KEYS", "").split(",") if key.strip()]
+BLIND_INDEX_KEY = os.getenv("BLIND_INDEX_KEY")
+ENCRYPTION_WORKERS = int(os.getenv("ENCRYPTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+ENCRYPTION_BATCH_CHUNK_SIZE = int(os.getenv("ENCRYPTION_BATCH_CHUNK_SIZE", "256"))
+
+# Initialize encryption: the first key encrypts, every key decrypts
+primary_cipher = Fernet(ENCRYPTION_KEY.encode()) if ENCRYPTION_KEY else Fernet(Fernet.generate_key())
+cipher_suite = MultiFernet([primary_cipher] + [Fernet(key.encode()) for key in ENCRYPTION_PREVIOUS_KEYS])
+
+# The blind-index key must be stable across restarts; derive it from the encryption key if not set
+if BLIND_INDEX_KEY:
+    _blind_index_key = BLIND_INDEX_KEY.encode()
+elif ENCRYPTION_KEY:
+    _blind_index_key = hmac.new(ENCRYPTION_KEY.encode(), b"blind-index-v1", hashlib.sha256).digest()
+else:
+    logging.warning("Neither BLIND_INDEX_KEY nor ENCRYPTION_KEY is set; blind indexes will not survive a restart")
+    _blind_index_key = os.urandom(32)
+
+# Encrypted fields that carry a blind index, by collection
+BLIND_INDEXED_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "members": ("nic_passport",),
+    "walk_in_guests": ("id_document",),
+}
+
+DECRYPTION_PLACEHOLDER = "[ENCRYPTED_DATA]"
+
+_SEPARATORS = re.compile(r"[\s\-/.]+")
+
+
+def encrypt_sensitive_data(data: str) -> str:
+    """Encrypt sensitive personal data for PDPA compliance"""
+    try:
+        if not data or not isinstance(data, str):
+            logging.warning("Invalid data provided for encryption")
+            return ""
+        return cipher_suite.encrypt(data.encode()).decode()
+    except Exception as e:
+        logging.error(f"Encryption error: {e}")
+        # CRITICAL: Never return unencrypted data
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Data encryption failed"
+        )
+
+
+def decrypt_sensitive_data(encrypted_data: str) -> str:
+    """Decrypt sensitive personal data"""
+    try:
+        if not encrypted_data or not isinstance(encrypted_data, str):
+            return ""
+        return cipher_suite.decrypt(encrypted_data.encode()).decode()
+    except Exception as e:
+        logging.error(f"Decryption error: {e}")
+        # Return placeholder instead of potentially corrupted data
+        return DECRYPTION_PLACEHOLDER
+
+
+def decrypt_and_rotate(encrypted_data: str) -> Tuple[str, Optional[str]]:
+    """Decrypt a token; also return it re-encrypted under the primary key if it used an old key"""
+    if not encrypted_data or not isinstance(encrypted_data, str):
+        return "", None
+    token = encrypted_data.encode()
+    try:
+        return primary_cipher.decrypt(token).decode(), None
+    except InvalidToken:
+        pass
+    try:
+        plaintext = cipher_suite.decrypt(token)
+    except InvalidToken as e:
+        logging.error(f"Decryption error: {e!r}")
+        return DECRYPTION_PLACEHOLDER, None
+    return plaintext.decode(), primary_cipher.encrypt(plaintext).decode()
+
+
+# Batch variants
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=ENCRYPTION_WORKERS, thread_name_prefix="encryption")
+    return _executor
+
+
+def _chunks(values: Sequence[Any], size: int) -> List[Sequence[Any]]:
+    return [values[start:start + size] for start in range(0, len(values), size)]
+
+
+def _apply(function: Callable[[Any], Any], chunk: Sequence[Any]) -> List[Any]:
+    return [function(value) for value in chunk]
+
+
+def _map_chunked(function: Callable[[Any], Any], values: Sequence[Any]) -> List[Any]:
+    """Apply ``function`` to every value, one thread-pool task per chunk"""
+    if len(values) <= ENCRYPTION_BATCH_CHUNK_SIZE:
+        return _apply(function, values)
+    results = _pool().map(functools.partial(_apply, function), _chunks(values, ENCRYPTION_BATCH_CHUNK_SIZE))
+    return [item for chunk in results for item in chunk]
+
+
+async def _map_chunked_async(function: Callable[[Any], Any], values: Sequence[Any]) -> List[Any]:
+    if len(values) <= ENCRYPTION_BATCH_CHUNK_SIZE:
+        return _apply(function, values)
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(_pool(), _apply, function, chunk)
+        for chunk in _chunks(values, ENCRYPTION_BATCH_CHUNK_SIZE)
+    ))
+    return [item for chunk in results for item in chunk]
+
+
+def encrypt_many(values: Sequence[str]) -> List[str]:
+    """Blocking batch encrypt (for scripts); same per-value semantics as encrypt_sensitive_data"""
+    return _map_chunked(encrypt_sensitive_data, values)
+
+
+def decrypt_many(values: Sequence[str]) -> List[str]:
+    """Blocking batch decrypt (for scripts); same per-value semantics as decrypt_sensitive_data"""
+    return _map_chunked(decrypt_sensitive_data, values)
+
+
+async def encrypt_batch(values: Sequence[str]) -> List[str]:
+    """Encrypt many values across the encryption thread pool without blocking the event loop"""
+    return await _map_chunked_async(encrypt_sensitive_data, values)
+
+
+async def decrypt_batch(values: Sequence[str]) -> List[str]:
+    """Decrypt many values across the encryption thread pool without blocking the event loop"""
+    return await _map_chunked_async(decrypt_sensitive_data, values)
+
+
+async def decrypt_and_rotate_batch(values: Sequence[str]) -> List[Tuple[str, Optional[str]]]:
+    """Batch form of decrypt_and_rotate"""
+    return await _map_chunked_async(decrypt_and_rotate, values)
+
+
+def normalize_identifier(value: str) -> str:
+    """Canonical form of a document number: uppercase, no spaces/dashes/dots"""
+    return _SEPARATORS.sub("", value or "").upper()
+
+
+def blind_index_field(field: str) -> str:
+    return f"{field}_bidx"
+
+
+def blind_index(field: str, value: str) -> str:
+    """Keyed HMAC of a normalized identifier; the field name keeps indexes of different fields apart"""
+    message = f"{field}:{normalize_identifier(value)}".encode()
+    return hmac.new(_blind_index_key, message, hashlib.sha256).hexdigest()
+
+
+def encrypt_indexed(field: str, value: str) -> Dict[str, str]:
+    """Ciphertext plus blind index for a field, ready to merge into a document"""
+    return {field: encrypt_sensitive_data(value), blind_index_field(field): blind_index(field, value)}
+
+
+async def encrypt_indexed_batch(field: str, values: Sequence[str]) -> List[Dict[str, str]]:
+    """Batch form of encrypt_indexed"""
+    ciphertexts = await encrypt_batch(values)
+    return [
+        {field: ciphertext, blind_index_field(field): blind_index(field, value)}
+        for value, ciphertext in zip(values, ciphertexts)
+    ]
+
+
+def shutdown_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# Backfill
+
+def _blind_index_updates(documents: List[Dict[str, Any]], fields: Tuple[str, ...]) -> List[UpdateOne]:
+    updates = []
+    for document in documents:
+        values = {}
+        for field in fields:
+            ciphertext = document.get(field)
+            if not ciphertext:
+                continue
+            plaintext, rotated = decrypt_and_rotate(ciphertext)
+            if plaintext == DECRYPTION_PLACEHOLDER:
+                logging.warning(f"Skipping {field} on {document.get('id')}: cannot decrypt")
+                continue
+            values[blind_index_field(field)] = blind_index(field, plaintext)
+            if rotated:
+                values[field] = rotated  # Lazy re-encryption under the current key
+        if values:
+            updates.append(UpdateOne({"_id": document["_id"]}, {"$set": values}))
+    return updates
+
+
+async def backfill_blind_indexes(database, collection_name: str, batch_size: int = 1000, workers: int = 4,
+                                 only_missing: bool = True) -> int:
+    """Compute blind indexes for existing rows, decrypting batches in parallel worker threads.
+
+    Ciphertext written under a previous key is re-encrypted with the current one on the way.
+    """
+    fields = BLIND_INDEXED_FIELDS[collection_name]
+    collection = database[collection_name]
+    query: Dict[str, Any] = {}
+    if only_missing:
+        query = {"$or": [{blind_index_field(field): {"$exists": False}} for field in fields]}
+    projection = {"_id": 1, "id": 1, **{field: 1 for field in fields}}
+
+    loop = asyncio.get_running_loop()
+    in_flight: set = set()
+    updated = 0
+
+    async def process(batch: List[Dict[str, Any]]) -> int:
+        updates = await loop.run_in_executor(pool, _blind_index_updates, batch, fields)
+        if updates:
+            await collection.bulk_write(updates, ordered=False)
+        return len(updates)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="blind-index") as pool:
+        batch: List[Dict[str, Any]] = []
+        # Unbounded scan: bypass the interactive maxTimeMS default
+        async for document in collection.motor_collection.find(query, projection).batch_size(batch_size):
+            batch.append(document)
+            if len(batch) >= batch_size:
+                in_flight.add(asyncio.ensure_future(process(batch)))
+                batch = []
+                if len(in_flight) >= workers:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    updated += sum(task.result() for task in done)
+        if batch:
+            in_flight.add(asyncio.ensure_future(process(batch)))
+        if in_flight:
+            done, _ = await asyncio.wait(in_flight)
+            updated += sum(task.result() for task in done)
+    return updated
+
+
+async def _main(argv: List[str]) -> int:
+    if not argv or argv[0] != "backfill-blind-indexes":
+        print(__doc__)
+        return 2
+
+    from database import db
+
+    batch_size = int(argv[argv.index("--batch-size") + 1]) if "--batch-size" in argv else 1000
+    workers = int(argv[argv.index("--workers") + 1]) if "--workers" in argv else 4
+    for collection_name in BLIND_INDEXED_FIELDS:
+        updated = await backfill_blind_indexes(db, collection_name, batch_size, workers,
+                                               only_missing="--all" not in argv)
+        print(f"{collection_name}: {updated} documents indexed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,182 @@
+"""
+In-process publish/subscribe bus for domain events.
+
+Write routes publish a small event (``"<collection>.<action>"`` plus the
+affected document) once their primary write has succeeded, and everything
+that used to run inline after that write - notifications, live-view pushes,
+cache invalidation - subscribes instead.
+
+Subscribers match topics with shell-style patterns (``"rewards.*"``, ``"*"``)
+and come in two kinds:
+
+* inline subscribers are plain functions called during ``publish``; use them
+  only for cheap in-memory work that must be visible to the caller's next
+  request (e.g. dropping cache entries);
+* queued subscribers are coroutines fed from their own bounded queue by a
+  background worker, so slow work never sits on the request path. A lossy
+  subscriber drops events when its queue is full (fine for views that are
+  recomputed anyway); a lossless one makes ``publish`` wait for room instead.
+
+Events are not persisted and a failed handler is not retried: anything
+still queued when the process dies is lost. Work that must not be lost with
+them (e.g. folding a completed session into the revenue rollups, which
+nothing would redo once the session's status has flipped) stays inline in
+the route.
+"""
+import asyncio
+import fnmatch
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "1000"))
+EVENT_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("EVENT_SHUTDOWN_TIMEOUT_SECONDS", "10"))
+
+
+class Event:
+    __slots__ = ("topic", "payload", "published_at")
+
+    def __init__(self, topic: str, payload: Dict[str, Any]):
+        self.topic = topic
+        self.payload = payload
+        self.published_at = time.time()
+
+
+class Subscription:
+    """One subscriber: its topic pattern, handler and (for queued handlers) its queue"""
+
+    def __init__(self, name: str, pattern: str, handler: Callable, inline: bool, lossy: bool, queue_size: int):
+        self.name = name
+        self.pattern = pattern
+        self.handler = handler
+        self.inline = inline
+        self.lossy = lossy
+        self.queue: Optional[asyncio.Queue] = None if inline else asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"delivered": 0, "dropped": 0, "failed": 0}
+
+    def matches(self, topic: str) -> bool:
+        return fnmatch.fnmatchcase(topic, self.pattern)
+
+    def rebind_queue(self):
+        """Recreate the queue on the running loop, keeping anything published before startup"""
+        pending = []
+        while not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+        self.queue = asyncio.Queue(maxsize=self.queue.maxsize)
+        for event in pending:
+            self.queue.put_nowait(event)
+
+
+class EventBus:
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscriptions: List[Subscription] = []
+        self._running = False
+        self._published = 0
+
+    def subscribe(self, pattern: str, handler: Callable, name: Optional[str] = None, inline: bool = False,
+                  lossy: bool = False, queue_size: Optional[int] = None) -> Subscription:
+        subscription = Subscription(
+            name or getattr(handler, "__name__", pattern), pattern, handler, inline, lossy, queue_size or self.queue_size
+        )
+        self._subscriptions.append(subscription)
+        if self._running and not inline:
+            subscription.task = asyncio.create_task(self._worker(subscription))
+        return subscription
+
+    def on(self, pattern: str, **options):
+        """Decorator form of ``subscribe``"""
+        def register(handler: Callable):
+            self.subscribe(pattern, handler, **options)
+            return handler
+        return register
+
+    async def publish(self, topic: str, payload: Dict[str, Any]) -> Event:
+        """Deliver an event to every matching subscriber.
+
+        Only waits when a lossless subscriber's queue is full.
+        """
+        event = Event(topic, payload)
+        self._published += 1
+        for subscription in self._subscriptions:
+            if not subscription.matches(topic):
+                continue
+            if subscription.inline:
+                self._call_inline(subscription, event)
+            elif subscription.lossy:
+                try:
+                    subscription.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    subscription.stats["dropped"] += 1
+            else:
+                await subscription.queue.put(event)
+        return event
+
+    def _call_inline(self, subscription: Subscription, event: Event):
+        try:
+            subscription.handler(event)
+            subscription.stats["delivered"] += 1
+        except Exception as e:
+            subscription.stats["failed"] += 1
+            logging.error(f"Event subscriber {subscription.name} failed on {event.topic}: {e}")
+
+    async def _worker(self, subscription: Subscription):
+        while True:
+            event = await subscription.queue.get()
+            try:
+                await subscription.handler(event)
+                subscription.stats["delivered"] += 1
+            except Exception as e:
+                subscription.stats["failed"] += 1
+                logging.error(f"Event subscriber {subscription.name} failed on {event.topic}: {e}")
+            finally:
+                subscription.queue.task_done()
+
+    # Lifecycle
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        for subscription in self._subscriptions:
+            if not subscription.inline:
+                subscription.rebind_queue()
+                subscription.task = asyncio.create_task(self._worker(subscription))
+
+    async def drain(self):
+        """Wait until every queued event has been handled"""
+        for subscription in self._subscriptions:
+            if not subscription.inline:
+                await subscription.queue.join()
+
+    async def stop(self, timeout: float = EVENT_SHUTDOWN_TIMEOUT_SECONDS):
+        """Give subscribers a chance to finish queued events, then cancel the workers"""
+        if not self._running:
+            return
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning("Event bus did not drain in time; dropping queued events")
+        self._running = False
+        for subscription in self._subscriptions:
+            if subscription.task is not None:
+                subscription.task.cancel()
+                subscription.task = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "published": self._published,
+            "subscribers": {
+                subscription.name: {
+                    "pattern": subscription.pattern,
+                    "queued": subscription.queue.qsize() if subscription.queue is not None else 0,
+                    **subscription.stats,
+                }
+                for subscription in self._subscriptions
+            },
+        }
+
+
+event_bus = EventBus()
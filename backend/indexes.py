@@ -0,0 +1,392 @@
+"""
+Index registry and index advisor for the Bally's Casino Admin API.
+
+INDEX_REGISTRY declares every index the API relies on, keyed by collection.
+``ensure_indexes`` applies it at startup (idempotent, background builds) and
+QUERY_SHAPES lists the filter/sort shape of each route so the advisor can run
+``explain()`` against seeded data and flag collection scans or in-memory sorts.
+
+Usage:
+    python indexes.py apply              # create/verify all registered indexes
+    python indexes.py explain [--seed]   # report COLLSCAN / SORT plans per route
+"""
+import asyncio
+import logging
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from auth import REVOKED_TOKENS_COLLECTION
+from database import db
+from jobs import JOB_RETENTION_DAYS, REPORT_JOBS_COLLECTION
+from rollups import ALL_TIME, ROLLUP_COLLECTION, ROLLUP_KEY_INDEX, ROLLUP_PENDING_FIELD
+
+
+def _unique_id() -> IndexModel:
+    return IndexModel([("id", ASCENDING)], name="id_unique", unique=True, background=True)
+
+
+def _event_id() -> IndexModel:
+    # Time-series collections (see timeseries.py) cannot have unique indexes
+    return IndexModel([("id", ASCENDING)], name="id_1", background=True)
+
+
+def _index(*keys, **options) -> IndexModel:
+    name = options.pop("name", "_".join(f"{field}_{direction}" for field, direction in keys))
+    return IndexModel(list(keys), name=name, background=True, **options)
+
+
+# Declarative index registry: collection name -> indexes
+INDEX_REGISTRY: Dict[str, List[IndexModel]] = {
+    "admin_users": [
+        _unique_id(),
+        _index(("username", ASCENDING), unique=True),
+        _index(("updated_at", ASCENDING)),
+    ],
+    REVOKED_TOKENS_COLLECTION: [
+        _index(("jti", ASCENDING), unique=True),
+        _index(("expires_at", ASCENDING), expireAfterSeconds=0),
+        _index(("revoked_at", ASCENDING)),
+    ],
+    "members": [
+        _unique_id(),
+        _index(("member_number", ASCENDING), unique=True),
+        _index(("is_active", ASCENDING), ("member_number", ASCENDING), ("id", ASCENDING)),
+        _index(("is_active", ASCENDING), ("tier", ASCENDING), ("member_number", ASCENDING), ("id", ASCENDING)),
+        _index(("is_active", ASCENDING), ("kyc_verified", ASCENDING)),
+        _index(("is_active", ASCENDING), ("last_visit", ASCENDING), ("id", ASCENDING)),
+        _index(("registration_date", DESCENDING)),
+        _index(("nic_passport_bidx", ASCENDING)),
+        _index(("search_prefixes", ASCENDING), ("is_active", ASCENDING)),
+        _index(("search_trigrams", ASCENDING), ("is_active", ASCENDING)),
+    ],
+    "gaming_sessions": [
+        _unique_id(),
+        _index(("session_start", DESCENDING), ("id", DESCENDING)),
+        _index(("status", ASCENDING), ("session_start", DESCENDING), ("id", DESCENDING)),
+        _index(("status", ASCENDING), ("game_type", ASCENDING)),
+        _index(("member_id", ASCENDING), ("session_start", DESCENDING)),
+        _index((ROLLUP_PENDING_FIELD, ASCENDING), sparse=True),
+    ],
+    "gaming_packages": [
+        _unique_id(),
+        _index(("is_active", ASCENDING)),
+        _index(("updated_at", ASCENDING)),
+    ],
+    "rewards": [
+        _unique_id(),
+        _index(("is_active", ASCENDING), ("points_required", ASCENDING), ("id", ASCENDING)),
+        _index(("is_active", ASCENDING), ("category", ASCENDING), ("points_required", ASCENDING), ("id", ASCENDING)),
+        _index(("tier_access", ASCENDING)),
+        _index(("updated_at", ASCENDING)),
+    ],
+    "audit_logs": [
+        _unique_id(),
+        _index(("timestamp", DESCENDING), ("id", DESCENDING)),
+        _index(("admin_user_id", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)),
+        _index(("action", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)),
+        _index(("resource", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)),
+        # Covers the enhanced-audit summary $facet over a date range
+        _index(("timestamp", DESCENDING), ("admin_user_id", ASCENDING), ("action", ASCENDING), ("resource", ASCENDING),
+               ("admin_username", ASCENDING), ("risk_level", ASCENDING), name="audit_summary_covering"),
+    ],
+    "system_settings": [_unique_id()],
+    "marketing_campaigns": [
+        _unique_id(),
+        _index(("created_at", DESCENDING), ("id", DESCENDING)),
+        _index(("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)),
+        _index(("campaign_type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)),
+    ],
+    "travel_itineraries": [_unique_id()],
+    "staff": [_unique_id()],
+    "compliance_logs": [_unique_id()],
+    "customer_analytics": [
+        _unique_id(),
+        _index(("member_id", ASCENDING)),
+    ],
+    "walk_in_guests": [
+        _unique_id(),
+        _index(("visit_date", DESCENDING), ("id", DESCENDING)),
+        _index(("id_document_bidx", ASCENDING), ("visit_date", DESCENDING)),
+    ],
+    "vip_experiences": [
+        _unique_id(),
+        _index(("scheduled_date", DESCENDING), ("id", DESCENDING)),
+        _index(("status", ASCENDING), ("scheduled_date", DESCENDING), ("id", DESCENDING)),
+        _index(("member_id", ASCENDING)),
+    ],
+    "group_bookings": [
+        _unique_id(),
+        _index(("booking_date", DESCENDING), ("id", DESCENDING)),
+        _index(("status", ASCENDING), ("booking_date", DESCENDING), ("id", DESCENDING)),
+    ],
+    "birthday_calendar": [
+        _unique_id(),
+        _index(("birth_month", ASCENDING), ("notification_sent", ASCENDING)),
+        _index(("birth_day", ASCENDING), ("id", ASCENDING)),
+        _index(("birth_month", ASCENDING), ("birth_day", ASCENDING), ("id", ASCENDING)),
+        _index(("member_id", ASCENDING)),
+    ],
+    "staff_members": [
+        _unique_id(),
+        _index(("employee_id", ASCENDING)),
+        _index(("employment_status", ASCENDING), ("employee_id", ASCENDING), ("id", ASCENDING)),
+        _index(("employment_status", ASCENDING), ("department", ASCENDING), ("employee_id", ASCENDING), ("id", ASCENDING)),
+        _index(("employment_status", ASCENDING), ("next_review_due", ASCENDING)),
+        _index(("performance_score", ASCENDING)),
+        _index(("search_prefixes", ASCENDING), ("employment_status", ASCENDING)),
+        _index(("search_trigrams", ASCENDING), ("employment_status", ASCENDING)),
+    ],
+    "training_courses": [
+        _unique_id(),
+        _index(("is_active", ASCENDING), ("category", ASCENDING)),
+        _index(("updated_at", ASCENDING)),
+    ],
+    "training_records": [
+        _unique_id(),
+        _index(("enrollment_date", DESCENDING), ("id", DESCENDING)),
+        _index(("staff_id", ASCENDING), ("enrollment_date", DESCENDING), ("id", DESCENDING)),
+        _index(("course_id", ASCENDING), ("enrollment_date", DESCENDING), ("id", DESCENDING)),
+        _index(("status", ASCENDING), ("enrollment_date", DESCENDING), ("id", DESCENDING)),
+        _index(("status", ASCENDING), ("completion_date", DESCENDING)),
+    ],
+    "performance_reviews": [
+        _unique_id(),
+        _index(("staff_id", ASCENDING)),
+    ],
+    "advanced_analytics": [
+        _unique_id(),
+        _index(("is_active", ASCENDING), ("analysis_date", DESCENDING)),
+        _index(("is_active", ASCENDING), ("analysis_type", ASCENDING), ("analysis_date", DESCENDING)),
+    ],
+    "cost_optimization": [
+        _unique_id(),
+        _index(("roi_percentage", DESCENDING)),
+        _index(("optimization_area", ASCENDING), ("roi_percentage", DESCENDING)),
+        _index(("implementation_status", ASCENDING), ("roi_percentage", DESCENDING)),
+    ],
+    "predictive_models": [
+        _unique_id(),
+        _index(("model_type", ASCENDING)),
+        _index(("is_production", ASCENDING)),
+        _index(("updated_at", ASCENDING)),
+    ],
+    "notifications": [
+        _unique_id(),
+        _index(("created_at", DESCENDING), ("id", DESCENDING)),
+        _index(("recipient_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)),
+        _index(("category", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)),
+        _index(("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)),
+        _index(("priority", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)),
+    ],
+    "notification_templates": [
+        _unique_id(),
+        _index(("is_active", ASCENDING), ("category", ASCENDING)),
+        _index(("updated_at", ASCENDING)),
+    ],
+    "compliance_reports": [
+        _unique_id(),
+        _index(("created_at", DESCENDING), ("id", DESCENDING)),
+        _index(("report_type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)),
+        _index(("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)),
+    ],
+    "system_integrations": [
+        _unique_id(),
+        _index(("created_at", DESCENDING)),
+        _index(("integration_type", ASCENDING), ("created_at", DESCENDING)),
+        _index(("status", ASCENDING), ("created_at", DESCENDING)),
+    ],
+    "user_activity_tracking": [
+        _event_id(),
+        _index(("timestamp", DESCENDING)),
+        _index(("user_type", ASCENDING), ("timestamp", DESCENDING)),
+        _index(("activity_type", ASCENDING), ("timestamp", DESCENDING)),
+    ],
+    "real_time_events": [
+        _event_id(),
+        _index(("timestamp", DESCENDING), ("id", DESCENDING)),
+        _index(("event_type", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)),
+        _index(("severity", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)),
+        _index(("resolved", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)),
+    ],
+    "data_retention_policies": [
+        _unique_id(),
+        _index(("created_at", DESCENDING)),
+        _index(("data_category", ASCENDING), ("created_at", DESCENDING)),
+        _index(("status", ASCENDING), ("created_at", DESCENDING)),
+        _index(("updated_at", ASCENDING)),
+    ],
+    ROLLUP_COLLECTION: [ROLLUP_KEY_INDEX],
+    REPORT_JOBS_COLLECTION: [
+        _unique_id(),
+        _index(("created_at", DESCENDING), ("id", DESCENDING)),
+        _index(("status", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)),
+        _index(("fingerprint", ASCENDING), ("created_at", DESCENDING)),
+        # Only queued and running jobs carry it, so at most one of them per fingerprint
+        _index(("active_fingerprint", ASCENDING), name="active_fingerprint_unique", unique=True, sparse=True),
+        _index(("finished_at", ASCENDING), name="finished_at_ttl", expireAfterSeconds=JOB_RETENTION_DAYS * 86400),
+    ],
+}
+
+
+async def ensure_indexes(database=db) -> Dict[str, List[str]]:
+    """Create every registered index. Safe to run on each startup."""
+    applied = {}
+    for collection_name, indexes in INDEX_REGISTRY.items():
+        try:
+            applied[collection_name] = await database[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            # An index with the same name but different options already exists;
+            # leave it in place for an operator to reconcile.
+            logging.error(f"Index bootstrap failed for {collection_name}: {e}")
+    logging.info(f"Index bootstrap complete for {len(applied)} collections")
+    return applied
+
+
+# Query shapes issued by the routes, with representative values
+_now = datetime.utcnow()
+QUERY_SHAPES: List[Dict[str, Any]] = [
+    {"route": "POST /api/auth/login", "collection": "admin_users", "filter": {"username": "superadmin"}},
+    {"route": "GET /api/dashboard/metrics", "collection": "members", "filter": {"tier": "VIP", "is_active": True}},
+    {"route": "GET /api/dashboard/metrics", "collection": "members", "filter": {"registration_date": {"$gte": _now - timedelta(days=1)}}},
+    {"route": "GET /api/dashboard/metrics", "collection": "gaming_sessions", "filter": {"status": "active"}},
+    {"route": "GET /api/dashboard/metrics", "collection": ROLLUP_COLLECTION,
+     "filter": {"$or": [{"granularity": "day", "bucket": {"$gte": _now - timedelta(days=31)}}, {"granularity": ALL_TIME}]}},
+    {"route": "GET /api/members", "collection": "members", "filter": {"is_active": True, "tier": "Ruby"},
+     "sort": [("member_number", ASCENDING), ("id", ASCENDING)]},
+    {"route": "GET /api/members?search=", "collection": "members",
+     "filter": {"is_active": True, "search_prefixes": {"$all": ["fern"]}}},
+    {"route": "GET /api/members/{member_id}", "collection": "members", "filter": {"id": "probe"}},
+    {"route": "POST /api/members/lookup", "collection": "members", "filter": {"nic_passport_bidx": "probe"}},
+    {"route": "POST /api/members/lookup", "collection": "walk_in_guests", "filter": {"id_document_bidx": "probe"},
+     "sort": [("visit_date", DESCENDING)]},
+    {"route": "GET /api/gaming/sessions", "collection": "gaming_sessions", "filter": {}, "sort": [("session_start", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/gaming/sessions", "collection": "gaming_sessions", "filter": {"status": "completed"},
+     "sort": [("session_start", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/gaming/packages", "collection": "gaming_packages", "filter": {"is_active": True}},
+    {"route": "GET /api/rewards", "collection": "rewards", "filter": {"is_active": True, "category": "dining"},
+     "sort": [("points_required", ASCENDING), ("id", ASCENDING)]},
+    {"route": "GET /api/rewards/{reward_id}", "collection": "rewards", "filter": {"id": "probe"}},
+    {"route": "GET /api/marketing/dashboard", "collection": "birthday_calendar",
+     "filter": {"birth_month": _now.month, "notification_sent": False}},
+    {"route": "GET /api/marketing/inactive-customers", "collection": "members",
+     "filter": {"last_visit": {"$lt": _now - timedelta(days=30)}, "is_active": True},
+     "sort": [("last_visit", ASCENDING), ("id", ASCENDING)]},
+    {"route": "GET /api/marketing/inactive-customers", "collection": "customer_analytics", "filter": {"member_id": "probe"}},
+    {"route": "GET /api/marketing/walk-in-guests", "collection": "walk_in_guests",
+     "filter": {"visit_date": {"$gte": _now - timedelta(days=1), "$lt": _now}},
+     "sort": [("visit_date", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/marketing/campaigns", "collection": "marketing_campaigns", "filter": {"status": "active"},
+     "sort": [("created_at", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/travel/vip-dashboard", "collection": "vip_experiences",
+     "filter": {"scheduled_date": {"$gte": _now, "$lte": _now + timedelta(days=7)}, "status": {"$in": ["planned", "confirmed"]}}},
+    {"route": "GET /api/travel/vip-experiences", "collection": "vip_experiences", "filter": {"status": "completed"},
+     "sort": [("scheduled_date", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/travel/group-bookings", "collection": "group_bookings", "filter": {},
+     "sort": [("booking_date", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/staff/dashboard", "collection": "staff_members",
+     "filter": {"department": "Gaming", "employment_status": "active"}},
+    {"route": "GET /api/staff/dashboard", "collection": "training_records",
+     "filter": {"completion_date": {"$gte": _now.replace(day=1)}, "status": "completed"}},
+    {"route": "GET /api/staff/training/courses", "collection": "training_courses", "filter": {"is_active": True}},
+    {"route": "GET /api/staff/members", "collection": "staff_members",
+     "filter": {"employment_status": "active", "department": "Gaming"},
+     "sort": [("employee_id", ASCENDING), ("id", ASCENDING)]},
+    {"route": "GET /api/staff/training/records", "collection": "training_records", "filter": {"staff_id": "probe"},
+     "sort": [("enrollment_date", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/analytics/advanced", "collection": "advanced_analytics", "filter": {"is_active": True},
+     "sort": [("analysis_date", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/optimization/cost-savings", "collection": "cost_optimization", "filter": {},
+     "sort": [("roi_percentage", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/notifications", "collection": "notifications", "filter": {"recipient_id": "probe"},
+     "sort": [("created_at", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/notifications/templates", "collection": "notification_templates", "filter": {"is_active": True}},
+    {"route": "GET /api/compliance/reports", "collection": "compliance_reports", "filter": {},
+     "sort": [("created_at", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/audit/enhanced", "collection": "audit_logs", "filter": {}, "sort": [("timestamp", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/audit/enhanced", "collection": "audit_logs", "filter": {"admin_user_id": "probe"},
+     "sort": [("timestamp", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/audit/enhanced", "collection": "audit_logs", "filter": {"action": "view"},
+     "sort": [("timestamp", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/audit/enhanced (summary)", "collection": "audit_logs",
+     "filter": {"timestamp": {"$gte": _now - timedelta(days=30), "$lte": _now}}},
+    {"route": "GET /api/jobs", "collection": REPORT_JOBS_COLLECTION, "filter": {"status": "running"},
+     "sort": [("created_at", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/integrations", "collection": "system_integrations", "filter": {},
+     "sort": [("created_at", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/analytics/user-activity", "collection": "user_activity_tracking",
+     "filter": {"timestamp": {"$gte": _now - timedelta(days=30), "$lte": _now}}, "sort": [("timestamp", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/analytics/real-time-events", "collection": "real_time_events", "filter": {"severity": "critical"},
+     "sort": [("timestamp", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /api/data-retention/policies", "collection": "data_retention_policies", "filter": {},
+     "sort": [("created_at", DESCENDING), ("id", DESCENDING)]},
+]
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    """Collect every stage name in an explain plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+async def explain_query_shapes(database=db) -> List[Dict[str, Any]]:
+    """Explain each route's query shape and flag COLLSCAN or in-memory SORT"""
+    report = []
+    for shape in QUERY_SHAPES:
+        cursor = database[shape["collection"]].find(shape["filter"])
+        if shape.get("sort"):
+            cursor = cursor.sort(shape["sort"])
+        explanation = await cursor.limit(50).explain()
+        stages = _plan_stages(explanation.get("queryPlanner", {}).get("winningPlan", {}))
+        problems = [stage for stage in ("COLLSCAN", "SORT") if stage in stages]
+        report.append({
+            "route": shape["route"],
+            "collection": shape["collection"],
+            "filter": shape["filter"],
+            "sort": shape.get("sort"),
+            "stages": stages,
+            "problems": problems,
+        })
+    return report
+
+
+async def _main(argv: List[str]) -> int:
+    command = argv[0] if argv else "explain"
+
+    if command == "apply":
+        applied = await ensure_indexes()
+        for collection_name, names in applied.items():
+            print(f"{collection_name}: {', '.join(names)}")
+        return 0
+
+    if command == "explain":
+        if "--seed" in argv:
+            # Loading sample data replaces existing documents; opt-in only.
+            from server import initialize_sample_data
+            await initialize_sample_data()
+        await ensure_indexes()
+        report = await explain_query_shapes()
+        flagged = [entry for entry in report if entry["problems"]]
+        for entry in report:
+            marker = "FLAG" if entry["problems"] else "ok  "
+            print(f"{marker} {entry['route']:<42} {entry['collection']:<24} {' > '.join(entry['stages'])}")
+        print(f"\n{len(flagged)} of {len(report)} query shapes use a COLLSCAN or in-memory SORT")
+        return 1 if flagged else 0
+
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
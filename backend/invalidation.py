@@ -0,0 +1,268 @@
+"""
+Cross-worker invalidation of worker-local caches.
+
+Each uvicorn worker keeps its own in-memory state (catalog cache, list totals,
+revocation list, /me profiles). A write served by one worker is
+invisible to the others until their TTLs run out, so every worker runs an
+``InvalidationWatcher`` that follows writes to the collections behind those
+caches and calls the handlers registered for them.
+
+On a replica set the watcher tails one database-level change stream. On a
+standalone mongod, where change streams are unavailable, it polls each
+collection for documents whose timestamp field (``updated_at`` by default)
+is past a high-water mark; polling cannot see deletes, which are left to the
+caches' TTLs. Collections registered without a timestamp field are followed
+by change streams only. Change streams do not report writes to time-series
+collections, so collections registered with ``always_poll`` are polled
+alongside the stream.
+
+The change-stream resume token and the polling high-water marks are
+checkpointed to ``cache_invalidation_state`` under INVALIDATION_CONSUMER_ID
+(default: the host name, so workers on one host share a checkpoint), letting
+a restarted watcher replay what it missed instead of starting from "now".
+If the resume point has aged out of the oplog, every handler is told to drop
+everything and the stream restarts from the present.
+"""
+import asyncio
+import inspect
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from database import db
+
+INVALIDATION_CONSUMER_ID = os.getenv("INVALIDATION_CONSUMER_ID", socket.gethostname())
+INVALIDATION_MODE = os.getenv("INVALIDATION_MODE", "auto")  # auto, change_stream, polling, off
+INVALIDATION_POLL_SECONDS = float(os.getenv("INVALIDATION_POLL_SECONDS", "2"))
+INVALIDATION_POLL_LOOKBACK_SECONDS = float(os.getenv("INVALIDATION_POLL_LOOKBACK_SECONDS", "5"))  # Clock skew / late commits
+INVALIDATION_CHECKPOINT_SECONDS = float(os.getenv("INVALIDATION_CHECKPOINT_SECONDS", "5"))
+INVALIDATION_MAX_AWAIT_MS = int(os.getenv("INVALIDATION_MAX_AWAIT_MS", "1000"))
+INVALIDATION_RETRY_SECONDS = float(os.getenv("INVALIDATION_RETRY_SECONDS", "5"))
+
+INVALIDATION_STATE_COLLECTION = "cache_invalidation_state"
+
+CHANGE_STREAMS_UNSUPPORTED = (40573, 40324)  # Standalone mongod / unknown $changeStream stage
+CHANGE_STREAM_HISTORY_LOST = (286, 280)  # Resume point no longer in the oplog / invalid resume token
+
+# Called with the changed document _ids, or None meaning "assume everything changed"
+Handler = Callable[[Optional[List[Any]]], Union[None, Awaitable[None]]]
+
+
+class InvalidationWatcher:
+    def __init__(self, database, consumer_id: str = INVALIDATION_CONSUMER_ID, mode: str = INVALIDATION_MODE):
+        self.database = database
+        self.consumer_id = consumer_id
+        self.mode = mode
+        self.state_collection = database[INVALIDATION_STATE_COLLECTION]
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._timestamp_fields: Dict[str, Optional[str]] = {}
+        self._always_polled: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._resume_token: Optional[Dict[str, Any]] = None
+        self._high_water: Dict[str, datetime] = {}
+        self._seen: Dict[str, Set[Tuple[Any, datetime]]] = {}
+        self._last_checkpoint = 0.0
+        self.active_mode: Optional[str] = None
+        self._stats = {"changes": 0, "invalidations": 0, "handler_errors": 0, "resets": 0, "checkpoints": 0}
+
+    def register(self, collection: str, handler: Handler, timestamp_field: Optional[str] = "updated_at",
+                 always_poll: bool = False):
+        """Call ``handler`` whenever documents in ``collection`` change in any worker"""
+        self._handlers.setdefault(collection, []).append(handler)
+        self._timestamp_fields[collection] = timestamp_field
+        if always_poll:
+            self._always_polled.add(collection)
+
+    @property
+    def collections(self) -> List[str]:
+        return sorted(self._handlers)
+
+    @property
+    def streamed_collections(self) -> List[str]:
+        return [collection for collection in self.collections if collection not in self._always_polled]
+
+    # Lifecycle
+
+    async def start(self):
+        if self._task is not None or self.mode == "off" or not self._handlers:
+            return
+        await self._load_checkpoint()
+        self._task = asyncio.create_task(self._run())
+        if self._always_polled:
+            self._poll_task = asyncio.create_task(self._run_always_polled())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        for task in (self._task, self._poll_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._poll_task = None
+        await self._checkpoint(force=True)
+
+    async def _run(self):
+        while True:
+            try:
+                if self.mode in ("auto", "change_stream"):
+                    await self._watch()
+                else:
+                    self.active_mode = "polling"
+                    await self._poll_forever(self.streamed_collections)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED and self.mode == "auto":
+                    logging.info("Change streams unavailable (standalone mongod); polling for cache invalidations")
+                    self.mode = "polling"
+                    continue
+                if e.code in CHANGE_STREAM_HISTORY_LOST:
+                    logging.warning("Cache invalidation resume point lost; invalidating all worker caches")
+                    await self._reset()
+                    continue
+                logging.error(f"Cache invalidation watcher failed: {e}")
+            except Exception as e:
+                logging.error(f"Cache invalidation watcher failed: {e}")
+            await asyncio.sleep(INVALIDATION_RETRY_SECONDS)
+
+    async def _run_always_polled(self):
+        while True:
+            try:
+                await self._poll_forever(sorted(self._always_polled))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Cache invalidation polling failed: {e}")
+            await asyncio.sleep(INVALIDATION_RETRY_SECONDS)
+
+    # Change streams
+
+    async def _watch(self):
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": self.streamed_collections}}},
+            {"$project": {"operationType": 1, "ns": 1, "documentKey": 1}},
+        ]
+        options = {"max_await_time_ms": INVALIDATION_MAX_AWAIT_MS}
+        if self._resume_token is not None:
+            options["resume_after"] = self._resume_token
+
+        async with self.database.motor_database.watch(pipeline, **options) as stream:
+            self.active_mode = "change_stream"
+            while True:
+                change = await stream.try_next()
+                if change is not None:
+                    self._stats["changes"] += 1
+                    operation = change["operationType"]
+                    if operation in ("dropDatabase", "invalidate"):
+                        # The stream is closed after these; reopen it from now
+                        await self._reset()
+                        return
+                    if operation in ("drop", "rename"):
+                        await self._dispatch(change["ns"]["coll"], None)
+                    else:
+                        await self._dispatch(change["ns"]["coll"], [change["documentKey"]["_id"]])
+                self._resume_token = stream.resume_token
+                await self._checkpoint()
+
+    # Polling fallback
+
+    async def _poll_forever(self, collections: List[str]):
+        collections = [collection for collection in collections if self._timestamp_fields[collection]]
+        now = datetime.utcnow()
+        for collection in collections:
+            self._high_water.setdefault(collection, now)
+        while True:
+            for collection in collections:
+                await self._poll(collection)
+            await self._checkpoint()
+            await asyncio.sleep(INVALIDATION_POLL_SECONDS)
+
+    async def _poll(self, collection: str):
+        field = self._timestamp_fields[collection]
+        since = self._high_water[collection] - timedelta(seconds=INVALIDATION_POLL_LOOKBACK_SECONDS)
+        seen = self._seen.setdefault(collection, set())
+        changed = []
+        async for document in self.database[collection].find({field: {"$gte": since}}, {"_id": 1, field: 1}).sort(field, 1):
+            marker = (document["_id"], document[field])
+            if marker in seen:
+                continue
+            seen.add(marker)
+            changed.append(document["_id"])
+            self._high_water[collection] = max(self._high_water[collection], document[field])
+        # Only markers inside the lookback window can be returned again
+        self._seen[collection] = {marker for marker in seen if marker[1] >= since}
+        if changed:
+            self._stats["changes"] += len(changed)
+            await self._dispatch(collection, changed)
+
+    # Dispatch
+
+    async def _dispatch(self, collection: str, ids: Optional[List[Any]]):
+        for handler in self._handlers.get(collection, []):
+            try:
+                result = handler(ids)
+                if inspect.isawaitable(result):
+                    await result
+                self._stats["invalidations"] += 1
+            except Exception as e:
+                self._stats["handler_errors"] += 1
+                logging.error(f"Cache invalidation handler for {collection} failed: {e}")
+
+    async def _reset(self):
+        self._stats["resets"] += 1
+        self._resume_token = None
+        for collection in self.collections:
+            await self._dispatch(collection, None)
+        await self._checkpoint(force=True)
+
+    # Checkpoints
+
+    async def _load_checkpoint(self):
+        try:
+            state = await self.state_collection.find_one({"_id": self.consumer_id})
+        except PyMongoError as e:
+            logging.warning(f"Could not load cache invalidation checkpoint: {e}")
+            return
+        if state:
+            self._resume_token = state.get("resume_token")
+            self._high_water = {
+                collection: timestamp for collection, timestamp in (state.get("high_water") or {}).items()
+                if collection in self._handlers
+            }
+
+    async def _checkpoint(self, force: bool = False):
+        if not force and time.monotonic() - self._last_checkpoint < INVALIDATION_CHECKPOINT_SECONDS:
+            return
+        self._last_checkpoint = time.monotonic()
+        try:
+            await self.state_collection.update_one(
+                {"_id": self.consumer_id},
+                {"$set": {"resume_token": self._resume_token, "high_water": self._high_water,
+                          "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+            self._stats["checkpoints"] += 1
+        except PyMongoError as e:
+            logging.warning(f"Could not save cache invalidation checkpoint: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "mode": self.active_mode,
+            "consumer_id": self.consumer_id,
+            "collections": self.collections,
+            **self._stats,
+        }
+
+
+invalidation_watcher = InvalidationWatcher(db)
@@ -0,0 +1,356 @@
+"""
+Background jobs for long-running reports.
+
+A report over a long period can take far longer than an HTTP request should
+stay open. Clients submit a job instead and get its id back straight away,
+follow its progress (``GET /api/jobs/{id}`` or the ``report_jobs`` live
+topic) and fetch the result once it has completed.
+
+Job state lives in MongoDB (``report_jobs``), so any API worker can answer
+for any job and queued work survives a restart:
+
+* A job with the same type and parameters as one that is queued, running,
+  or completed within ``JOB_RESULT_TTL_SECONDS`` is not started again; the
+  existing job is returned. A unique index on ``active_fingerprint`` settles
+  concurrent submissions.
+* Workers claim queued jobs atomically and heartbeat while running them. A
+  running job whose worker stops heartbeating is requeued, up to
+  ``JOB_MAX_ATTEMPTS`` runs.
+* Cancelling a queued job takes it off the queue; a running job is stopped
+  by the worker running it within one poll interval.
+
+Handlers are coroutines and do their database work on the event loop;
+CPU-heavy steps go through ``JobContext.run_cpu`` to a process pool. The
+pool uses spawned processes, so functions sent to it must be module-level
+functions of a module that does not import the app (see ``reports.py``).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from database import db
+from events import event_bus
+
+REPORT_JOBS_COLLECTION = "report_jobs"
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))  # Jobs run at once per API worker
+JOB_PROCESS_WORKERS = int(os.getenv("JOB_PROCESS_WORKERS", str(min(2, os.cpu_count() or 1))))  # 0 runs CPU steps inline
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))  # Identical requests reuse a result this fresh
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "30"))  # Finished jobs expire after this
+
+# Job fields without the (possibly large) result, for status and list responses
+JOB_STATUS_PROJECTION = {"_id": 0, "result": 0, "active_fingerprint": 0}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Spawned, not forked: children must not inherit the event loop or the Motor client's sockets
+        _executor = ProcessPoolExecutor(max_workers=JOB_PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled"""
+
+
+class JobContext:
+    """What a job handler gets: its parameters, who asked for it, and progress reporting.
+
+    Handlers can also be awaited directly from a request with a plain
+    ``JobContext``; progress reports are then no-ops.
+    """
+
+    def __init__(self, params: Dict[str, Any], submitted_by: Dict[str, Any], job_id: Optional[str] = None):
+        self.params = params
+        self.submitted_by = submitted_by
+        self.job_id = job_id
+
+    async def progress(self, percent: int, message: str):
+        pass
+
+    async def run_cpu(self, function: Callable, *args) -> Any:
+        """Run a CPU-bound, picklable module-level function in the job process pool"""
+        if JOB_PROCESS_WORKERS <= 0:
+            return function(*args)
+        return await asyncio.get_running_loop().run_in_executor(_pool(), function, *args)
+
+
+class _RunnerContext(JobContext):
+    def __init__(self, runner: "JobRunner", job: Dict[str, Any]):
+        super().__init__(job["params"], job["submitted_by"], job["id"])
+        self.runner = runner
+
+    async def progress(self, percent: int, message: str):
+        job = await self.runner.collection.find_one_and_update(
+            {"id": self.job_id, "status": "running", "worker": self.runner.worker_id},
+            {"$set": {"progress": percent, "message": message, "heartbeat_at": datetime.utcnow()}},
+            projection=JOB_STATUS_PROJECTION, return_document=ReturnDocument.AFTER
+        )
+        if job is None or job.get("cancel_requested"):
+            raise JobCancelled()
+        await self.runner.notify(job)
+
+
+class JobRunner:
+    """Mongo-backed job queue plus the loop that runs this worker's share of it"""
+
+    def __init__(self, collection, concurrency: int = JOB_CONCURRENCY, poll_seconds: float = JOB_POLL_SECONDS):
+        self.collection = collection
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.handlers: Dict[str, Callable[[JobContext], Awaitable[Dict[str, Any]]]] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wake = asyncio.Event()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._stats = {"submitted": 0, "deduplicated": 0, "completed": 0, "failed": 0, "cancelled": 0, "requeued": 0}
+
+    def handler(self, job_type: str):
+        """Decorator registering the coroutine that runs jobs of ``job_type``"""
+        def register(handler: Callable[[JobContext], Awaitable[Dict[str, Any]]]):
+            self.handlers[job_type] = handler
+            return handler
+        return register
+
+    @staticmethod
+    def fingerprint(job_type: str, params: Dict[str, Any]) -> str:
+        canonical = json.dumps([job_type, params], sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    async def notify(self, job: Dict[str, Any]):
+        """Publish a job's new state (drives the ``report_jobs`` live topic)"""
+        await event_bus.publish(f"{REPORT_JOBS_COLLECTION}.updated", job)
+
+    # Client side
+
+    async def submit(self, job_type: str, params: Dict[str, Any],
+                     submitted_by: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """Queue a job, or return the identical one already queued, running or recently completed.
+
+        Returns ``(job, created)``.
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        fingerprint = self.fingerprint(job_type, params)
+        for _ in range(2):
+            existing = await self._reusable(fingerprint)
+            if existing is not None:
+                self._stats["deduplicated"] += 1
+                return existing, False
+            now = datetime.utcnow()
+            job = {
+                "id": str(uuid.uuid4()),
+                "type": job_type,
+                "params": params,
+                "fingerprint": fingerprint,
+                "active_fingerprint": fingerprint,
+                "status": "queued",
+                "progress": 0,
+                "message": "Queued",
+                "submitted_by": submitted_by,
+                "attempts": 0,
+                "cancel_requested": False,
+                "created_at": now,
+                "updated_at": now,
+            }
+            try:
+                await self.collection.insert_one(job)
+            except DuplicateKeyError:
+                continue  # Submitted concurrently; the other submission's job is reused
+            self._stats["submitted"] += 1
+            self._wake.set()
+            job = {field: value for field, value in job.items() if field not in JOB_STATUS_PROJECTION}
+            await self.notify(job)
+            return job, True
+        raise RuntimeError(f"Could not submit {job_type} job")
+
+    async def _reusable(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        fresh_since = datetime.utcnow() - timedelta(seconds=JOB_RESULT_TTL_SECONDS)
+        return await self.collection.find_one(
+            {"fingerprint": fingerprint,
+             "$or": [{"active_fingerprint": fingerprint}, {"status": "completed", "finished_at": {"$gte": fresh_since}}]},
+            JOB_STATUS_PROJECTION, sort=[("created_at", -1)]
+        )
+
+    async def get(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        projection = {"_id": 0, "active_fingerprint": 0} if include_result else JOB_STATUS_PROJECTION
+        return await self.collection.find_one({"id": job_id}, projection)
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued job now, or ask the worker running it to stop; returns the job's state"""
+        now = datetime.utcnow()
+        job = await self.collection.find_one_and_update(
+            {"id": job_id, "status": "queued"},
+            {"$set": {"status": "cancelled", "message": "Cancelled", "finished_at": now, "updated_at": now},
+             "$unset": {"active_fingerprint": ""}},
+            projection=JOB_STATUS_PROJECTION, return_document=ReturnDocument.AFTER
+        )
+        if job is not None:
+            self._stats["cancelled"] += 1
+            await self.notify(job)
+            return job
+        job = await self.collection.find_one_and_update(
+            {"id": job_id, "status": "running"},
+            {"$set": {"cancel_requested": True, "updated_at": now}},
+            projection=JOB_STATUS_PROJECTION, return_document=ReturnDocument.AFTER
+        )
+        if job is not None and job_id in self._running:
+            self._running[job_id].cancel()
+        return job if job is not None else await self.get(job_id)
+
+    # Worker side
+
+    def start(self):
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop claiming jobs; jobs still running here go back on the queue for another worker"""
+        self._stopping = True
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._heartbeat()
+                await self._requeue_stale()
+                while len(self._running) < self.concurrency:
+                    job = await self._claim()
+                    if job is None:
+                        break
+                    self._running[job["id"]] = asyncio.create_task(self._execute(job))
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logging.warning(f"Job runner could not reach the job queue: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"status": "queued"},
+            {"$set": {"status": "running", "worker": self.worker_id, "started_at": now, "heartbeat_at": now,
+                      "updated_at": now, "message": "Starting"},
+             "$inc": {"attempts": 1}},
+            projection={"_id": 0}, sort=[("created_at", 1)], return_document=ReturnDocument.AFTER
+        )
+
+    async def _heartbeat(self):
+        """Mark this worker's jobs alive and stop the ones cancelled from another worker"""
+        if not self._running:
+            return
+        ids = list(self._running)
+        await self.collection.update_many(
+            {"id": {"$in": ids}, "worker": self.worker_id}, {"$set": {"heartbeat_at": datetime.utcnow()}}
+        )
+        async for job in self.collection.find({"id": {"$in": ids}, "cancel_requested": True}, {"id": 1}):
+            task = self._running.get(job["id"])
+            if task is not None:
+                task.cancel()
+
+    async def _requeue_stale(self):
+        """Jobs whose worker stopped heartbeating run again elsewhere, or fail after JOB_MAX_ATTEMPTS"""
+        now = datetime.utcnow()
+        stale = {"status": "running", "heartbeat_at": {"$lt": now - timedelta(seconds=JOB_STALE_SECONDS)}}
+        await self.collection.update_many(
+            {**stale, "cancel_requested": True},
+            {"$set": {"status": "cancelled", "message": "Cancelled", "finished_at": now, "updated_at": now},
+             "$unset": {"active_fingerprint": ""}}
+        )
+        await self.collection.update_many(
+            {**stale, "attempts": {"$gte": JOB_MAX_ATTEMPTS}},
+            {"$set": {"status": "failed", "message": "Failed", "error": "Worker stopped responding",
+                      "finished_at": now, "updated_at": now},
+             "$unset": {"active_fingerprint": ""}}
+        )
+        result = await self.collection.update_many(
+            stale, {"$set": {"status": "queued", "message": "Requeued", "updated_at": now}, "$unset": {"worker": ""}}
+        )
+        self._stats["requeued"] += result.modified_count
+
+    async def _execute(self, job: Dict[str, Any]):
+        context = _RunnerContext(self, job)
+        update: Dict[str, Any]
+        try:
+            result = await self.handlers[job["type"]](context)
+            update = {"status": "completed", "progress": 100, "message": "Completed", "result": result}
+        except (JobCancelled, asyncio.CancelledError):
+            if self._stopping:
+                await self._release(job)
+                return
+            update = {"status": "cancelled", "message": "Cancelled"}
+        except Exception as e:
+            logging.exception(f"Job {job['id']} ({job['type']}) failed")
+            update = {"status": "failed", "message": "Failed", "error": str(e)}
+        finally:
+            self._running.pop(job["id"], None)
+
+        now = datetime.utcnow()
+        finished = await self.collection.find_one_and_update(
+            {"id": job["id"], "worker": self.worker_id},
+            {"$set": {**update, "finished_at": now, "updated_at": now}, "$unset": {"active_fingerprint": ""}},
+            projection=JOB_STATUS_PROJECTION, return_document=ReturnDocument.AFTER
+        )
+        self._stats[update["status"]] += 1
+        if finished is not None:
+            await self.notify(finished)
+
+    async def _release(self, job: Dict[str, Any]):
+        """Put a job interrupted by shutdown back on the queue without counting the attempt"""
+        try:
+            result = await self.collection.update_one(
+                {"id": job["id"], "worker": self.worker_id, "status": "running"},
+                {"$set": {"status": "queued", "message": "Requeued", "updated_at": datetime.utcnow()},
+                 "$unset": {"worker": ""}, "$inc": {"attempts": -1}}
+            )
+            self._stats["requeued"] += result.modified_count
+        except PyMongoError as e:
+            logging.warning(f"Could not requeue job {job['id']}; it will be requeued once stale: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "worker": self.worker_id,
+            "running": len(self._running),
+            "concurrency": self.concurrency,
+            "process_workers": JOB_PROCESS_WORKERS,
+            **self._stats,
+        }
+
+
+job_runner = JobRunner(db[REPORT_JOBS_COLLECTION])
@@ -0,0 +1,85 @@
+"""
+Request-scoped batch loaders for related-document lookups.
+
+List routes that decorate each row with data from another collection (member
+names on gaming sessions, staff and course names on training records, ...)
+ask a loader for the related document instead of calling ``find_one`` per
+row. Every key requested during the same event-loop tick is resolved with a
+single ``$in`` query, and results are memoised for the rest of the request.
+"""
+import asyncio
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+from database import db
+
+
+class BatchLoader:
+    """Collects keys and resolves them with one ``$in`` query per batch"""
+
+    def __init__(self, collection, key_field: str = "id", projection: Optional[Dict[str, Any]] = None):
+        self.collection = collection
+        self.key_field = key_field
+        self.projection = dict(projection or {})
+        if self.projection:
+            self.projection.setdefault(key_field, 1)
+            self.projection.setdefault("_id", 0)
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+
+    def load(self, key: Hashable) -> "asyncio.Future":
+        """Return a future for the document whose key field equals ``key`` (None if missing)"""
+        if key in self._cache:
+            return self._cache[key]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._cache[key] = future
+        if not self._pending:
+            loop.call_soon(lambda: asyncio.ensure_future(self._dispatch()))
+        self._pending[key] = future
+        return future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Optional[Dict[str, Any]]]:
+        """Resolve several keys at once, preserving order"""
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    async def _dispatch(self):
+        pending, self._pending = self._pending, {}
+        try:
+            documents = await self.collection.find(
+                {self.key_field: {"$in": list(pending.keys())}},
+                self.projection or None
+            ).to_list(None)
+        except Exception as exc:
+            for key, future in pending.items():
+                self._cache.pop(key, None)
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        found: Dict[Hashable, Dict[str, Any]] = {}
+        for document in documents:
+            # Keep the first match per key, like find_one would
+            found.setdefault(document.get(self.key_field), document)
+        for key, future in pending.items():
+            if not future.done():
+                future.set_result(found.get(key))
+
+
+class Loaders:
+    """The set of loaders shared by one request"""
+
+    def __init__(self, database=db):
+        self.members = BatchLoader(database.members, "id", {"first_name": 1, "last_name": 1, "tier": 1})
+        self.customer_analytics = BatchLoader(
+            database.customer_analytics, "member_id",
+            {"risk_score": 1, "avg_spend_per_visit": 1, "favorite_games": 1}
+        )
+        self.staff_members = BatchLoader(database.staff_members, "id", {"first_name": 1, "last_name": 1})
+        self.training_courses = BatchLoader(database.training_courses, "id", {"course_name": 1})
+
+
+def get_loaders() -> Loaders:
+    """FastAPI dependency: a fresh set of loaders per request"""
+    return Loaders()
+
@@ -0,0 +1,142 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Pages are ordered by a sort key plus ``id`` as a tiebreaker, and cursors are
+opaque tokens holding the boundary values of the page they came from, so
+fetching page N costs the same as page 1. Offset pagination (``skip``) is
+still supported for small collections and keeps the ``total``/``page``/
+``pages`` fields the dashboard tables use.
+
+Totals are the expensive part of an offset page, so they come from
+``count_total``: unfiltered listings use the collection's metadata count
+(flagged with ``total_is_estimate``) and filtered counts are cached per
+normalized filter until a write to the collection or COUNT_CACHE_TTL_SECONDS.
+Time-series collections have no metadata count, so they always take the
+cached path.
+Infinite-scroll clients can skip the total altogether (``include_total=False``).
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException, status
+from pymongo.errors import OperationFailure
+
+from cache import count_cache
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+
+def encode_cursor(document: Dict[str, Any], sort_field: str, backwards: bool = False) -> str:
+    """Build an opaque cursor pointing just past (or before) a document"""
+    payload = {"v": _encode_value(document.get(sort_field)), "id": document.get("id"), "b": backwards}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str, bool]:
+    """Return (sort value, id, backwards) from a cursor token"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return _decode_value(payload["v"]), payload["id"], bool(payload.get("b"))
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+
+
+def _boundary_filter(sort_field: str, direction: int, value: Any, last_id: str) -> Dict[str, Any]:
+    op = "$gt" if direction == 1 else "$lt"
+    return {"$or": [{sort_field: {op: value}}, {sort_field: value, "id": {op: last_id}}]}
+
+
+COMMAND_NOT_SUPPORTED_ON_VIEW = 166
+
+
+async def count_total(collection, query: Dict[str, Any]) -> Tuple[int, bool]:
+    """Return (total, is_estimate) for a list query"""
+    if not query:
+        try:
+            return await collection.estimated_document_count(), True
+        except OperationFailure as e:
+            if e.code != COMMAND_NOT_SUPPORTED_ON_VIEW:
+                raise
+
+    key = count_cache.key(collection.name, "count", filter=json_util.dumps(query, sort_keys=True))
+    total = count_cache.get(key)
+    if total is None:
+        total = await collection.count_documents(query)
+        count_cache.set(key, total)
+    return total, False
+
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    sort_direction: int = -1,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    include_total: bool = True,
+) -> Dict[str, Any]:
+    """Fetch one page of documents ordered by (sort_field, id).
+
+    With ``cursor`` the page is located by keyset and no total is computed.
+    Without it, ``skip`` is used and ``page`` is included, plus ``total``/
+    ``pages``/``total_is_estimate`` unless ``include_total`` is False.
+    Both modes return ``next_cursor``/``prev_cursor`` (None at either end).
+    """
+    limit = max(1, limit)
+
+    if cursor:
+        value, last_id, backwards = decode_cursor(cursor)
+        direction = -sort_direction if backwards else sort_direction
+        boundary = _boundary_filter(sort_field, direction, value, last_id)
+        keyset_query = {"$and": [query, boundary]} if query else boundary
+
+        documents = await collection.find(keyset_query, projection).sort(
+            [(sort_field, direction), ("id", direction)]
+        ).limit(limit + 1).to_list(None)
+        has_more = len(documents) > limit
+        documents = documents[:limit]
+
+        if backwards:
+            documents.reverse()
+            next_cursor = encode_cursor(documents[-1], sort_field) if documents else None
+            prev_cursor = encode_cursor(documents[0], sort_field, backwards=True) if documents and has_more else None
+        else:
+            next_cursor = encode_cursor(documents[-1], sort_field) if documents and has_more else None
+            prev_cursor = encode_cursor(documents[0], sort_field, backwards=True) if documents else None
+
+        return {"items": documents, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+    documents = await collection.find(query, projection).sort(
+        [(sort_field, sort_direction), ("id", sort_direction)]
+    ).skip(skip).limit(limit + 1).to_list(None)
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+
+    page = {
+        "items": documents,
+        "page": skip // limit + 1,
+        "next_cursor": encode_cursor(documents[-1], sort_field) if documents and has_more else None,
+        "prev_cursor": encode_cursor(documents[0], sort_field, backwards=True) if documents and skip > 0 else None,
+    }
+    if include_total:
+        total, is_estimate = await count_total(collection, query)
+        page.update(total=total, pages=(total + limit - 1) // limit, total_is_estimate=is_estimate)
+    return page
+
@@ -0,0 +1,54 @@
+"""
+Password hashing off the event loop.
+
+bcrypt costs 100-300 ms of CPU per hash or verify. Running it inline in an
+async handler stalls every other request, so hashing and verification run in
+a dedicated, bounded thread pool (bcrypt releases the GIL while hashing).
+Verification also reports when a stored hash uses an outdated cost factor so
+login can transparently rehash it.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+# Verified against when the username does not exist, so failed logins take the same time either way
+_DUMMY_HASH = pwd_context.hash("timing-equalizer")
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+    return _executor
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password with the configured bcrypt cost"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool(), pwd_context.hash, password)
+
+
+async def verify_password(password: str, password_hash: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """Check a password; returns (valid, new_hash) where new_hash is set if the stored hash needs upgrading"""
+    loop = asyncio.get_running_loop()
+    if not password_hash:
+        await loop.run_in_executor(_pool(), pwd_context.verify, password, _DUMMY_HASH)
+        return False, None
+    return await loop.run_in_executor(_pool(), pwd_context.verify_and_update, password, password_hash)
+
+
+def shutdown_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,62 @@
+"""
+Sparse fieldsets for list endpoints.
+
+List routes accept ``?fields=a,b,c`` and turn it into a MongoDB inclusion
+projection, so only the requested fields leave the database. Without
+``fields`` a route returns its list-view default, which leaves out bulky
+detail fields (course content, free-text preferences, ...). ``fields=*``
+asks for every field the route exposes.
+
+Sensitive fields (salary, blind indexes) are never part of a field set:
+they cannot be requested and, because every projection is an inclusion
+projection, they are never read off the wire in the first place.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+ALL_FIELDS = "*"
+
+
+class FieldSet:
+    """The fields a list route may return, and the ones it returns by default"""
+
+    def __init__(self, fields: Iterable[str], default: Iterable[str], required: Iterable[str] = ("id",),
+                 hidden: Iterable[str] = ()):
+        hidden = set(hidden)
+        self.fields: Tuple[str, ...] = tuple(field for field in fields if field not in hidden)
+        self.required: Tuple[str, ...] = tuple(required)
+        self.default: Tuple[str, ...] = tuple(default)
+        unknown = set(self.default) - set(self.fields)
+        if unknown:
+            raise ValueError(f"Default fields not in field set: {sorted(unknown)}")
+
+    @classmethod
+    def for_model(cls, model: Type[BaseModel], default: Iterable[str], required: Iterable[str] = ("id",),
+                  hidden: Iterable[str] = ()) -> "FieldSet":
+        return cls(model.model_fields, default, required, hidden)
+
+    def select(self, fields: Optional[str] = None) -> List[str]:
+        """Resolve a ``fields`` query parameter to the list of fields to return"""
+        if fields is None or not fields.strip():
+            return list(self.default)
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        if ALL_FIELDS in requested:
+            return list(self.fields)
+        unknown = [field for field in requested if field not in self.fields]
+        if unknown:
+            # Restricted fields get the same answer as misspelt ones
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        return requested
+
+    def projection(self, fields: Optional[str] = None) -> Dict[str, int]:
+        """Inclusion projection for ``fields``, always carrying the fields cursors and clients rely on"""
+        projection = {"_id": 0}
+        for field in (*self.required, *self.select(fields)):
+            projection[field] = 1
+        return projection
+
+    def cache_key(self, fields: Optional[str] = None) -> str:
+        """Canonical form of ``fields`` for cache keys"""
+        return ",".join(sorted(set(self.select(fields))))
@@ -0,0 +1,336 @@
+"""
+Live push channel for dashboards (``/ws/live``).
+
+Clients subscribe to topics over one WebSocket. Once per tick the hub
+recomputes each topic that has at least one subscriber, diffs it against the
+previous state, encodes the delta once and fans the same bytes out to every
+subscriber. Nothing is recomputed per client.
+
+Topic state is a flat mapping (metric name -> value, or document id -> row),
+so a delta is just ``changed`` keys plus ``removed`` keys. A client that joins
+late gets a full ``snapshot`` first. Write events published on the event bus
+call ``refresh_soon`` so affected topics are pushed without waiting a tick.
+
+A socket lives only as long as the token it was opened with: once that
+token expires or is revoked (logout), the hub closes the socket with
+``CLOSE_POLICY_VIOLATION`` on its next tick or message.
+
+Slow clients cannot hold the hub back: each connection has a small bounded
+queue. When it overflows, the queued deltas are dropped and the client is
+resynchronised with fresh snapshots instead; a client that keeps overflowing,
+or stops accepting writes, is disconnected.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from auth import revocation_list, role_allowed
+
+LIVE_TICK_SECONDS = float(os.getenv("LIVE_TICK_SECONDS", "2"))
+LIVE_CLIENT_QUEUE_SIZE = int(os.getenv("LIVE_CLIENT_QUEUE_SIZE", "32"))
+LIVE_MAX_OVERFLOWS = int(os.getenv("LIVE_MAX_OVERFLOWS", "3"))
+LIVE_SEND_TIMEOUT_SECONDS = float(os.getenv("LIVE_SEND_TIMEOUT_SECONDS", "10"))
+LIVE_EVENT_DEBOUNCE_SECONDS = float(os.getenv("LIVE_EVENT_DEBOUNCE_SECONDS", "0.25"))  # Coalesces bursts of writes
+
+# WebSocket close codes
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_TRY_AGAIN_LATER = 1013
+
+_MISSING = object()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode(message: Dict[str, Any]) -> str:
+    return json.dumps(message, default=_json_default, separators=(",", ":"))
+
+
+def diff(previous: Dict[str, Any], current: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Changed and removed keys between two states, or None if nothing changed"""
+    changed = {key: value for key, value in current.items() if previous.get(key, _MISSING) != value}
+    removed = [key for key in previous if key not in current]
+    if not changed and not removed:
+        return None
+    return {"changed": changed, "removed": removed}
+
+
+class Topic:
+    """A named, periodically recomputed state shared by all its subscribers"""
+
+    def __init__(self, name: str, producer: Callable[[], Awaitable[Dict[str, Any]]], interval: float,
+                 roles: Optional[int] = None):
+        self.name = name
+        self.producer = producer
+        self.interval = interval
+        self.roles = roles
+        self.subscribers: Set["LiveClient"] = set()
+        self.state: Optional[Dict[str, Any]] = None
+        self.sequence = 0
+        self.last_run = 0.0
+        self.last_duration_ms = 0.0
+
+    def snapshot_message(self) -> str:
+        return encode({"type": "snapshot", "topic": self.name, "seq": self.sequence, "data": self.state or {}})
+
+
+class LiveClient:
+    """One connected socket: its subscriptions and bounded outbound queue"""
+
+    def __init__(self, websocket: WebSocket, user: Dict[str, Any]):
+        self.websocket = websocket
+        self.user = user
+        self.topics: Set[str] = set()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=LIVE_CLIENT_QUEUE_SIZE)
+        self.overflows = 0
+        self.closed = False
+        self.expires_at: Optional[float] = user.get("exp")
+        self.jti: Optional[str] = user.get("jti")
+
+    def credentials_valid(self) -> bool:
+        """False once the token the socket was opened with has expired or been revoked"""
+        if self.expires_at is not None and time.time() >= self.expires_at:
+            return False
+        return not revocation_list.is_revoked(self.jti)
+
+
+class LiveHub:
+    def __init__(self, tick_seconds: float = LIVE_TICK_SECONDS):
+        self.tick_seconds = tick_seconds
+        self.topics: Dict[str, Topic] = {}
+        self.clients: Set[LiveClient] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stats = {"messages_sent": 0, "deltas_published": 0, "overflows": 0, "slow_disconnects": 0,
+                       "credential_disconnects": 0,
+                       "last_tick_ms": 0.0}
+
+    def topic(self, name: str, interval: Optional[float] = None, roles: Optional[int] = None):
+        """Decorator registering an async producer that returns the topic's current state.
+
+        ``roles`` is a role mask from ``auth``; when set, only those roles may subscribe.
+        """
+        def register(producer: Callable[[], Awaitable[Dict[str, Any]]]):
+            self.topics[name] = Topic(name, producer, interval or self.tick_seconds, roles)
+            return producer
+        return register
+
+    # Lifecycle
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for client in list(self.clients):
+            await self._close(client, 1001)
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            try:
+                await self.tick()
+            except Exception as e:
+                logging.error(f"Live hub tick failed: {e}")
+            elapsed = time.perf_counter() - started
+            self._stats["last_tick_ms"] = round(elapsed * 1000, 2)
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(0.0, self.tick_seconds - elapsed))
+                await asyncio.sleep(LIVE_EVENT_DEBOUNCE_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def refresh_soon(self, *names: str):
+        """Recompute these topics on the next loop pass instead of waiting out their interval"""
+        for name in names:
+            if name in self.topics:
+                self.topics[name].last_run = 0.0
+        if self._wake is not None:
+            self._wake.set()
+
+    async def tick(self):
+        """Recompute due topics that have subscribers and publish their deltas"""
+        for client in [client for client in self.clients if not client.credentials_valid()]:
+            self._stats["credential_disconnects"] += 1
+            await self._close(client, CLOSE_POLICY_VIOLATION)
+        now = time.monotonic()
+        due = [topic for topic in self.topics.values() if topic.subscribers and now - topic.last_run >= topic.interval]
+        await asyncio.gather(*(self._refresh(topic) for topic in due))
+
+    async def _refresh(self, topic: Topic):
+        started = time.perf_counter()
+        try:
+            state = await topic.producer()
+        except Exception as e:
+            logging.warning(f"Live topic {topic.name} failed: {e}")
+            return
+        finally:
+            topic.last_run = time.monotonic()
+            topic.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        previous, topic.state = topic.state, state
+        if previous is None:
+            topic.sequence += 1
+            self._publish(topic, topic.snapshot_message())
+            return
+        delta = diff(previous, state)
+        if delta is None:
+            return
+        topic.sequence += 1
+        self._stats["deltas_published"] += 1
+        self._publish(topic, encode({"type": "delta", "topic": topic.name, "seq": topic.sequence, **delta}))
+
+    def _publish(self, topic: Topic, message: str):
+        for client in list(topic.subscribers):
+            self._enqueue(client, message)
+
+    # Per-client delivery
+
+    def _enqueue(self, client: LiveClient, message: str):
+        if client.closed:
+            return
+        try:
+            client.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self._handle_overflow(client)
+
+    def _handle_overflow(self, client: LiveClient):
+        """Drop the backlog and resync with snapshots; give up on clients that keep falling behind"""
+        self._stats["overflows"] += 1
+        client.overflows += 1
+        while not client.queue.empty():
+            client.queue.get_nowait()
+        if client.overflows > LIVE_MAX_OVERFLOWS:
+            self._stats["slow_disconnects"] += 1
+            client.closed = True
+            self._detach(client)
+            client.queue.put_nowait(None)  # Tells the sender to close the socket
+            return
+        client.queue.put_nowait(encode({"type": "resync", "topics": sorted(client.topics)}))
+        for name in client.topics:
+            topic = self.topics[name]
+            if topic.state is not None and not client.queue.full():
+                client.queue.put_nowait(topic.snapshot_message())
+
+    async def _sender(self, client: LiveClient):
+        while True:
+            message = await client.queue.get()
+            if message is None:
+                await self._close(client, CLOSE_TRY_AGAIN_LATER)
+                return
+            try:
+                await asyncio.wait_for(client.websocket.send_text(message), LIVE_SEND_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self._stats["slow_disconnects"] += 1
+                await self._close(client, CLOSE_TRY_AGAIN_LATER)
+                return
+            except Exception:
+                return
+            self._stats["messages_sent"] += 1
+
+    async def _close(self, client: LiveClient, code: int):
+        client.closed = True
+        self._detach(client)
+        try:
+            await client.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def _detach(self, client: LiveClient):
+        self.clients.discard(client)
+        for name in client.topics:
+            self.topics[name].subscribers.discard(client)
+
+    # Subscriptions
+
+    def subscribe(self, client: LiveClient, names: List[str]) -> List[str]:
+        accepted = [
+            name for name in names
+            if name in self.topics and (self.topics[name].roles is None or role_allowed(client.user, self.topics[name].roles))
+        ]
+        for name in accepted:
+            topic = self.topics[name]
+            if client not in topic.subscribers:
+                topic.subscribers.add(client)
+                client.topics.add(name)
+                if topic.state is not None:
+                    self._enqueue(client, topic.snapshot_message())
+                else:
+                    topic.last_run = 0.0  # First subscriber: compute on the next tick
+        return accepted
+
+    def unsubscribe(self, client: LiveClient, names: List[str]):
+        for name in names:
+            if name in self.topics:
+                self.topics[name].subscribers.discard(client)
+                client.topics.discard(name)
+
+    async def serve(self, websocket: WebSocket, user: Dict[str, Any]):
+        """Run one accepted connection until it disconnects"""
+        client = LiveClient(websocket, user)
+        self.clients.add(client)
+        sender = asyncio.create_task(self._sender(client))
+        self._enqueue(client, encode({"type": "welcome", "topics": sorted(self.topics), "tick_seconds": self.tick_seconds}))
+        try:
+            while not client.closed:
+                try:
+                    request = json.loads(await websocket.receive_text())
+                except ValueError:
+                    self._enqueue(client, encode({"type": "error", "detail": "Messages must be JSON"}))
+                    continue
+                if not client.credentials_valid():
+                    self._stats["credential_disconnects"] += 1
+                    await self._close(client, CLOSE_POLICY_VIOLATION)
+                    break
+                if not isinstance(request, dict):
+                    self._enqueue(client, encode({"type": "error", "detail": "Messages must be JSON objects"}))
+                    continue
+                action = request.get("action")
+                topics = request.get("topics") or []
+                if not isinstance(topics, list) or not all(isinstance(name, str) for name in topics):
+                    self._enqueue(client, encode({"type": "error", "detail": "topics must be a list of topic names"}))
+                    continue
+                if action == "subscribe":
+                    accepted = self.subscribe(client, topics)
+                    self._enqueue(client, encode({"type": "subscribed", "topics": accepted,
+                                                  "rejected": [name for name in topics if name not in accepted]}))
+                elif action == "unsubscribe":
+                    self.unsubscribe(client, topics)
+                    self._enqueue(client, encode({"type": "unsubscribed", "topics": topics}))
+                elif action == "ping":
+                    self._enqueue(client, encode({"type": "pong"}))
+                else:
+                    self._enqueue(client, encode({"type": "error", "detail": f"Unknown action: {action}"}))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._detach(client)
+            sender.cancel()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self.clients),
+            "topics": {
+                name: {"subscribers": len(topic.subscribers), "seq": topic.sequence,
+                       "last_compute_ms": topic.last_duration_ms}
+                for name, topic in self.topics.items()
+            },
+            **self._stats,
+        }
+
+
+live_hub = LiveHub()
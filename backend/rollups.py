@@ -0,0 +1,279 @@
+"""
+Pre-aggregated gaming revenue rollups.
+
+Completed gaming sessions are folded into hourly and daily buckets keyed by
+game type, member tier and table/machine, so revenue dashboards read a few
+hundred bucket documents instead of scanning every session. An all-time
+bucket per key (``granularity: "all"``) carries the running totals, so
+all-history figures such as top games do not read every daily bucket either.
+
+The completion route flips a session to ``completed`` and stamps it with
+``rollup_pending`` in one write, then applies the bucket increments and
+clears the stamp. Without a transaction the two writes can be split by a
+failure, so a reconciler folds in sessions whose stamp is older than
+ROLLUP_RECONCILE_GRACE_SECONDS, and a backfill clears the stamps of the
+sessions it recomputed.
+
+Usage:
+    python rollups.py backfill [--since YYYY-MM-DD]   # rebuild buckets from gaming_sessions
+    python rollups.py reconcile                       # fold in completed sessions still pending
+"""
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, IndexModel, UpdateOne
+
+from database import db, MONGO_REPORT_MAX_TIME_MS
+
+ROLLUP_COLLECTION = "gaming_revenue_rollups"
+ROLLUP_GRANULARITIES = ("hour", "day")  # Rebuilt from gaming_sessions by the backfill
+ALL_TIME = "all"  # Rebuilt from the daily buckets
+ALL_TIME_BUCKET = datetime(1970, 1, 1)
+ROLLUP_KEY_FIELDS = ("granularity", "bucket", "game_type", "tier", "table_number", "machine_number")
+ROLLUP_MEASURES = ("buy_in_amount", "cash_out_amount", "net_result", "points_earned")
+ROLLUP_PENDING_FIELD = "rollup_pending"  # On gaming_sessions: when the session was completed, until it is folded in
+
+ROLLUP_RECONCILE_SECONDS = float(os.getenv("ROLLUP_RECONCILE_SECONDS", "60"))
+ROLLUP_RECONCILE_GRACE_SECONDS = float(os.getenv("ROLLUP_RECONCILE_GRACE_SECONDS", "60"))  # Leave in-flight requests alone
+
+# The backfill's $merge joins on these fields and needs this index to exist first
+ROLLUP_KEY_INDEX = IndexModel(
+    [(field, ASCENDING) for field in ROLLUP_KEY_FIELDS], name="rollup_key_unique", unique=True, background=True
+)
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """Truncate a timestamp to the start of its hour, day or all-time bucket"""
+    if granularity == ALL_TIME:
+        return ALL_TIME_BUCKET
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def session_rollup_updates(session: Dict[str, Any], tier: Optional[str]) -> List[UpdateOne]:
+    """Bucket increments for one completed gaming session"""
+    net_result = session.get("net_result") or 0
+    increments = {measure: session.get(measure) or 0 for measure in ROLLUP_MEASURES}
+    increments["abs_net_result"] = abs(net_result)
+    increments["sessions"] = 1
+
+    updates = []
+    for granularity in ROLLUP_GRANULARITIES + (ALL_TIME,):
+        key = {
+            "granularity": granularity,
+            "bucket": bucket_start(session["session_start"], granularity),
+            "game_type": session.get("game_type") or "",
+            "tier": tier or "Unknown",
+            "table_number": session.get("table_number") or "",
+            "machine_number": session.get("machine_number") or "",
+        }
+        updates.append(UpdateOne(
+            key,
+            {"$inc": increments, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        ))
+    return updates
+
+
+async def record_completed_session(session: Dict[str, Any], tier: Optional[str], database=db):
+    """Fold a newly completed session into its hour and day buckets, then clear its pending stamp"""
+    await database[ROLLUP_COLLECTION].bulk_write(session_rollup_updates(session, tier), ordered=False)
+    await database.gaming_sessions.update_one({"id": session["id"]}, {"$unset": {ROLLUP_PENDING_FIELD: ""}})
+
+
+async def reconcile_pending_sessions(database=db, grace_seconds: float = ROLLUP_RECONCILE_GRACE_SECONDS) -> int:
+    """Fold in completed sessions whose rollup increments never landed; returns how many"""
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    sessions = await database.gaming_sessions.find(
+        {ROLLUP_PENDING_FIELD: {"$lte": cutoff}, "status": "completed"}, {"_id": 0}
+    ).to_list(None)
+    if not sessions:
+        return 0
+
+    member_ids = list({session["member_id"] for session in sessions})
+    tiers = {
+        member["id"]: member.get("tier")
+        for member in await database.members.find({"id": {"$in": member_ids}}, {"_id": 0, "id": 1, "tier": 1}).to_list(None)
+    }
+    reconciled = 0
+    for session in sessions:
+        # Re-stamping claims the session, so two workers never fold the same one in
+        claimed = await database.gaming_sessions.update_one(
+            {"id": session["id"], ROLLUP_PENDING_FIELD: session[ROLLUP_PENDING_FIELD]},
+            {"$set": {ROLLUP_PENDING_FIELD: datetime.utcnow()}}
+        )
+        if claimed.modified_count == 0:
+            continue
+        await record_completed_session(session, tiers.get(session["member_id"]), database)
+        reconciled += 1
+    logging.warning(f"Folded {reconciled} pending gaming sessions into the revenue rollups")
+    return reconciled
+
+
+async def reconcile_forever(database=db, interval: float = ROLLUP_RECONCILE_SECONDS):
+    """Periodically fold in sessions whose completion request failed after the status flip"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await reconcile_pending_sessions(database)
+        except Exception as e:
+            logging.warning(f"Could not reconcile pending gaming session rollups: {e}")
+
+
+def _bucket_expression(granularity: str) -> Dict[str, Any]:
+    parts = {
+        "year": {"$year": "$session_start"},
+        "month": {"$month": "$session_start"},
+        "day": {"$dayOfMonth": "$session_start"},
+    }
+    if granularity == "hour":
+        parts["hour"] = {"$hour": "$session_start"}
+    return {"$dateFromParts": parts}
+
+
+def backfill_pipeline(granularity: str, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Recompute buckets of one granularity from raw sessions and merge them in place"""
+    match = {"status": "completed"}
+    if since:
+        match["session_start"] = {"$gte": bucket_start(since, "day")}
+
+    group = {
+        "_id": {
+            "bucket": _bucket_expression(granularity),
+            "game_type": {"$ifNull": ["$game_type", ""]},
+            "tier": "$tier",
+            "table_number": {"$ifNull": ["$table_number", ""]},
+            "machine_number": {"$ifNull": ["$machine_number", ""]},
+        },
+        "sessions": {"$sum": 1},
+        "abs_net_result": {"$sum": {"$abs": {"$ifNull": ["$net_result", 0]}}},
+    }
+    for measure in ROLLUP_MEASURES:
+        group[measure] = {"$sum": {"$ifNull": [f"${measure}", 0]}}
+
+    project = {"_id": 0, "granularity": {"$literal": granularity}, "updated_at": "$$NOW"}
+    for field in ROLLUP_KEY_FIELDS[1:]:
+        project[field] = f"$_id.{field}"
+    for measure in ROLLUP_MEASURES + ("abs_net_result", "sessions"):
+        project[measure] = 1
+
+    return [
+        {"$match": match},
+        {"$lookup": {"from": "members", "localField": "member_id", "foreignField": "id", "as": "member"}},
+        {"$addFields": {"tier": {"$ifNull": [{"$arrayElemAt": ["$member.tier", 0]}, "Unknown"]}}},
+        {"$group": group},
+        {"$project": project},
+        _merge_stage(),
+    ]
+
+
+def all_time_pipeline() -> List[Dict[str, Any]]:
+    """Recompute the all-time buckets from the daily buckets and merge them in place"""
+    key_fields = ROLLUP_KEY_FIELDS[2:]
+    measures = ROLLUP_MEASURES + ("abs_net_result", "sessions")
+    group = {"_id": {field: f"${field}" for field in key_fields}}
+    for measure in measures:
+        group[measure] = {"$sum": f"${measure}"}
+
+    project = {
+        "_id": 0,
+        "granularity": {"$literal": ALL_TIME},
+        "bucket": {"$literal": ALL_TIME_BUCKET},
+        "updated_at": "$$NOW",
+    }
+    for field in key_fields:
+        project[field] = f"$_id.{field}"
+    for measure in measures:
+        project[measure] = 1
+
+    return [
+        {"$match": {"granularity": "day"}},
+        {"$group": group},
+        {"$project": project},
+        _merge_stage(),
+    ]
+
+
+def _merge_stage() -> Dict[str, Any]:
+    return {"$merge": {
+        "into": ROLLUP_COLLECTION,
+        "on": list(ROLLUP_KEY_FIELDS),
+        "whenMatched": "replace",
+        "whenNotMatched": "insert"
+    }}
+
+
+async def backfill_rollups(database=db, since: Optional[datetime] = None):
+    """Rebuild rollup buckets from gaming_sessions (all history, or from a date)"""
+    # Not left to the startup index bootstrap: on a fresh database it may not have run (CLI) or finished yet
+    await database[ROLLUP_COLLECTION].create_indexes([ROLLUP_KEY_INDEX])
+    started = datetime.utcnow()
+    sessions = database.gaming_sessions.with_max_time(MONGO_REPORT_MAX_TIME_MS)
+    for granularity in ROLLUP_GRANULARITIES:
+        await sessions.aggregate(backfill_pipeline(granularity, since)).to_list(None)
+    rollups = database[ROLLUP_COLLECTION].with_max_time(MONGO_REPORT_MAX_TIME_MS)
+    await rollups.aggregate(all_time_pipeline()).to_list(None)
+    # Pending sessions completed before the rebuild are now counted from the raw data
+    recomputed = {ROLLUP_PENDING_FIELD: {"$lte": started}, "status": "completed"}
+    if since:
+        recomputed["session_start"] = {"$gte": bucket_start(since, "day")}
+    await database.gaming_sessions.update_many(recomputed, {"$unset": {ROLLUP_PENDING_FIELD: ""}})
+    logging.info(f"Gaming revenue rollups backfilled{' since ' + since.isoformat() if since else ''}")
+
+
+def revenue_dashboard_pipeline(today: datetime, week_start: datetime, month_start: datetime) -> List[Dict[str, Any]]:
+    """Period revenue from this week's and month's daily buckets and all-time top games, in a single pass"""
+    def revenue_since(start: datetime) -> Dict[str, Any]:
+        return {"$sum": {"$cond": [{"$gte": ["$bucket", start]}, "$abs_net_result", 0]}}
+
+    return [
+        {"$match": {"$or": [
+            {"granularity": "day", "bucket": {"$gte": min(week_start, month_start)}},
+            {"granularity": ALL_TIME},
+        ]}},
+        {"$facet": {
+            "totals": [
+                {"$match": {"granularity": "day"}},
+                {"$group": {
+                    "_id": None,
+                    "daily_revenue": revenue_since(today),
+                    "weekly_revenue": revenue_since(week_start),
+                    "monthly_revenue": revenue_since(month_start)
+                }}
+            ],
+            "top_games": [
+                {"$match": {"granularity": ALL_TIME}},
+                {"$group": {"_id": "$game_type", "total_sessions": {"$sum": "$sessions"}, "total_revenue": {"$sum": "$net_result"}}},
+                {"$sort": {"total_sessions": -1}},
+                {"$limit": 5}
+            ]
+        }}
+    ]
+
+
+async def _main(argv: List[str]) -> int:
+    if not argv or argv[0] not in ("backfill", "reconcile"):
+        print(__doc__)
+        return 2
+
+    if argv[0] == "reconcile":
+        reconciled = await reconcile_pending_sessions(db, grace_seconds=0)
+        print(f"gaming_sessions: {reconciled} pending sessions folded in")
+        return 0
+
+    since = None
+    if "--since" in argv:
+        since = datetime.fromisoformat(argv[argv.index("--since") + 1])
+    await backfill_rollups(db, since)
+    count = await db[ROLLUP_COLLECTION].count_documents({})
+    print(f"{ROLLUP_COLLECTION}: {count} buckets")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
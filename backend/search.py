@@ -0,0 +1,239 @@
+"""
+Prefix/trigram search for the member and staff typeahead boxes.
+
+Each searchable document carries small derived arrays, kept up to date
+whenever the document is written:
+
+* ``search_words`` - the normalized tokens themselves, used for ranking;
+* ``search_prefixes`` - every prefix of every normalized token (names, email
+  local part, identifiers), so typeahead is an indexed equality match;
+* ``search_trigrams`` - trigrams of those tokens, used as a fuzzy fallback for
+  infix matches and typos when no prefix matches.
+
+Lookups that look like an identifier (``MB10001``, ``EMP1042``) or an email
+address take an exact-match fast path on the unique field first.
+
+Usage:
+    python search.py backfill    # (re)build the search arrays for members and staff
+"""
+import asyncio
+import math
+import os
+import re
+import sys
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from pymongo import UpdateOne
+
+from database import db
+
+SEARCH_MAX_PREFIX_LENGTH = 12
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "1000"))  # Matches ranked per query
+SEARCH_TRIGRAM_MIN_OVERLAP = 0.5  # Share of the query's trigrams a fuzzy match must contain
+SEARCH_FIELDS = ("search_words", "search_prefixes", "search_trigrams")
+SEARCH_FIELDS_PROJECTION = {field: 0 for field in SEARCH_FIELDS}
+
+_WORD = re.compile(r"[a-z0-9]+")
+_ALPHA_DIGIT = re.compile(r"[a-z]+|[0-9]+")
+
+
+def search_projection(projection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """A projection that never returns the derived search arrays"""
+    if projection and any(value for field, value in projection.items() if field != "_id"):
+        return projection
+    return dict(SEARCH_FIELDS_PROJECTION, **(projection or {}))
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents so 'Gunasékera' and 'gunasekera' match"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """Words of a value; identifiers like 'mb10001' also yield 'mb' and '10001'"""
+    tokens = []
+    for word in _WORD.findall(normalize(text)):
+        tokens.append(word)
+        parts = _ALPHA_DIGIT.findall(word)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def prefixes(token: str) -> List[str]:
+    return [token[:length] for length in range(1, min(len(token), SEARCH_MAX_PREFIX_LENGTH) + 1)]
+
+
+def trigrams(token: str) -> Set[str]:
+    if len(token) < 3:
+        return set()
+    return {token[index:index + 3] for index in range(len(token) - 2)}
+
+
+def _overlap(values: List[str], field: str) -> Dict[str, Any]:
+    """How many of ``values`` appear in an array field (values are [a-z0-9] only, never field paths)"""
+    return {"$size": {"$filter": {"input": values, "cond": {"$in": ["$$this", field]}}}}
+
+
+class SearchIndex:
+    """Search configuration for one collection"""
+
+    def __init__(self, text_fields: Iterable[str], exact_field: str, sort_field: str, email_field: Optional[str] = None):
+        self.text_fields = tuple(text_fields)
+        self.exact_field = exact_field
+        self.sort_field = sort_field
+        self.email_field = email_field
+
+    def _field_tokens(self, document: Dict[str, Any]) -> List[str]:
+        tokens = []
+        for field in self.text_fields:
+            value = document.get(field)
+            if not value:
+                continue
+            if field == self.email_field:
+                value = str(value).split("@", 1)[0]
+            tokens.extend(tokenize(str(value)))
+        return tokens
+
+    def document_fields(self, document: Dict[str, Any]) -> Dict[str, List[str]]:
+        """The derived search arrays for a document; merge into it before insert/update"""
+        word_set: Set[str] = set()
+        prefix_set: Set[str] = set()
+        trigram_set: Set[str] = set()
+        for token in self._field_tokens(document):
+            word_set.add(token[:SEARCH_MAX_PREFIX_LENGTH])
+            prefix_set.update(prefixes(token))
+            trigram_set.update(trigrams(token))
+        return {
+            "search_words": sorted(word_set),
+            "search_prefixes": sorted(prefix_set),
+            "search_trigrams": sorted(trigram_set),
+        }
+
+    def with_search_fields(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        document.update(self.document_fields(document))
+        return document
+
+    async def _exact(self, collection, query: Dict[str, Any], text: str, projection: Dict[str, Any]):
+        candidate = text.strip()
+        if self.email_field and "@" in candidate:
+            return await collection.find_one({**query, self.email_field: candidate.lower()}, projection)
+        if re.fullmatch(r"[A-Za-z]*\d+", candidate):
+            return await collection.find_one({**query, self.exact_field: candidate.upper()}, projection)
+        return None
+
+    async def search(self, collection, query: Dict[str, Any], text: str, skip: int = 0, limit: int = 50,
+                     projection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Ranked search within ``query``; returns the same page shape as ``paginate``.
+
+        At most SEARCH_MAX_CANDIDATES matches are ranked, so very short inputs
+        report a capped total.
+        """
+        projection = search_projection(projection)
+        limit = max(1, limit)
+
+        exact = await self._exact(collection, query, text, projection)
+        if exact is not None:
+            return {"items": [exact], "total": 1, "page": 1, "pages": 1, "next_cursor": None, "prev_cursor": None}
+
+        terms = [term[:SEARCH_MAX_PREFIX_LENGTH] for term in _WORD.findall(normalize(text))]
+        if not terms:
+            return {"items": [], "total": 0, "page": 1, "pages": 0, "next_cursor": None, "prev_cursor": None}
+
+        # Typeahead: every typed word must be a prefix of some token
+        result = await self._ranked(collection, {**query, "search_prefixes": {"$all": terms}}, terms, skip, limit, projection)
+        if result["total"] == 0:
+            # Nothing starts with the input: fall back to trigram similarity (infix matches, typos)
+            query_trigrams = sorted(set().union(*(trigrams(term) for term in terms)))
+            if query_trigrams:
+                min_overlap = max(1, math.ceil(len(query_trigrams) * SEARCH_TRIGRAM_MIN_OVERLAP))
+                result = await self._ranked(
+                    collection, {**query, "search_trigrams": {"$in": query_trigrams}}, terms, skip, limit, projection,
+                    query_trigrams=query_trigrams, min_overlap=min_overlap
+                )
+        return result
+
+    @staticmethod
+    def _output_stage(projection: Dict[str, Any]) -> Dict[str, Any]:
+        if any(value for field, value in projection.items() if field != "_id"):
+            return {"$project": projection}  # Inclusion projection: computed fields are dropped implicitly
+        return {"$project": {**projection, "_score": 0}}
+
+    async def _ranked(self, collection, match: Dict[str, Any], terms: List[str], skip: int, limit: int,
+                      projection: Dict[str, Any], query_trigrams: Optional[List[str]] = None,
+                      min_overlap: int = 0) -> Dict[str, Any]:
+        pipeline: List[Dict[str, Any]] = [{"$match": match}]
+        if query_trigrams:
+            # Fuzzy matches rank by how many of the query's trigrams they contain
+            pipeline += [
+                {"$addFields": {"_score": _overlap(query_trigrams, "$search_trigrams")}},
+                {"$match": {"_score": {"$gte": min_overlap}}},
+                {"$limit": SEARCH_MAX_CANDIDATES},
+            ]
+        else:
+            # Prefix matches: whole-word hits rank above partial words
+            pipeline += [
+                {"$limit": SEARCH_MAX_CANDIDATES},
+                {"$addFields": {"_score": _overlap(terms, "$search_words")}},
+            ]
+        pipeline += [
+            {"$sort": {"_score": -1, self.sort_field: 1, "id": 1}},
+            {"$facet": {
+                "items": [{"$skip": skip}, {"$limit": limit}, self._output_stage(projection)],
+                "total": [{"$count": "count"}]
+            }}
+        ]
+        faceted = await collection.aggregate(pipeline).to_list(None)
+        items = faceted[0]["items"] if faceted else []
+        total = faceted[0]["total"][0]["count"] if faceted and faceted[0]["total"] else 0
+        return {
+            "items": items,
+            "total": total,
+            "page": skip // limit + 1,
+            "pages": (total + limit - 1) // limit,
+            "next_cursor": None,
+            "prev_cursor": None,
+        }
+
+    async def backfill(self, collection, batch_size: int = 1000) -> int:
+        """Recompute the search arrays for every document in a collection"""
+        fields = {field: 1 for field in self.text_fields}
+        updated = 0
+        batch = []
+        async for document in collection.find({}, fields):
+            batch.append(UpdateOne({"_id": document["_id"]}, {"$set": self.document_fields(document)}))
+            if len(batch) >= batch_size:
+                await collection.bulk_write(batch, ordered=False)
+                updated += len(batch)
+                batch = []
+        if batch:
+            await collection.bulk_write(batch, ordered=False)
+            updated += len(batch)
+        return updated
+
+
+MEMBER_SEARCH = SearchIndex(
+    text_fields=("first_name", "last_name", "email", "member_number"),
+    exact_field="member_number", sort_field="member_number", email_field="email"
+)
+STAFF_SEARCH = SearchIndex(
+    text_fields=("first_name", "last_name", "employee_id", "position"),
+    exact_field="employee_id", sort_field="employee_id"
+)
+
+
+async def _main(argv: List[str]) -> int:
+    if not argv or argv[0] != "backfill":
+        print(__doc__)
+        return 2
+
+    for name, index in (("members", MEMBER_SEARCH), ("staff_members", STAFF_SEARCH)):
+        updated = await index.backfill(db[name])
+        print(f"{name}: {updated} documents indexed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
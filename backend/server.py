@@ -1,26 +1,50 @@
 from fastapi import FastAPI, HTTPException, Depends, status, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pymongo import MongoClient
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
 import json
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, EmailStr, Field, validator
-from passlib.context import CryptContext
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter, ValidationError, validator
 from jose import JWTError, jwt
-from cryptography.fernet import Fernet
 import hashlib
 import uuid
 import asyncio
 from bson import ObjectId
+from pymongo.errors import PyMongoError
 import logging
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import re
+from database import db, close_client, command_counter, MONGO_REPORT_MAX_TIME_MS
+from indexes import ensure_indexes
+from cache import catalog_cache, count_cache
+from coalescing import aggregate_cache
+from responses import FastJSONResponse, FastJSONRoute, dumps, json_bytes, serialized
+from audit import assess_risk, audit_writer, risk_fields_expression
+from activity import activity_writer, as_json_array, ACTIVITY_MAX_BODY_BYTES, ACTIVITY_MAX_EVENTS_PER_REQUEST
+from auth import (
+    token_cache, revocation_list, user_profiles, role_allowed, REVOKED_TOKENS_COLLECTION,
+    SUPERADMIN_ROLES, ADMIN_ROLES, MANAGEMENT_ROLES, FLOOR_ROLES
+)
+from passwords import hash_password, verify_password, shutdown_pool as shutdown_password_pool
+from pagination import paginate
+from loaders import Loaders, get_loaders
+from encryption import encrypt_sensitive_data, encrypt_indexed_batch, blind_index, shutdown_pool as shutdown_encryption_pool
+from search import MEMBER_SEARCH, STAFF_SEARCH, SEARCH_FIELDS_PROJECTION
+from projections import FieldSet
+from events import event_bus
+from invalidation import invalidation_watcher
+from realtime import live_hub, CLOSE_POLICY_VIOLATION
+from timeseries import TIME_SERIES_COLLECTIONS, ensure_time_series_collections, apply_retention_ttls
+from rollups import (
+    ROLLUP_COLLECTION, ROLLUP_PENDING_FIELD, record_completed_session, backfill_rollups, reconcile_forever,
+    revenue_dashboard_pipeline
+)
+from jobs import job_runner, JobContext, JOB_STATUS_PROJECTION, REPORT_JOBS_COLLECTION, shutdown_pool as shutdown_job_pool
+from reports import assess_compliance, analytics_findings
 
 load_dotenv()
 
@@ -31,8 +55,11 @@ limiter = Limiter(key_func=get_remote_address)
 app = FastAPI(
     title="Bally's Casino Admin Dashboard API",
     description="Enterprise Casino Management Platform - Sri Lanka Compliant",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
+# Return values are rendered with orjson directly (no jsonable_encoder / response_model re-validation)
+app.router.route_class = FastJSONRoute
 
 # Add rate limiter state
 app.state.limiter = limiter
@@ -51,29 +78,24 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type", "Accept", "Origin"],
 )
 
+@app.middleware("http")
+async def count_database_commands(request: Request, call_next):
+    """Report how many MongoDB commands each request issued"""
+    counter = command_counter.track_request()
+    response = await call_next(request)
+    response.headers["X-DB-Commands"] = str(counter[0])
+    return response
+
 # Security Configuration
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Environment Variables
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
-DATABASE_NAME = os.getenv("DATABASE_NAME", "ballys_casino_admin")
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
-ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
+LOGIN_RATE_LIMIT = os.getenv("LOGIN_RATE_LIMIT", "5/minute")
 
-# Initialize encryption
-if ENCRYPTION_KEY:
-    cipher_suite = Fernet(ENCRYPTION_KEY.encode())
-else:
-    cipher_suite = Fernet(Fernet.generate_key())
-
-# Database connection
-client = MongoClient(MONGO_URL)
-db = client[DATABASE_NAME]
-
-# Collections
+# Collections (async, see database.py)
 admin_users_col = db.admin_users
 members_col = db.members
 gaming_sessions_col = db.gaming_sessions
@@ -108,6 +130,8 @@ system_integrations_col = db.system_integrations
 user_activity_tracking_col = db.user_activity_tracking
 real_time_events_col = db.real_time_events
 data_retention_policies_col = db.data_retention_policies
+gaming_revenue_rollups_col = db[ROLLUP_COLLECTION]
+report_jobs_col = db[REPORT_JOBS_COLLECTION]
 
 # Pydantic Models
 class AdminUser(BaseModel):
@@ -122,6 +146,7 @@ class AdminUser(BaseModel):
     last_login: Optional[datetime] = None
     permissions: List[str] = []
     two_factor_enabled: bool = False
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class AdminUserCreate(BaseModel):
     username: str
@@ -142,6 +167,7 @@ class Member(BaseModel):
     date_of_birth: datetime
     nationality: str
     nic_passport: str  # Encrypted
+    nic_passport_bidx: Optional[str] = None  # Blind index for exact lookups (see encryption.py)
     tier: str  # Ruby, Sapphire, Diamond, VIP
     points_balance: float = 0.0
     total_points_earned: float = 0.0
@@ -168,6 +194,11 @@ class GamingSession(BaseModel):
     points_earned: float = 0.0
     status: str = "active"  # active, completed, suspended
 
+class GamingSessionCompletion(BaseModel):
+    cash_out_amount: float
+    points_earned: Optional[float] = None
+    session_end: Optional[datetime] = None
+
 class GamingPackage(BaseModel):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -178,6 +209,7 @@ class GamingPackage(BaseModel):
     tier_access: List[str] = ["Ruby", "Sapphire", "Diamond", "VIP"]
     is_active: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class RewardItem(BaseModel):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -190,6 +222,7 @@ class RewardItem(BaseModel):
     stock_quantity: Optional[int] = None
     is_active: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class AuditLog(BaseModel):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -202,6 +235,16 @@ class AuditLog(BaseModel):
     details: Dict[str, Any] = {}
     ip_address: Optional[str] = None
     user_agent: Optional[str] = None
+    risk_score: int = 0  # Scored at write time by audit.assess_risk
+    risk_level: str = "low"
+
+class ReportJobRequest(BaseModel):
+    type: str  # compliance_report, analytics_report
+    params: Dict[str, Any] = {}  # Same body as the matching /generate route
+
+class IdentityLookupRequest(BaseModel):
+    document_number: str = Field(..., min_length=3, max_length=50)  # NIC or passport number, plaintext
+    include_walk_in_guests: bool = True
 
 class LoginRequest(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
@@ -279,6 +322,7 @@ class WalkInGuest(BaseModel):
     email: Optional[str] = None
     nationality: str
     id_document: str  # encrypted
+    id_document_bidx: Optional[str] = None  # Blind index for exact lookups (see encryption.py)
     visit_date: datetime = Field(default_factory=datetime.utcnow)
     entry_time: datetime = Field(default_factory=datetime.utcnow)
     exit_time: Optional[datetime] = None
@@ -427,7 +471,7 @@ class UserActivityTracking(BaseModel):
     duration_seconds: Optional[int] = None
     device_type: str  # desktop, mobile, tablet
     browser: Optional[str] = None
-    ip_address: str
+    ip_address: Optional[str] = None  # Set from the request on ingestion
     location: Optional[Dict[str, Any]] = None  # city, country, coordinates
     referrer: Optional[str] = None
     metadata: Dict[str, Any] = {}
@@ -455,7 +499,7 @@ class RealTimeEvent(BaseModel):
 class DataRetentionPolicy(BaseModel):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
     policy_name: str
-    data_category: str  # member_data, gaming_logs, audit_logs, marketing_data
+    data_category: str  # member_data, gaming_logs, audit_logs, marketing_data, system_events, user_activity
     retention_period_days: int
     archive_after_days: Optional[int] = None
     auto_delete: bool = False
@@ -494,6 +538,7 @@ class StaffMember(BaseModel):
     emergency_contact: Dict[str, str] = {}
     created_at: datetime = Field(default_factory=datetime.utcnow)
     last_updated: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class TrainingCourse(BaseModel):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -513,6 +558,7 @@ class TrainingCourse(BaseModel):
     is_active: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
     last_updated: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class TrainingRecord(BaseModel):
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -602,34 +648,9 @@ class PredictiveModel(BaseModel):
     success_rate: float = 0.0
     created_by: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 # Utility Functions
-def encrypt_sensitive_data(data: str) -> str:
-    """Encrypt sensitive personal data for PDPA compliance"""
-    try:
-        if not data or not isinstance(data, str):
-            logging.warning("Invalid data provided for encryption")
-            return ""
-        return cipher_suite.encrypt(data.encode()).decode()
-    except Exception as e:
-        logging.error(f"Encryption error: {e}")
-        # CRITICAL: Never return unencrypted data
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Data encryption failed"
-        )
-
-def decrypt_sensitive_data(encrypted_data: str) -> str:
-    """Decrypt sensitive personal data"""
-    try:
-        if not encrypted_data or not isinstance(encrypted_data, str):
-            return ""
-        return cipher_suite.decrypt(encrypted_data.encode()).decode()
-    except Exception as e:
-        logging.error(f"Decryption error: {e}")
-        # Return placeholder instead of potentially corrupted data
-        return "[ENCRYPTED_DATA]"
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -637,30 +658,43 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+def authenticate_token(token: str) -> dict:
+    """Decode and check a bearer token; shared by HTTP routes and the live WebSocket"""
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        except JWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials"
+            )
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials"
             )
-        return payload
-    except JWTError:
+        token_cache.set(token, payload)
+    
+    if revocation_list.is_revoked(payload.get("jti")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials"
+            detail="Token has been revoked"
         )
+    return payload
+
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return authenticate_token(credentials.credentials)
 
 async def log_admin_action(admin_user_id: str, admin_username: str, action: str, 
                           resource: str, resource_id: str = None, details: dict = None,
                           ip_address: str = None):
-    """Log admin actions for audit trail"""
+    """Queue an admin action for the audit trail (written in batches by audit_writer)"""
     audit_log = AuditLog(
         admin_user_id=admin_user_id,
         admin_username=admin_username,
@@ -668,13 +702,35 @@ async def log_admin_action(admin_user_id: str, admin_username: str, action: str,
         resource=resource,
         resource_id=resource_id,
         details=details or {},
-        ip_address=ip_address
+        ip_address=ip_address,
+        **assess_risk(action, resource, details or {})
     )
-    audit_logs_col.insert_one(audit_log.dict())
+    audit_writer.enqueue(audit_log.dict())
+
+def job_submitter(token_payload: dict) -> Dict[str, Any]:
+    """Who a background job acts for; handlers log admin actions under this user"""
+    return {"user_id": token_payload["user_id"], "username": token_payload["sub"]}
+
+def dashboard_members_pipeline(today: datetime) -> List[Dict[str, Any]]:
+    """Member counts by tier plus today's registrations in a single pass"""
+    return [
+        {"$match": {"$or": [{"is_active": True}, {"registration_date": {"$gte": today}}]}},
+        {"$project": {"_id": 0, "tier": 1, "is_active": 1, "registration_date": 1}},
+        {"$facet": {
+            "by_tier": [
+                {"$match": {"is_active": True}},
+                {"$group": {"_id": "$tier", "count": {"$sum": 1}}}
+            ],
+            "recent_registrations": [
+                {"$match": {"registration_date": {"$gte": today}}},
+                {"$count": "count"}
+            ]
+        }}
+    ]
 
 # Authentication Routes
 @app.post("/api/auth/login", response_model=TokenResponse)
-@limiter.limit("5/minute")
+@limiter.limit(LOGIN_RATE_LIMIT)
 async def login(request: Request, login_request: LoginRequest):
     """Admin user login with role-based access and rate limiting"""
     
@@ -685,9 +741,12 @@ async def login(request: Request, login_request: LoginRequest):
             detail="Invalid characters in username"
         )
     
-    admin_user = admin_users_col.find_one({"username": login_request.username})
+    admin_user = await admin_users_col.find_one({"username": login_request.username})
+    password_valid, upgraded_hash = await verify_password(
+        login_request.password, admin_user["password_hash"] if admin_user else None
+    )
     
-    if not admin_user or not pwd_context.verify(login_request.password, admin_user["password_hash"]):
+    if not admin_user or not password_valid:
         # Log failed login attempt
         logging.warning(f"Failed login attempt for username: {login_request.username} from IP: {request.client.host}")
         raise HTTPException(
@@ -701,11 +760,16 @@ async def login(request: Request, login_request: LoginRequest):
             detail="Account is deactivated"
         )
     
-    # Update last login
-    admin_users_col.update_one(
+    # Update last login, upgrading the stored hash if the bcrypt cost factor changed
+    now = datetime.utcnow()
+    login_update = {"last_login": now, "updated_at": now}
+    if upgraded_hash:
+        login_update["password_hash"] = upgraded_hash
+    await admin_users_col.update_one(
         {"_id": admin_user["_id"]},
-        {"$set": {"last_login": datetime.utcnow()}}
+        {"$set": login_update}
     )
+    user_profiles.remember({**admin_user, **login_update})
     
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -744,106 +808,102 @@ async def login(request: Request, login_request: LoginRequest):
 
 @app.get("/api/auth/me")
 async def get_current_user(token_payload: dict = Depends(verify_token)):
-    """Get current admin user info"""
-    admin_user = admin_users_col.find_one({"username": token_payload["sub"]})
+    """Get current admin user info (served from the profile captured at login)"""
+    profile = user_profiles.get(token_payload["sub"])
+    if profile is not None:
+        return profile
+    
+    admin_user = await admin_users_col.find_one({"username": token_payload["sub"]})
     if not admin_user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return {
-        "id": admin_user["id"],
-        "username": admin_user["username"],
-        "full_name": admin_user["full_name"],
-        "role": admin_user["role"],
-        "permissions": admin_user.get("permissions", []),
-        "last_login": admin_user.get("last_login")
-    }
+    return user_profiles.remember(admin_user)
 
-# Dashboard Routes
-@app.get("/api/dashboard/metrics", response_model=DashboardMetrics)
-async def get_dashboard_metrics(token_payload: dict = Depends(verify_token)):
-    """Get real-time dashboard metrics"""
+@app.post("/api/auth/logout")
+async def logout(token_payload: dict = Depends(verify_token)):
+    """Revoke the current access token"""
+    if token_payload.get("jti"):
+        await revocation_list.revoke(token_payload["jti"], token_payload["exp"])
     
-    # Total members
-    total_members = members_col.count_documents({"is_active": True})
-    
-    # Members by tier
-    members_by_tier = {}
-    for tier in ["Ruby", "Sapphire", "Diamond", "VIP"]:
-        count = members_col.count_documents({"tier": tier, "is_active": True})
-        members_by_tier[tier] = count
-    
-    # Active gaming sessions
-    active_sessions = gaming_sessions_col.count_documents({"status": "active"})
+    await log_admin_action(
+        token_payload.get("user_id", ""), token_payload["sub"],
+        "logout", "auth"
+    )
     
-    # Revenue calculations
+    return {"message": "Logged out successfully"}
+
+# Dashboard Routes
+async def compute_dashboard_metrics() -> DashboardMetrics:
+    """Dashboard figures, shared by the REST route and the live dashboard topic"""
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
     week_start = today - timedelta(days=today.weekday())
     month_start = today.replace(day=1)
     
-    # Daily revenue from completed sessions
-    daily_sessions = gaming_sessions_col.find({
-        "session_start": {"$gte": today},
-        "status": "completed",
-        "net_result": {"$exists": True}
-    })
-    daily_revenue = sum(abs(session.get("net_result", 0)) for session in daily_sessions)
+    # One aggregation per collection, run concurrently; revenue reads the daily rollup buckets
+    members_result, revenue_result, active_sessions = await asyncio.gather(
+        members_col.aggregate(dashboard_members_pipeline(today)).to_list(None),
+        gaming_revenue_rollups_col.aggregate(revenue_dashboard_pipeline(today, week_start, month_start)).to_list(None),
+        gaming_sessions_col.count_documents({"status": "active"})
+    )
+    members_facets = members_result[0] if members_result else {}
+    revenue_facets = revenue_result[0] if revenue_result else {}
     
-    # Weekly revenue
-    weekly_sessions = gaming_sessions_col.find({
-        "session_start": {"$gte": week_start},
-        "status": "completed",
-        "net_result": {"$exists": True}
-    })
-    weekly_revenue = sum(abs(session.get("net_result", 0)) for session in weekly_sessions)
+    # Members by tier
+    tier_counts = {row["_id"]: row["count"] for row in members_facets.get("by_tier", [])}
+    members_by_tier = {tier: tier_counts.get(tier, 0) for tier in ["Ruby", "Sapphire", "Diamond", "VIP"]}
+    recent = members_facets.get("recent_registrations", [])
     
-    # Monthly revenue
-    monthly_sessions = gaming_sessions_col.find({
-        "session_start": {"$gte": month_start},
-        "status": "completed",
-        "net_result": {"$exists": True}
-    })
-    monthly_revenue = sum(abs(session.get("net_result", 0)) for session in monthly_sessions)
-    
-    # Top games
-    pipeline = [
-        {"$match": {"status": "completed"}},
-        {"$group": {"_id": "$game_type", "total_sessions": {"$sum": 1}, "total_revenue": {"$sum": "$net_result"}}},
-        {"$sort": {"total_sessions": -1}},
-        {"$limit": 5}
-    ]
-    top_games_cursor = gaming_sessions_col.aggregate(pipeline)
+    totals = (revenue_facets.get("totals") or [{}])[0]
     top_games = [
         {
             "game_type": game["_id"],
             "sessions": game["total_sessions"],
             "revenue": abs(game["total_revenue"]) if game["total_revenue"] else 0
         }
-        for game in top_games_cursor
+        for game in revenue_facets.get("top_games", [])
     ]
     
-    # Recent registrations (last 24 hours)
-    recent_registrations = members_col.count_documents({
-        "registration_date": {"$gte": today}
-    })
-    
     return DashboardMetrics(
-        total_members=total_members,
+        total_members=sum(tier_counts.values()),
         members_by_tier=members_by_tier,
         active_sessions=active_sessions,
-        daily_revenue=daily_revenue,
-        weekly_revenue=weekly_revenue,
-        monthly_revenue=monthly_revenue,
+        daily_revenue=totals.get("daily_revenue", 0),
+        weekly_revenue=totals.get("weekly_revenue", 0),
+        monthly_revenue=totals.get("monthly_revenue", 0),
         top_games=top_games,
-        recent_registrations=recent_registrations
+        recent_registrations=recent[0]["count"] if recent else 0
     )
 
+@app.get("/api/dashboard/metrics", response_model=DashboardMetrics)
+async def get_dashboard_metrics(token_payload: dict = Depends(verify_token)):
+    """Get real-time dashboard metrics"""
+    body = await aggregate_cache.get_or_compute(
+        aggregate_cache.key("dashboard_metrics", token_payload.get("role")), serialized(compute_dashboard_metrics)
+    )
+    return json_bytes(body)
+
 # Member Management Routes
+# Never returned by any member route; reads that return whole documents use MEMBER_PROJECTION
+MEMBER_HIDDEN_FIELDS = ("nic_passport_bidx",)
+MEMBER_PROJECTION = dict(SEARCH_FIELDS_PROJECTION, _id=0, **{field: 0 for field in MEMBER_HIDDEN_FIELDS})
+
+MEMBER_LIST_FIELDS = FieldSet.for_model(
+    Member,
+    default=("member_number", "first_name", "last_name", "email", "phone", "tier", "points_balance",
+             "lifetime_spend", "registration_date", "last_visit", "is_active", "self_excluded", "kyc_verified"),
+    required=("id", "member_number"),
+    hidden=MEMBER_HIDDEN_FIELDS
+)
+
 @app.get("/api/members")
 async def get_members(
     skip: int = 0, 
     limit: int = 50, 
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     tier: Optional[str] = None,
     search: Optional[str] = None,
+    fields: Optional[str] = None,
     token_payload: dict = Depends(verify_token)
 ):
     """Get paginated list of members with search and filter"""
@@ -852,40 +912,31 @@ async def get_members(
     if tier:
         query["tier"] = tier
     
+    projection = MEMBER_LIST_FIELDS.projection(fields)
     if search:
-        query["$or"] = [
-            {"first_name": {"$regex": search, "$options": "i"}},
-            {"last_name": {"$regex": search, "$options": "i"}},
-            {"email": {"$regex": search, "$options": "i"}},
-            {"member_number": {"$regex": search, "$options": "i"}}
-        ]
-    
-    members = list(members_col.find(query).skip(skip).limit(limit))
-    total = members_col.count_documents(query)
+        # Ranked prefix/trigram search (see search.py)
+        page = await MEMBER_SEARCH.search(members_col, query, search, skip=skip, limit=limit, projection=projection)
+    else:
+        page = await paginate(members_col, query, "member_number", 1, skip=skip, limit=limit, cursor=cursor,
+                              projection=projection, include_total=include_total)
+    members = page.pop("items")
     
-    # Remove sensitive data and decrypt necessary fields for display
     for member in members:
-        member.pop("_id", None)
-        # Decrypt sensitive fields for authorized viewing
         if member.get("nic_passport"):
             member["nic_passport"] = "***ENCRYPTED***"  # Show as encrypted to maintain privacy
     
     return {
         "members": members,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
+        **page
     }
 
 @app.get("/api/members/{member_id}")
 async def get_member(member_id: str, token_payload: dict = Depends(verify_token)):
     """Get detailed member information"""
-    member = members_col.find_one({"id": member_id})
+    member = await members_col.find_one({"id": member_id}, MEMBER_PROJECTION)
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
     
-    member.pop("_id", None)
-    
     # Log member access for audit trail
     await log_admin_action(
         token_payload["user_id"], token_payload["sub"],
@@ -895,53 +946,145 @@ async def get_member(member_id: str, token_payload: dict = Depends(verify_token)
     
     return member
 
+@app.post("/api/members/lookup")
+async def lookup_by_identity_document(lookup: IdentityLookupRequest, token_payload: dict = Depends(verify_token)):
+    """Find members and walk-in guests by NIC/passport number via blind indexes (no decryption)"""
+    if not role_allowed(token_payload, FLOOR_ROLES):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    member_query = members_col.find(
+        {"nic_passport_bidx": blind_index("nic_passport", lookup.document_number)},
+        {"_id": 0, "id": 1, "member_number": 1, "first_name": 1, "last_name": 1, "tier": 1,
+         "is_active": 1, "self_excluded": 1}
+    ).to_list(None)
+    if lookup.include_walk_in_guests:
+        guest_query = walk_in_guests_col.find(
+            {"id_document_bidx": blind_index("id_document", lookup.document_number)},
+            {"_id": 0, "id": 1, "first_name": 1, "last_name": 1, "visit_date": 1, "converted_to_member": 1}
+        ).sort("visit_date", -1).to_list(None)
+        members, guests = await asyncio.gather(member_query, guest_query)
+    else:
+        members, guests = await member_query, []
+    
+    # The document number itself is never written to the audit trail
+    await log_admin_action(
+        token_payload["user_id"], token_payload["sub"],
+        "lookup", "member_identity",
+        details={"members_found": len(members), "walk_in_guests_found": len(guests)}
+    )
+    
+    return {
+        "found": bool(members or guests),
+        "members": members,
+        "walk_in_guests": guests
+    }
+
 # Gaming Management Routes
 @app.get("/api/gaming/sessions")
 async def get_gaming_sessions(
     skip: int = 0, 
     limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     status: Optional[str] = None,
-    token_payload: dict = Depends(verify_token)
+    token_payload: dict = Depends(verify_token),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get gaming sessions with pagination"""
     query = {}
     if status:
         query["status"] = status
     
-    sessions = list(gaming_sessions_col.find(query).sort("session_start", -1).skip(skip).limit(limit))
-    total = gaming_sessions_col.count_documents(query)
+    page = await paginate(gaming_sessions_col, query, "session_start", -1, skip=skip, limit=limit, cursor=cursor,
+                          include_total=include_total)
+    sessions = page.pop("items")
     
-    for session in sessions:
+    # Add member name for display
+    members = await loaders.members.load_many([session["member_id"] for session in sessions])
+    for session, member in zip(sessions, members):
         session.pop("_id", None)
-        # Add member name for display
-        member = members_col.find_one({"id": session["member_id"]})
         if member:
             session["member_name"] = f"{member['first_name']} {member['last_name']}"
     
     return {
         "sessions": sessions,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
+        **page
     }
 
+@app.post("/api/gaming/sessions/{session_id}/complete")
+async def complete_gaming_session(
+    session_id: str,
+    completion: GamingSessionCompletion,
+    token_payload: dict = Depends(verify_token)
+):
+    """Close an active gaming session and fold it into the revenue rollups"""
+    if not role_allowed(token_payload, FLOOR_ROLES):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    session = await gaming_sessions_col.find_one({"id": session_id})
+    if not session:
+        raise HTTPException(status_code=404, detail="Gaming session not found")
+    
+    update_data = {
+        "session_end": completion.session_end or datetime.utcnow(),
+        "cash_out_amount": completion.cash_out_amount,
+        "net_result": round(completion.cash_out_amount - session["buy_in_amount"], 2),
+        "status": "completed"
+    }
+    if completion.points_earned is not None:
+        update_data["points_earned"] = completion.points_earned
+    
+    # Only the request that flips the status from active may update the rollups; the pending stamp
+    # is set in the same write, so a failure below leaves the session for the rollup reconciler
+    result = await gaming_sessions_col.update_one(
+        {"id": session_id, "status": "active"},
+        {"$set": {**update_data, ROLLUP_PENDING_FIELD: datetime.utcnow()}}
+    )
+    if result.modified_count == 0:
+        raise HTTPException(status_code=409, detail="Gaming session is not active")
+    
+    session.update(update_data)
+    try:
+        member = await members_col.find_one({"id": session["member_id"]}, {"tier": 1})
+        await record_completed_session(session, member.get("tier") if member else None)
+    except PyMongoError as e:
+        logging.error(f"Gaming session {session_id} completed but not yet in the revenue rollups: {e}")
+    await event_bus.publish("gaming_sessions.completed", session)
+    
+    await log_admin_action(
+        token_payload["user_id"], token_payload["sub"],
+        "update", "gaming_session", session_id,
+        details={"status": "completed", "net_result": update_data["net_result"]}
+    )
+    
+    return {"id": session_id, "net_result": update_data["net_result"], "message": "Gaming session completed successfully"}
+
 @app.get("/api/gaming/packages")
 async def get_gaming_packages(token_payload: dict = Depends(verify_token)):
     """Get all gaming packages"""
-    packages = list(gaming_packages_col.find({"is_active": True}))
+    cache_key = catalog_cache.key("gaming_packages", "/api/gaming/packages", token_payload["role"])
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return json_bytes(cached)
+    
+    packages = await gaming_packages_col.find({"is_active": True}).to_list(None)
     for package in packages:
         package.pop("_id", None)
-    return packages
+    
+    body = dumps(packages)
+    catalog_cache.set(cache_key, body)
+    return json_bytes(body)
 
 @app.post("/api/gaming/packages")
 async def create_gaming_package(package: GamingPackage, token_payload: dict = Depends(verify_token)):
     """Create new gaming package"""
     # Check permissions (only managers and above can create packages)
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin", "Manager"]:
+    if not role_allowed(token_payload, MANAGEMENT_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     package_dict = package.dict()
-    result = gaming_packages_col.insert_one(package_dict)
+    result = await gaming_packages_col.insert_one(package_dict)
+    await event_bus.publish("gaming_packages.created", package_dict)
     
     # Log package creation
     await log_admin_action(
@@ -957,11 +1100,22 @@ async def create_gaming_package(package: GamingPackage, token_payload: dict = De
 async def get_rewards(
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     category: Optional[str] = None,
     tier_access: Optional[str] = None,
     token_payload: dict = Depends(verify_token)
 ):
     """Get rewards catalog with pagination and filtering"""
+    cache_key = catalog_cache.key(
+        "rewards", "/api/rewards", token_payload["role"],
+        skip=skip, limit=limit, cursor=cursor, include_total=include_total, category=category,
+        tier_access=tier_access
+    )
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return json_bytes(cached)
+    
     query = {"is_active": True}
     
     if category:
@@ -970,23 +1124,25 @@ async def get_rewards(
     if tier_access:
         query["tier_access"] = {"$in": [tier_access]}
     
-    rewards = list(rewards_col.find(query).skip(skip).limit(limit))
-    total = rewards_col.count_documents(query)
+    page = await paginate(rewards_col, query, "points_required", 1, skip=skip, limit=limit, cursor=cursor,
+                          include_total=include_total)
+    rewards = page.pop("items")
     
     for reward in rewards:
         reward.pop("_id", None)
     
-    return {
+    response = {
         "rewards": rewards,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
+        **page
     }
+    body = dumps(response)
+    catalog_cache.set(cache_key, body)
+    return json_bytes(body)
 
 @app.get("/api/rewards/{reward_id}")
 async def get_reward(reward_id: str, token_payload: dict = Depends(verify_token)):
     """Get detailed reward information"""
-    reward = rewards_col.find_one({"id": reward_id})
+    reward = await rewards_col.find_one({"id": reward_id})
     if not reward:
         raise HTTPException(status_code=404, detail="Reward not found")
     
@@ -1005,11 +1161,12 @@ async def get_reward(reward_id: str, token_payload: dict = Depends(verify_token)
 async def create_reward(reward: RewardItem, token_payload: dict = Depends(verify_token)):
     """Create new reward item"""
     # Check permissions (only managers and above can create rewards)
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin", "Manager"]:
+    if not role_allowed(token_payload, MANAGEMENT_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     reward_dict = reward.dict()
-    result = rewards_col.insert_one(reward_dict)
+    result = await rewards_col.insert_one(reward_dict)
+    await event_bus.publish("rewards.created", reward_dict)
     
     # Log reward creation
     await log_admin_action(
@@ -1023,39 +1180,38 @@ async def create_reward(reward: RewardItem, token_payload: dict = Depends(verify
 # Phase 2 Routes - Marketing Intelligence & Travel Management
 
 # Marketing Intelligence Routes
-@app.get("/api/marketing/dashboard")
-async def get_marketing_dashboard(token_payload: dict = Depends(verify_token)):
-    """Get marketing intelligence dashboard data"""
+async def compute_marketing_dashboard() -> Dict[str, Any]:
+    """Marketing dashboard figures; shared by concurrent requests through aggregate_cache"""
     
     # Birthday members this month
     current_month = datetime.utcnow().month
-    birthday_members = list(birthday_calendar_col.find({
+    birthday_members = await birthday_calendar_col.find({
         "birth_month": current_month,
         "notification_sent": False
-    }).limit(10))
+    }).limit(10).to_list(None)
     
     # Inactive members (no visit in 30 days)
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    inactive_members = list(members_col.find({
+    inactive_members = await members_col.find({
         "last_visit": {"$lt": thirty_days_ago},
         "is_active": True
-    }).limit(20))
+    }).limit(20).to_list(None)
     
     # Walk-in guests today
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    walk_in_today = list(walk_in_guests_col.find({
+    walk_in_today = await walk_in_guests_col.find({
         "visit_date": {"$gte": today}
-    }))
+    }).to_list(None)
     
     # Marketing campaigns
-    active_campaigns = list(marketing_campaigns_col.find({
+    active_campaigns = await marketing_campaigns_col.find({
         "status": "active"
-    }))
+    }).to_list(None)
     
     # Customer segments analysis
     segments = {}
     for tier in ["Ruby", "Sapphire", "Diamond", "VIP"]:
-        count = members_col.count_documents({"tier": tier, "is_active": True})
+        count = await members_col.count_documents({"tier": tier, "is_active": True})
         segments[tier] = count
     
     return {
@@ -1071,11 +1227,21 @@ async def get_marketing_dashboard(token_payload: dict = Depends(verify_token)):
         "customer_segments": segments
     }
 
+@app.get("/api/marketing/dashboard")
+async def get_marketing_dashboard(token_payload: dict = Depends(verify_token)):
+    """Get marketing intelligence dashboard data"""
+    body = await aggregate_cache.get_or_compute(
+        aggregate_cache.key("marketing_dashboard", token_payload.get("role")), serialized(compute_marketing_dashboard)
+    )
+    return json_bytes(body)
+
 @app.get("/api/marketing/birthday-calendar")
 async def get_birthday_calendar(
     month: Optional[int] = None,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     token_payload: dict = Depends(verify_token)
 ):
     """Get birthday calendar for marketing campaigns"""
@@ -1083,17 +1249,16 @@ async def get_birthday_calendar(
     if month:
         query["birth_month"] = month
     
-    birthdays = list(birthday_calendar_col.find(query).skip(skip).limit(limit))
-    total = birthday_calendar_col.count_documents(query)
+    page = await paginate(birthday_calendar_col, query, "birth_day", 1, skip=skip, limit=limit, cursor=cursor,
+                          include_total=include_total)
+    birthdays = page.pop("items")
     
     for birthday in birthdays:
         birthday.pop("_id", None)
     
     return {
         "birthdays": birthdays,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
+        **page
     }
 
 @app.get("/api/marketing/inactive-customers")
@@ -1101,7 +1266,10 @@ async def get_inactive_customers(
     days: int = 30,
     skip: int = 0,
     limit: int = 50,
-    token_payload: dict = Depends(verify_token)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    token_payload: dict = Depends(verify_token),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get inactive customers for re-engagement campaigns"""
     cutoff_date = datetime.utcnow() - timedelta(days=days)
@@ -1111,13 +1279,13 @@ async def get_inactive_customers(
         "is_active": True
     }
     
-    inactive_members = list(members_col.find(query).skip(skip).limit(limit))
-    total = members_col.count_documents(query)
+    page = await paginate(members_col, query, "last_visit", 1, skip=skip, limit=limit, cursor=cursor,
+                          projection=MEMBER_PROJECTION, include_total=include_total)
+    inactive_members = page.pop("items")
     
     # Add analytics data
-    for member in inactive_members:
-        member.pop("_id", None)
-        analytics = customer_analytics_col.find_one({"member_id": member["id"]})
+    analytics_rows = await loaders.customer_analytics.load_many([member["id"] for member in inactive_members])
+    for member, analytics in zip(inactive_members, analytics_rows):
         if analytics:
             member["risk_score"] = analytics.get("risk_score", 0.5)
             member["avg_spend"] = analytics.get("avg_spend_per_visit", 0)
@@ -1125,9 +1293,7 @@ async def get_inactive_customers(
     
     return {
         "inactive_members": inactive_members,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
+        **page
     }
 
 @app.get("/api/marketing/walk-in-guests")
@@ -1135,6 +1301,8 @@ async def get_walk_in_guests(
     date: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     token_payload: dict = Depends(verify_token)
 ):
     """Get walk-in guests data"""
@@ -1146,29 +1314,30 @@ async def get_walk_in_guests(
             "$lt": target_date.replace(hour=23, minute=59, second=59, microsecond=999999)
         }
     
-    guests = list(walk_in_guests_col.find(query).skip(skip).limit(limit))
-    total = walk_in_guests_col.count_documents(query)
+    page = await paginate(walk_in_guests_col, query, "visit_date", -1, skip=skip, limit=limit, cursor=cursor,
+                          include_total=include_total)
+    guests = page.pop("items")
     
     for guest in guests:
         guest.pop("_id", None)
         guest["id_document"] = "***ENCRYPTED***"  # Hide sensitive data
+        guest.pop("id_document_bidx", None)
     
     return {
         "guests": guests,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
+        **page
     }
 
 @app.post("/api/marketing/campaigns")
 async def create_marketing_campaign(campaign: MarketingCampaign, token_payload: dict = Depends(verify_token)):
     """Create a new marketing campaign"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin", "Manager"]:
+    if not role_allowed(token_payload, MANAGEMENT_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     campaign.created_by = token_payload["user_id"]
     campaign_dict = campaign.dict()
-    result = marketing_campaigns_col.insert_one(campaign_dict)
+    result = await marketing_campaigns_col.insert_one(campaign_dict)
+    await event_bus.publish("marketing_campaigns.created", campaign_dict)
     
     await log_admin_action(
         token_payload["user_id"], token_payload["sub"],
@@ -1184,6 +1353,8 @@ async def get_marketing_campaigns(
     campaign_type: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     token_payload: dict = Depends(verify_token)
 ):
     """Get marketing campaigns"""
@@ -1193,41 +1364,39 @@ async def get_marketing_campaigns(
     if campaign_type:
         query["campaign_type"] = campaign_type
     
-    campaigns = list(marketing_campaigns_col.find(query).skip(skip).limit(limit))
-    total = marketing_campaigns_col.count_documents(query)
+    page = await paginate(marketing_campaigns_col, query, "created_at", -1, skip=skip, limit=limit, cursor=cursor,
+                          include_total=include_total)
+    campaigns = page.pop("items")
     
     for campaign in campaigns:
         campaign.pop("_id", None)
     
     return {
         "campaigns": campaigns,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
+        **page
     }
 
 # Travel Itinerary & VIP Management Routes
-@app.get("/api/travel/vip-dashboard")
-async def get_vip_travel_dashboard(token_payload: dict = Depends(verify_token)):
-    """Get VIP travel management dashboard"""
+async def compute_vip_travel_dashboard() -> Dict[str, Any]:
+    """VIP travel dashboard figures; shared by concurrent requests through aggregate_cache"""
     
     # Upcoming VIP arrivals (next 7 days)
     next_week = datetime.utcnow() + timedelta(days=7)
-    upcoming_vip = list(vip_experiences_col.find({
+    upcoming_vip = await vip_experiences_col.find({
         "scheduled_date": {"$gte": datetime.utcnow(), "$lte": next_week},
         "status": {"$in": ["planned", "confirmed"]}
-    }))
+    }).to_list(None)
     
     # Active group bookings
-    active_groups = list(group_bookings_col.find({
+    active_groups = await group_bookings_col.find({
         "status": {"$in": ["confirmed", "in_progress"]}
-    }))
+    }).to_list(None)
     
     # VIP satisfaction scores
-    completed_experiences = list(vip_experiences_col.find({
+    completed_experiences = await vip_experiences_col.find({
         "status": "completed",
         "satisfaction_score": {"$exists": True}
-    }))
+    }).to_list(None)
     
     avg_satisfaction = sum(exp.get("satisfaction_score") or 0 for exp in completed_experiences) / len(completed_experiences) if completed_experiences else 0
     
@@ -1246,49 +1415,60 @@ async def get_vip_travel_dashboard(token_payload: dict = Depends(verify_token)):
         ]
     }
 
+@app.get("/api/travel/vip-dashboard")
+async def get_vip_travel_dashboard(token_payload: dict = Depends(verify_token)):
+    """Get VIP travel management dashboard"""
+    body = await aggregate_cache.get_or_compute(
+        aggregate_cache.key("vip_travel_dashboard", token_payload.get("role")), serialized(compute_vip_travel_dashboard)
+    )
+    return json_bytes(body)
+
 @app.get("/api/travel/vip-experiences")
 async def get_vip_experiences(
     status: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
-    token_payload: dict = Depends(verify_token)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    token_payload: dict = Depends(verify_token),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get VIP experiences"""
     query = {}
     if status:
         query["status"] = status
     
-    experiences = list(vip_experiences_col.find(query).sort("scheduled_date", -1).skip(skip).limit(limit))
-    total = vip_experiences_col.count_documents(query)
+    page = await paginate(vip_experiences_col, query, "scheduled_date", -1, skip=skip, limit=limit, cursor=cursor,
+                          include_total=include_total)
+    experiences = page.pop("items")
     
     # Add member details
-    for experience in experiences:
+    members = await loaders.members.load_many([experience["member_id"] for experience in experiences])
+    for experience, member in zip(experiences, members):
         experience.pop("_id", None)
-        member = members_col.find_one({"id": experience["member_id"]})
         if member:
             experience["member_name"] = f"{member['first_name']} {member['last_name']}"
             experience["member_tier"] = member["tier"]
     
     return {
         "experiences": experiences,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
+        **page
     }
 
 @app.post("/api/travel/vip-experiences")
 async def create_vip_experience(experience: VIPExperience, token_payload: dict = Depends(verify_token)):
     """Create a new VIP experience"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin", "Manager"]:
+    if not role_allowed(token_payload, MANAGEMENT_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     # Verify member exists and is VIP
-    member = members_col.find_one({"id": experience.member_id})
+    member = await members_col.find_one({"id": experience.member_id})
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
     
     experience_dict = experience.dict()
-    result = vip_experiences_col.insert_one(experience_dict)
+    result = await vip_experiences_col.insert_one(experience_dict)
+    await event_bus.publish("vip_experiences.created", experience_dict)
     
     await log_admin_action(
         token_payload["user_id"], token_payload["sub"],
@@ -1303,6 +1483,8 @@ async def get_group_bookings(
     status: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     token_payload: dict = Depends(verify_token)
 ):
     """Get group bookings"""
@@ -1310,27 +1492,27 @@ async def get_group_bookings(
     if status:
         query["status"] = status
     
-    bookings = list(group_bookings_col.find(query).sort("booking_date", -1).skip(skip).limit(limit))
-    total = group_bookings_col.count_documents(query)
+    page = await paginate(group_bookings_col, query, "booking_date", -1, skip=skip, limit=limit, cursor=cursor,
+                          include_total=include_total)
+    bookings = page.pop("items")
     
     for booking in bookings:
         booking.pop("_id", None)
     
     return {
         "bookings": bookings,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
+        **page
     }
 
 @app.post("/api/travel/group-bookings")
 async def create_group_booking(booking: GroupBooking, token_payload: dict = Depends(verify_token)):
     """Create a new group booking"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin", "Manager"]:
+    if not role_allowed(token_payload, MANAGEMENT_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     booking_dict = booking.dict()
-    result = group_bookings_col.insert_one(booking_dict)
+    result = await group_bookings_col.insert_one(booking_dict)
+    await event_bus.publish("group_bookings.created", booking_dict)
     
     await log_admin_action(
         token_payload["user_id"], token_payload["sub"],
@@ -1343,40 +1525,39 @@ async def create_group_booking(booking: GroupBooking, token_payload: dict = Depe
 # Phase 3 Routes - Staff Management & Advanced Analytics
 
 # Staff Management Routes
-@app.get("/api/staff/dashboard")
-async def get_staff_dashboard(token_payload: dict = Depends(verify_token)):
-    """Get staff management dashboard data"""
+async def compute_staff_dashboard() -> Dict[str, Any]:
+    """Staff dashboard figures; shared by concurrent requests through aggregate_cache"""
     
     # Total active staff
-    total_staff = staff_members_col.count_documents({"employment_status": "active"})
+    total_staff = await staff_members_col.count_documents({"employment_status": "active"})
     
     # Staff by department
     departments = ["Gaming", "F&B", "Security", "Management", "Maintenance"]
     staff_by_dept = {}
     for dept in departments:
-        count = staff_members_col.count_documents({"department": dept, "employment_status": "active"})
+        count = await staff_members_col.count_documents({"department": dept, "employment_status": "active"})
         staff_by_dept[dept] = count
     
     # Training completion rates
-    total_training_records = training_records_col.count_documents({})
-    completed_training = training_records_col.count_documents({"status": "completed"})
+    total_training_records = await training_records_col.count_documents({})
+    completed_training = await training_records_col.count_documents({"status": "completed"})
     overall_completion_rate = (completed_training / total_training_records * 100) if total_training_records > 0 else 0
     
     # Performance metrics
-    staff_with_reviews = list(staff_members_col.find({"performance_score": {"$gt": 0}}))
+    staff_with_reviews = await staff_members_col.find({"performance_score": {"$gt": 0}}).to_list(None)
     avg_performance = sum(staff["performance_score"] for staff in staff_with_reviews) / len(staff_with_reviews) if staff_with_reviews else 0
     
     # Upcoming reviews
     next_month = datetime.utcnow() + timedelta(days=30)
-    upcoming_reviews = staff_members_col.count_documents({
+    upcoming_reviews = await staff_members_col.count_documents({
         "next_review_due": {"$lte": next_month},
         "employment_status": "active"
     })
     
     # Recent training activity
-    recent_training = list(training_records_col.find({
+    recent_training = await training_records_col.find({
         "enrollment_date": {"$gte": datetime.utcnow() - timedelta(days=7)}
-    }).limit(10))
+    }).limit(10).to_list(None)
     
     return {
         "total_staff": total_staff,
@@ -1386,21 +1567,41 @@ async def get_staff_dashboard(token_payload: dict = Depends(verify_token)):
         "upcoming_reviews": upcoming_reviews,
         "recent_training_enrollments": len(recent_training),
         "training_stats": {
-            "total_courses": training_courses_col.count_documents({"is_active": True}),
+            "total_courses": await training_courses_col.count_documents({"is_active": True}),
             "total_enrollments": total_training_records,
-            "completed_this_month": training_records_col.count_documents({
+            "completed_this_month": await training_records_col.count_documents({
                 "completion_date": {"$gte": datetime.utcnow().replace(day=1)},
                 "status": "completed"
             })
         }
     }
 
+@app.get("/api/staff/dashboard")
+async def get_staff_dashboard(token_payload: dict = Depends(verify_token)):
+    """Get staff management dashboard data"""
+    body = await aggregate_cache.get_or_compute(
+        aggregate_cache.key("staff_dashboard", token_payload.get("role")), serialized(compute_staff_dashboard)
+    )
+    return json_bytes(body)
+
+STAFF_LIST_FIELDS = FieldSet.for_model(
+    StaffMember,
+    default=("employee_id", "first_name", "last_name", "email", "phone", "position", "department", "hire_date",
+             "employment_status", "skills", "certifications", "performance_score", "training_completion_rate",
+             "next_review_due"),
+    required=("id", "employee_id"),
+    hidden=("salary",)  # Never leaves the database on list views
+)
+
 @app.get("/api/staff/members")
 async def get_staff_members(
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     department: Optional[str] = None,
     search: Optional[str] = None,
+    fields: Optional[str] = None,
     token_payload: dict = Depends(verify_token)
 ):
     """Get staff members with filtering"""
@@ -1409,53 +1610,60 @@ async def get_staff_members(
     if department:
         query["department"] = department
     
+    projection = STAFF_LIST_FIELDS.projection(fields)
     if search:
-        query["$or"] = [
-            {"first_name": {"$regex": search, "$options": "i"}},
-            {"last_name": {"$regex": search, "$options": "i"}},
-            {"employee_id": {"$regex": search, "$options": "i"}},
-            {"position": {"$regex": search, "$options": "i"}}
-        ]
-    
-    staff_members = list(staff_members_col.find(query).skip(skip).limit(limit))
-    total = staff_members_col.count_documents(query)
-    
-    for staff in staff_members:
-        staff.pop("_id", None)
-        staff.pop("salary", None)  # Remove sensitive salary data
+        page = await STAFF_SEARCH.search(staff_members_col, query, search, skip=skip, limit=limit,
+                                         projection=projection)
+    else:
+        page = await paginate(staff_members_col, query, "employee_id", 1, skip=skip, limit=limit, cursor=cursor,
+                              projection=projection, include_total=include_total)
+    staff_members = page.pop("items")
     
     return {
         "staff_members": staff_members,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
+        **page
     }
 
+TRAINING_COURSE_LIST_FIELDS = FieldSet.for_model(
+    TrainingCourse,
+    default=("course_name", "description", "category", "difficulty_level", "duration_hours",
+             "required_for_positions", "prerequisites", "passing_score", "validity_months", "is_mandatory",
+             "is_active")
+)
+
 @app.get("/api/staff/training/courses")
 async def get_training_courses(
     category: Optional[str] = None,
+    fields: Optional[str] = None,
     token_payload: dict = Depends(verify_token)
 ):
     """Get training courses"""
+    cache_key = catalog_cache.key("training_courses", "/api/staff/training/courses", token_payload["role"],
+                                  category=category, fields=TRAINING_COURSE_LIST_FIELDS.cache_key(fields))
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return json_bytes(cached)
+    
     query = {"is_active": True}
     if category:
         query["category"] = category
     
-    courses = list(training_courses_col.find(query))
-    for course in courses:
-        course.pop("_id", None)
+    courses = await training_courses_col.find(query, TRAINING_COURSE_LIST_FIELDS.projection(fields)).to_list(None)
     
-    return courses
+    body = dumps(courses)
+    catalog_cache.set(cache_key, body)
+    return json_bytes(body)
 
 @app.post("/api/staff/training/courses")
 async def create_training_course(course: TrainingCourse, token_payload: dict = Depends(verify_token)):
     """Create new training course"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin", "Manager"]:
+    if not role_allowed(token_payload, MANAGEMENT_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     course.created_by = token_payload["user_id"]
     course_dict = course.dict()
-    result = training_courses_col.insert_one(course_dict)
+    result = await training_courses_col.insert_one(course_dict)
+    await event_bus.publish("training_courses.created", course_dict)
     
     await log_admin_action(
         token_payload["user_id"], token_payload["sub"],
@@ -1472,7 +1680,10 @@ async def get_training_records(
     status: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
-    token_payload: dict = Depends(verify_token)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    token_payload: dict = Depends(verify_token),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get training records"""
     query = {}
@@ -1483,14 +1694,17 @@ async def get_training_records(
     if status:
         query["status"] = status
     
-    records = list(training_records_col.find(query).skip(skip).limit(limit))
-    total = training_records_col.count_documents(query)
+    page = await paginate(training_records_col, query, "enrollment_date", -1, skip=skip, limit=limit, cursor=cursor,
+                          include_total=include_total)
+    records = page.pop("items")
     
     # Add staff and course names for display
-    for record in records:
+    staff_rows, courses = await asyncio.gather(
+        loaders.staff_members.load_many([record["staff_id"] for record in records]),
+        loaders.training_courses.load_many([record["course_id"] for record in records])
+    )
+    for record, staff, course in zip(records, staff_rows, courses):
         record.pop("_id", None)
-        staff = staff_members_col.find_one({"id": record["staff_id"]})
-        course = training_courses_col.find_one({"id": record["course_id"]})
         if staff:
             record["staff_name"] = f"{staff['first_name']} {staff['last_name']}"
         if course:
@@ -1498,20 +1712,19 @@ async def get_training_records(
     
     return {
         "training_records": records,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
+        **page
     }
 
 @app.post("/api/staff/performance/reviews")
 async def create_performance_review(review: PerformanceReview, token_payload: dict = Depends(verify_token)):
     """Create performance review"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin", "Manager"]:
+    if not role_allowed(token_payload, MANAGEMENT_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     review.reviewer_id = token_payload["user_id"]
     review_dict = review.dict()
-    result = performance_reviews_col.insert_one(review_dict)
+    result = await performance_reviews_col.insert_one(review_dict)
+    await event_bus.publish("performance_reviews.created", review_dict)
     
     await log_admin_action(
         token_payload["user_id"], token_payload["sub"],
@@ -1522,10 +1735,17 @@ async def create_performance_review(review: PerformanceReview, token_payload: di
     return {"id": review.id, "message": "Performance review created successfully"}
 
 # Advanced Analytics Routes
+ADVANCED_ANALYTICS_LIST_FIELDS = FieldSet.for_model(
+    AdvancedAnalytics,
+    default=("analysis_type", "analysis_date", "time_period", "data_points", "insights", "recommendations",
+             "confidence_score")
+)
+
 @app.get("/api/analytics/advanced")
 async def get_advanced_analytics(
     analysis_type: Optional[str] = None,
     time_period: Optional[str] = None,
+    fields: Optional[str] = None,
     token_payload: dict = Depends(verify_token)
 ):
     """Get advanced analytics data"""
@@ -1535,102 +1755,38 @@ async def get_advanced_analytics(
     if time_period:
         query["time_period"] = time_period
     
-    analytics = list(advanced_analytics_col.find(query).sort("analysis_date", -1))
-    for analysis in analytics:
-        analysis.pop("_id", None)
+    analytics = await advanced_analytics_col.find(
+        query, ADVANCED_ANALYTICS_LIST_FIELDS.projection(fields)
+    ).sort("analysis_date", -1).to_list(None)
     
     return analytics
 
-@app.post("/api/analytics/generate")
-async def generate_analytics_report(
-    request: dict,
-    token_payload: dict = Depends(verify_token)
-):
-    """Generate advanced analytics report"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin"]:
-        raise HTTPException(status_code=403, detail="Insufficient permissions")
-    
-    analysis_type = request.get("analysis_type")
-    time_period = request.get("time_period", "monthly")
-    
-    # Generate mock analytics based on type
-    insights = []
-    recommendations = []
-    data_points = {}
-    confidence = 85.0
-    
-    if analysis_type == "customer_ltv":
-        insights = [
-            "VIP customers have 5x higher lifetime value than Ruby tier",
-            "Gaming revenue comprises 70% of customer lifetime value",
-            "Birthday campaign participants show 25% higher retention"
-        ]
-        recommendations = [
-            "Focus VIP acquisition programs",
-            "Enhance gaming experience for mid-tier customers",
-            "Expand birthday celebration offerings"
-        ]
-        data_points = {
-            "avg_ltv_vip": 15000,
-            "avg_ltv_diamond": 8000,
-            "avg_ltv_sapphire": 4500,
-            "avg_ltv_ruby": 2200,
-            "retention_rate": 0.75
-        }
-    
-    elif analysis_type == "churn_prediction":
-        insights = [
-            "Members inactive for 45+ days have 80% churn probability",
-            "Declining gaming frequency is strongest churn predictor",
-            "Social engagement reduces churn risk by 40%"
-        ]
-        recommendations = [
-            "Implement 30-day re-engagement campaign",
-            "Create gaming frequency alerts for managers",
-            "Boost social features and community events"
-        ]
-        data_points = {
-            "high_risk_members": 45,
-            "medium_risk_members": 120,
-            "predicted_monthly_churn": 25,
-            "intervention_success_rate": 0.65
-        }
-    
-    elif analysis_type == "operational_efficiency":
-        insights = [
-            "Peak hours show 40% staff utilization gap",
-            "F&B service times exceed target by 15 minutes",
-            "Gaming floor capacity utilization at 85%"
-        ]
-        recommendations = [
-            "Optimize shift scheduling for peak periods",
-            "Implement kitchen workflow automation",
-            "Add 2 gaming tables during weekend evenings"
-        ]
-        data_points = {
-            "avg_service_time": 25,
-            "target_service_time": 15,
-            "staff_utilization": 0.75,
-            "customer_satisfaction": 4.2
-        }
-    
-    # Create analytics record
+def analytics_report_params(request: Dict[str, Any]) -> Dict[str, Any]:
+    return {"analysis_type": request.get("analysis_type"), "time_period": request.get("time_period", "monthly")}
+
+@job_runner.handler("analytics_report")
+async def analytics_report_job(job: JobContext) -> Dict[str, Any]:
+    """Generate and store an advanced analytics report"""
+    analysis_type = job.params["analysis_type"]
+    await job.progress(20, "Analysing")
+    findings = await job.run_cpu(analytics_findings, analysis_type)
+    
+    await job.progress(80, "Saving report")
     analytics_record = AdvancedAnalytics(
         analysis_type=analysis_type,
-        time_period=time_period,
-        data_points=data_points,
-        insights=insights,
-        recommendations=recommendations,
-        confidence_score=confidence,
-        created_by=token_payload["user_id"]
+        time_period=job.params["time_period"],
+        created_by=job.submitted_by["user_id"],
+        **findings
     )
     
-    advanced_analytics_col.insert_one(analytics_record.dict())
+    analytics_dict = analytics_record.dict()
+    await advanced_analytics_col.insert_one(analytics_dict)
+    await event_bus.publish("advanced_analytics.created", analytics_dict)
     
     await log_admin_action(
-        token_payload["user_id"], token_payload["sub"],
+        job.submitted_by["user_id"], job.submitted_by["username"],
         "create", "advanced_analytics", analytics_record.id,
-        details={"analysis_type": analysis_type, "confidence": confidence}
+        details={"analysis_type": analysis_type, "confidence": analytics_record.confidence_score}
     )
     
     return {
@@ -1639,6 +1795,17 @@ async def generate_analytics_report(
         "message": f"Advanced analytics report generated for {analysis_type}"
     }
 
+@app.post("/api/analytics/generate")
+async def generate_analytics_report(
+    request: dict,
+    token_payload: dict = Depends(verify_token)
+):
+    """Generate advanced analytics report (for long periods, submit an analytics_report job instead)"""
+    if not role_allowed(token_payload, ADMIN_ROLES):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    return await analytics_report_job(JobContext(analytics_report_params(request), job_submitter(token_payload)))
+
 # Cost Optimization Routes
 @app.get("/api/optimization/cost-savings")
 async def get_cost_optimization_opportunities(
@@ -1653,7 +1820,7 @@ async def get_cost_optimization_opportunities(
     if status:
         query["implementation_status"] = status
     
-    opportunities = list(cost_optimization_col.find(query).sort("roi_percentage", -1))
+    opportunities = await cost_optimization_col.find(query).sort("roi_percentage", -1).to_list(None)
     for opp in opportunities:
         opp.pop("_id", None)
     
@@ -1662,11 +1829,12 @@ async def get_cost_optimization_opportunities(
 @app.post("/api/optimization/opportunities")
 async def create_cost_optimization(optimization: CostOptimization, token_payload: dict = Depends(verify_token)):
     """Create cost optimization opportunity"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin", "Manager"]:
+    if not role_allowed(token_payload, MANAGEMENT_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     optimization_dict = optimization.dict()
-    result = cost_optimization_col.insert_one(optimization_dict)
+    result = await cost_optimization_col.insert_one(optimization_dict)
+    await event_bus.publish("cost_optimization.created", optimization_dict)
     
     await log_admin_action(
         token_payload["user_id"], token_payload["sub"],
@@ -1684,27 +1852,38 @@ async def get_predictive_models(
     token_payload: dict = Depends(verify_token)
 ):
     """Get predictive models"""
+    cache_key = catalog_cache.key(
+        "predictive_models", "/api/predictive/models", token_payload["role"],
+        model_type=model_type, is_production=is_production
+    )
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return json_bytes(cached)
+    
     query = {}
     if model_type:
         query["model_type"] = model_type
     if is_production is not None:
         query["is_production"] = is_production
     
-    models = list(predictive_models_col.find(query))
+    models = await predictive_models_col.find(query).to_list(None)
     for model in models:
         model.pop("_id", None)
     
-    return models
+    body = dumps(models)
+    catalog_cache.set(cache_key, body)
+    return json_bytes(body)
 
 @app.post("/api/predictive/models")
 async def create_predictive_model(model: PredictiveModel, token_payload: dict = Depends(verify_token)):
     """Create predictive model"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin"]:
+    if not role_allowed(token_payload, ADMIN_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     model.created_by = token_payload["user_id"]
     model_dict = model.dict()
-    result = predictive_models_col.insert_one(model_dict)
+    result = await predictive_models_col.insert_one(model_dict)
+    await event_bus.publish("predictive_models.created", model_dict)
     
     await log_admin_action(
         token_payload["user_id"], token_payload["sub"],
@@ -1725,6 +1904,8 @@ async def get_notifications(
     priority: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     token_payload: dict = Depends(verify_token)
 ):
     """Get notifications with filtering"""
@@ -1742,27 +1923,27 @@ async def get_notifications(
     if token_payload.get("role") not in ["SuperAdmin", "GeneralAdmin"]:
         query["recipient_id"] = token_payload["user_id"]
     
-    notifications = list(notifications_col.find(query).sort("created_at", -1).skip(skip).limit(limit))
-    total = notifications_col.count_documents(query)
+    page = await paginate(notifications_col, query, "created_at", -1, skip=skip, limit=limit, cursor=cursor,
+                          include_total=include_total)
+    notifications = page.pop("items")
     
     for notification in notifications:
         notification.pop("_id", None)
     
     return {
         "notifications": notifications,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
+        **page
     }
 
 @app.post("/api/notifications")
 async def create_notification(notification: Notification, token_payload: dict = Depends(verify_token)):
     """Create new notification"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin", "Manager"]:
+    if not role_allowed(token_payload, MANAGEMENT_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     notification_dict = notification.dict()
-    result = notifications_col.insert_one(notification_dict)
+    result = await notifications_col.insert_one(notification_dict)
+    await event_bus.publish("notifications.created", notification_dict)
     
     # Log notification creation
     await log_admin_action(
@@ -1776,7 +1957,7 @@ async def create_notification(notification: Notification, token_payload: dict =
 @app.patch("/api/notifications/{notification_id}/read")
 async def mark_notification_read(notification_id: str, token_payload: dict = Depends(verify_token)):
     """Mark notification as read"""
-    notification = notifications_col.find_one({"id": notification_id})
+    notification = await notifications_col.find_one({"id": notification_id})
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
@@ -1784,10 +1965,11 @@ async def mark_notification_read(notification_id: str, token_payload: dict = Dep
     if notification["recipient_id"] != token_payload["user_id"] and token_payload.get("role") not in ["SuperAdmin", "GeneralAdmin"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    notifications_col.update_one(
+    await notifications_col.update_one(
         {"id": notification_id},
         {"$set": {"status": "read", "read_at": datetime.utcnow()}}
     )
+    await event_bus.publish("notifications.read", {"id": notification_id})
     
     return {"message": "Notification marked as read"}
 
@@ -1798,25 +1980,36 @@ async def get_notification_templates(
     token_payload: dict = Depends(verify_token)
 ):
     """Get notification templates"""
+    cache_key = catalog_cache.key(
+        "notification_templates", "/api/notifications/templates", token_payload["role"],
+        category=category, is_active=is_active
+    )
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return json_bytes(cached)
+    
     query = {"is_active": is_active}
     if category:
         query["category"] = category
     
-    templates = list(notification_templates_col.find(query))
+    templates = await notification_templates_col.find(query).to_list(None)
     for template in templates:
         template.pop("_id", None)
     
-    return templates
+    body = dumps(templates)
+    catalog_cache.set(cache_key, body)
+    return json_bytes(body)
 
 @app.post("/api/notifications/templates")
 async def create_notification_template(template: NotificationTemplate, token_payload: dict = Depends(verify_token)):
     """Create notification template"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin"]:
+    if not role_allowed(token_payload, ADMIN_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     template.created_by = token_payload["user_id"]
     template_dict = template.dict()
-    result = notification_templates_col.insert_one(template_dict)
+    result = await notification_templates_col.insert_one(template_dict)
+    await event_bus.publish("notification_templates.created", template_dict)
     
     await log_admin_action(
         token_payload["user_id"], token_payload["sub"],
@@ -1833,10 +2026,12 @@ async def get_compliance_reports(
     status: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     token_payload: dict = Depends(verify_token)
 ):
     """Get compliance reports"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin", "Manager"]:
+    if not role_allowed(token_payload, MANAGEMENT_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     query = {}
@@ -1845,138 +2040,79 @@ async def get_compliance_reports(
     if status:
         query["status"] = status
     
-    reports = list(compliance_reports_col.find(query).sort("created_at", -1).skip(skip).limit(limit))
-    total = compliance_reports_col.count_documents(query)
+    page = await paginate(compliance_reports_col, query, "created_at", -1, skip=skip, limit=limit, cursor=cursor,
+                          include_total=include_total)
+    reports = page.pop("items")
     
     for report in reports:
         report.pop("_id", None)
     
     return {
         "reports": reports,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
+        **page
     }
 
-@app.post("/api/compliance/reports/generate")
-async def generate_compliance_report(
-    request: dict,
-    token_payload: dict = Depends(verify_token)
-):
-    """Generate compliance report"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin"]:
-        raise HTTPException(status_code=403, detail="Insufficient permissions")
+def compliance_report_params(request: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        start_date = datetime.fromisoformat(request["start_date"])
+        end_date = datetime.fromisoformat(request["end_date"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="start_date and end_date must be ISO 8601 dates")
+    # Normalised so identical periods deduplicate to the same job
+    return {"report_type": request.get("report_type"), "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat()}
+
+async def gather_compliance_figures(report_type: str, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+    """The database figures a compliance report is assessed on"""
+    if report_type == "audit_trail":
+        audit_count = await audit_logs_col.count_documents({
+            "timestamp": {"$gte": start_date, "$lte": end_date}
+        }, max_time_ms=MONGO_REPORT_MAX_TIME_MS)
+        return {"audit_count": audit_count}
     
-    report_type = request.get("report_type")
-    start_date = datetime.fromisoformat(request.get("start_date"))
-    end_date = datetime.fromisoformat(request.get("end_date"))
+    if report_type == "kyc_compliance":
+        total_members, verified_members = await asyncio.gather(
+            members_col.count_documents({"is_active": True}, max_time_ms=MONGO_REPORT_MAX_TIME_MS),
+            members_col.count_documents({"kyc_verified": True, "is_active": True}, max_time_ms=MONGO_REPORT_MAX_TIME_MS)
+        )
+        return {"total_members": total_members, "verified_members": verified_members}
     
-    # Generate mock compliance data based on type
-    summary = {}
-    violations = []
-    recommendations = []
-    compliance_score = 95.0
+    if report_type == "data_retention":
+        return {"policies_count": await data_retention_policies_col.count_documents({"status": "active"})}
     
-    if report_type == "audit_trail":
-        # Audit trail analysis
-        audit_count = audit_logs_col.count_documents({
-            "timestamp": {"$gte": start_date, "$lte": end_date}
-        })
-        
-        summary = {
-            "total_audit_entries": audit_count,
-            "admin_actions": audit_count,
-            "data_access_events": int(audit_count * 0.6),
-            "security_events": int(audit_count * 0.1)
-        }
-        
-        if audit_count > 1000:
-            violations.append({
-                "type": "high_activity_volume",
-                "description": f"High volume of admin activities: {audit_count} entries",
-                "severity": "medium",
-                "recommendation": "Review admin access patterns and implement activity limits"
-            })
-        
-        recommendations = [
-            "Implement automated monitoring for suspicious activity patterns",
-            "Regular review of admin access logs",
-            "Enhance audit trail data retention policies"
-        ]
+    return {}
+
+@job_runner.handler("compliance_report")
+async def compliance_report_job(job: JobContext) -> Dict[str, Any]:
+    """Generate and store a compliance report"""
+    report_type = job.params["report_type"]
+    start_date = datetime.fromisoformat(job.params["start_date"])
+    end_date = datetime.fromisoformat(job.params["end_date"])
     
-    elif report_type == "kyc_compliance":
-        # KYC compliance check
-        total_members = members_col.count_documents({"is_active": True})
-        verified_members = members_col.count_documents({"kyc_verified": True, "is_active": True})
-        verification_rate = (verified_members / total_members) * 100 if total_members > 0 else 0
-        
-        summary = {
-            "total_active_members": total_members,
-            "kyc_verified_members": verified_members,
-            "verification_rate": round(verification_rate, 2),
-            "pending_verification": total_members - verified_members
-        }
-        
-        if verification_rate < 90:
-            violations.append({
-                "type": "low_kyc_verification",
-                "description": f"KYC verification rate below 90%: {verification_rate:.1f}%",
-                "severity": "high",
-                "recommendation": "Implement mandatory KYC verification for all new members"
-            })
-            compliance_score = 80.0
-        
-        recommendations = [
-            "Automated KYC verification reminders",
-            "Streamlined KYC process for better user experience",
-            "Regular compliance training for staff"
-        ]
+    await job.progress(10, "Gathering figures")
+    figures = await gather_compliance_figures(report_type, start_date, end_date)
     
-    elif report_type == "data_retention":
-        # Data retention policy compliance
-        policies_count = data_retention_policies_col.count_documents({"status": "active"})
-        
-        summary = {
-            "active_retention_policies": policies_count,
-            "data_categories_covered": ["member_data", "gaming_logs", "audit_logs", "marketing_data"],
-            "avg_retention_period": 365,  # days
-            "auto_deletion_enabled": policies_count > 0
-        }
-        
-        if policies_count == 0:
-            violations.append({
-                "type": "no_retention_policies",
-                "description": "No active data retention policies found",
-                "severity": "critical",
-                "recommendation": "Implement comprehensive data retention policies immediately"
-            })
-            compliance_score = 60.0
-        
-        recommendations = [
-            "Define clear data retention policies for all data categories",
-            "Implement automated data archiving and deletion",
-            "Regular review and update of retention policies"
-        ]
+    await job.progress(60, "Assessing compliance")
+    assessment = await job.run_cpu(assess_compliance, report_type, figures)
     
-    # Create compliance report
+    await job.progress(90, "Saving report")
     report = ComplianceReport(
         report_type=report_type,
         report_period_start=start_date,
         report_period_end=end_date,
-        generated_by=token_payload["user_id"],
-        summary=summary,
-        violations=violations,
-        recommendations=recommendations,
-        compliance_score=compliance_score,
-        status="completed"
+        generated_by=job.submitted_by["user_id"],
+        status="completed",
+        **assessment
     )
     
-    compliance_reports_col.insert_one(report.dict())
+    report_dict = report.dict()
+    await compliance_reports_col.insert_one(report_dict)
+    await event_bus.publish("compliance_reports.created", report_dict)
     
     await log_admin_action(
-        token_payload["user_id"], token_payload["sub"],
+        job.submitted_by["user_id"], job.submitted_by["username"],
         "create", "compliance_report", report.id,
-        details={"report_type": report_type, "compliance_score": compliance_score}
+        details={"report_type": report_type, "compliance_score": report.compliance_score}
     )
     
     return {
@@ -1985,6 +2121,34 @@ async def generate_compliance_report(
         "message": f"Compliance report generated for {report_type}"
     }
 
+@app.post("/api/compliance/reports/generate")
+async def generate_compliance_report(
+    request: dict,
+    token_payload: dict = Depends(verify_token)
+):
+    """Generate compliance report (for long periods, submit a compliance_report job instead)"""
+    if not role_allowed(token_payload, ADMIN_ROLES):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    return await compliance_report_job(JobContext(compliance_report_params(request), job_submitter(token_payload)))
+
+def audit_summary_pipeline(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Breakdowns over every matching audit entry, not just one page"""
+    return [
+        {"$match": query},
+        {"$project": {
+            "_id": 0, "action": 1, "resource": 1, "admin_username": 1,
+            # Entries written before risk was stored are scored on the fly, as their page rows are
+            "risk_level": {"$ifNull": ["$risk_level", risk_fields_expression()["risk_level"]]},
+        }},
+        {"$facet": {
+            "actions": [{"$group": {"_id": {"$ifNull": ["$action", "unknown"]}, "count": {"$sum": 1}}}],
+            "resources": [{"$group": {"_id": {"$ifNull": ["$resource", "unknown"]}, "count": {"$sum": 1}}}],
+            "admins": [{"$group": {"_id": {"$ifNull": ["$admin_username", "unknown"]}, "count": {"$sum": 1}}}],
+            "high_risk": [{"$match": {"risk_level": "high"}}, {"$count": "count"}],
+        }},
+    ]
+
 @app.get("/api/audit/enhanced")
 async def get_enhanced_audit_logs(
     admin_user_id: Optional[str] = None,
@@ -1994,10 +2158,12 @@ async def get_enhanced_audit_logs(
     end_date: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     token_payload: dict = Depends(verify_token)
 ):
     """Get enhanced audit logs with advanced filtering"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin"]:
+    if not role_allowed(token_payload, ADMIN_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     query = {}
@@ -2013,52 +2179,135 @@ async def get_enhanced_audit_logs(
         end_dt = datetime.fromisoformat(end_date)
         query["timestamp"] = {"$gte": start_dt, "$lte": end_dt}
     
-    audit_logs = list(audit_logs_col.find(query).sort("timestamp", -1).skip(skip).limit(limit))
-    total = audit_logs_col.count_documents(query)
+    async def compute_summary():
+        result = await audit_logs_col.aggregate(
+            audit_summary_pipeline(query), max_time_ms=MONGO_REPORT_MAX_TIME_MS, allowDiskUse=True
+        ).to_list(1)
+        facets = result[0] if result else {}
+        return {
+            "actions_breakdown": {row["_id"]: row["count"] for row in facets.get("actions", [])},
+            "resources_breakdown": {row["_id"]: row["count"] for row in facets.get("resources", [])},
+            "admin_activity": {row["_id"]: row["count"] for row in facets.get("admins", [])},
+            "high_risk_activities": facets["high_risk"][0]["count"] if facets.get("high_risk") else 0
+        }
+
+    page, summary = await asyncio.gather(
+        paginate(audit_logs_col, query, "timestamp", -1, skip=skip, limit=limit, cursor=cursor,
+                 include_total=include_total),
+        aggregate_cache.get_or_compute(
+            aggregate_cache.key("audit_summary", token_payload.get("role"), admin_user_id=admin_user_id,
+                                action=action, resource=resource, start_date=start_date, end_date=end_date),
+            compute_summary
+        )
+    )
+    audit_logs = page.pop("items")
     
-    # Enhanced audit log processing
     for log in audit_logs:
         log.pop("_id", None)
-        
-        # Add risk scoring
-        risk_score = 0
-        if log.get("action") in ["delete", "update_sensitive", "export_data"]:
-            risk_score += 3
-        if log.get("resource") in ["member", "admin_user", "audit_log"]:
-            risk_score += 2
-        if log.get("details", {}).get("bulk_operation"):
-            risk_score += 2
-        
-        log["risk_score"] = min(risk_score, 5)  # Max 5
-        log["risk_level"] = "low" if risk_score <= 1 else "medium" if risk_score <= 3 else "high"
-    
-    # Generate audit summary
-    actions_summary = {}
-    resources_summary = {}
-    admins_summary = {}
-    
-    for log in audit_logs:
-        action = log.get("action", "unknown")
-        resource = log.get("resource", "unknown")
-        admin = log.get("admin_username", "unknown")
-        
-        actions_summary[action] = actions_summary.get(action, 0) + 1
-        resources_summary[resource] = resources_summary.get(resource, 0) + 1
-        admins_summary[admin] = admins_summary.get(admin, 0) + 1
+        if "risk_level" not in log:  # Written before risk was stored; see `python audit.py backfill-risk`
+            log.update(assess_risk(log.get("action"), log.get("resource"), log.get("details")))
     
     return {
         "audit_logs": audit_logs,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit,
-        "summary": {
-            "actions_breakdown": actions_summary,
-            "resources_breakdown": resources_summary,
-            "admin_activity": admins_summary,
-            "high_risk_activities": len([log for log in audit_logs if log.get("risk_level") == "high"])
-        }
+        **page,
+        "summary": summary
     }
 
+# Report Job Routes
+REPORT_JOB_PARAMS = {
+    "compliance_report": compliance_report_params,
+    "analytics_report": analytics_report_params,
+}
+
+@app.post("/api/jobs/reports", status_code=202)
+async def submit_report_job(request: ReportJobRequest, token_payload: dict = Depends(verify_token)):
+    """Queue a report; returns the job to poll. Identical pending or recent requests share one job."""
+    if not role_allowed(token_payload, ADMIN_ROLES):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    if request.type not in REPORT_JOB_PARAMS:
+        raise HTTPException(status_code=400, detail=f"Unknown report job type: {request.type}")
+    
+    job, created = await job_runner.submit(
+        request.type, REPORT_JOB_PARAMS[request.type](request.params), job_submitter(token_payload)
+    )
+    if created:
+        await log_admin_action(
+            token_payload["user_id"], token_payload["sub"],
+            "submit", "report_job", job["id"],
+            details={"type": request.type, "params": job["params"]}
+        )
+    
+    return {"job": job, "deduplicated": not created}
+
+@app.get("/api/jobs")
+async def get_report_jobs(
+    status: Optional[str] = None,
+    job_type: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    token_payload: dict = Depends(verify_token)
+):
+    """List report jobs, newest first"""
+    if not role_allowed(token_payload, ADMIN_ROLES):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    query = {}
+    if status:
+        query["status"] = status
+    if job_type:
+        query["type"] = job_type
+    
+    page = await paginate(report_jobs_col, query, "created_at", -1, skip=skip, limit=limit, cursor=cursor,
+                          projection=JOB_STATUS_PROJECTION, include_total=include_total)
+    jobs = page.pop("items")
+    
+    return {"jobs": jobs, **page}
+
+@app.get("/api/jobs/{job_id}")
+async def get_report_job(job_id: str, token_payload: dict = Depends(verify_token)):
+    """Job status and progress"""
+    if not role_allowed(token_payload, ADMIN_ROLES):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    job = await job_runner.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_report_job_result(job_id: str, token_payload: dict = Depends(verify_token)):
+    """The finished report; 409 while the job has not completed"""
+    if not role_allowed(token_payload, ADMIN_ROLES):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    job = await job_runner.get(job_id, include_result=True)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return job["result"]
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_report_job(job_id: str, token_payload: dict = Depends(verify_token)):
+    """Cancel a queued or running job"""
+    if not role_allowed(token_payload, ADMIN_ROLES):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    job = await job_runner.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] not in ("queued", "running", "cancelled"):
+        raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+    
+    await log_admin_action(
+        token_payload["user_id"], token_payload["sub"],
+        "cancel", "report_job", job_id,
+        details={"type": job["type"]}
+    )
+    return job
+
 # System Integrations Routes
 @app.get("/api/integrations")
 async def get_system_integrations(
@@ -2067,7 +2316,7 @@ async def get_system_integrations(
     token_payload: dict = Depends(verify_token)
 ):
     """Get system integrations"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin"]:
+    if not role_allowed(token_payload, ADMIN_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     query = {}
@@ -2076,7 +2325,7 @@ async def get_system_integrations(
     if status:
         query["status"] = status
     
-    integrations = list(system_integrations_col.find(query).sort("created_at", -1))
+    integrations = await system_integrations_col.find(query).sort("created_at", -1).to_list(None)
     
     # Remove sensitive data
     for integration in integrations:
@@ -2088,7 +2337,7 @@ async def get_system_integrations(
 @app.post("/api/integrations")
 async def create_system_integration(integration: SystemIntegration, token_payload: dict = Depends(verify_token)):
     """Create system integration"""
-    if token_payload["role"] not in ["SuperAdmin"]:
+    if not role_allowed(token_payload, SUPERADMIN_ROLES):
         raise HTTPException(status_code=403, detail="Only SuperAdmin can create integrations")
     
     integration.created_by = token_payload["user_id"]
@@ -2098,7 +2347,8 @@ async def create_system_integration(integration: SystemIntegration, token_payloa
         integration.api_key_encrypted = encrypt_sensitive_data(integration.api_key_encrypted)
     
     integration_dict = integration.dict()
-    result = system_integrations_col.insert_one(integration_dict)
+    result = await system_integrations_col.insert_one(integration_dict)
+    await event_bus.publish("system_integrations.created", integration_dict)
     
     await log_admin_action(
         token_payload["user_id"], token_payload["sub"],
@@ -2111,10 +2361,10 @@ async def create_system_integration(integration: SystemIntegration, token_payloa
 @app.patch("/api/integrations/{integration_id}/sync")
 async def sync_integration(integration_id: str, token_payload: dict = Depends(verify_token)):
     """Manually sync integration"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin"]:
+    if not role_allowed(token_payload, ADMIN_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
-    integration = system_integrations_col.find_one({"id": integration_id})
+    integration = await system_integrations_col.find_one({"id": integration_id})
     if not integration:
         raise HTTPException(status_code=404, detail="Integration not found")
     
@@ -2135,11 +2385,82 @@ async def sync_integration(integration_id: str, token_payload: dict = Depends(ve
         update_data["last_error"] = None
         update_data["status"] = "active"
     
-    system_integrations_col.update_one({"id": integration_id}, {"$set": update_data})
+    await system_integrations_col.update_one({"id": integration_id}, {"$set": update_data})
+    await event_bus.publish("system_integrations.synced", {"id": integration_id, **update_data})
     
     return {"message": "Integration sync completed", "success": sync_success}
 
 # Enhanced User Analytics Routes
+USER_ACTIVITY_BATCH = TypeAdapter(List[UserActivityTracking])
+
+@app.post("/api/analytics/activity", status_code=202)
+async def ingest_user_activity(request: Request, token_payload: dict = Depends(verify_token)):
+    """Accept a batch of activity events (JSON array or NDJSON) for asynchronous storage"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > ACTIVITY_MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail="Activity batch too large")
+    body = await request.body()
+    if len(body) > ACTIVITY_MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail="Activity batch too large")
+    
+    try:
+        events = USER_ACTIVITY_BATCH.validate_json(as_json_array(body, request.headers.get("content-type", "")))
+    except ValidationError as e:
+        errors = e.errors(include_url=False, include_context=False, include_input=False)
+        raise HTTPException(status_code=422, detail=errors[:20])
+    if len(events) > ACTIVITY_MAX_EVENTS_PER_REQUEST:
+        raise HTTPException(status_code=413, detail=f"At most {ACTIVITY_MAX_EVENTS_PER_REQUEST} events per request")
+    
+    documents = USER_ACTIVITY_BATCH.dump_python(events)
+    ip_address = get_remote_address(request)
+    for document in documents:
+        document["ip_address"] = ip_address
+    accepted = activity_writer.enqueue_many(documents)
+    
+    return {"accepted": accepted, "dropped": len(documents) - accepted}
+
+USER_ACTIVITY_TOP_PAGES = int(os.getenv("USER_ACTIVITY_TOP_PAGES", "20"))
+
+def _count_by(field: Any) -> List[Dict[str, Any]]:
+    return [{"$group": {"_id": field, "count": {"$sum": 1}}}, {"$sort": {"count": -1, "_id": 1}}]
+
+def user_activity_pipeline(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Every user-activity breakdown over the full filtered range in a single pass"""
+    return [
+        {"$match": query},
+        {"$project": {"_id": 0, "user_id": 1, "session_id": 1, "activity_type": 1, "device_type": 1,
+                      "page_url": 1, "timestamp": 1}},
+        {"$facet": {
+            "totals": [{"$count": "count"}],
+            "unique_users": [{"$group": {"_id": "$user_id"}}, {"$count": "count"}],
+            "by_type": _count_by({"$ifNull": ["$activity_type", "unknown"]}),
+            "by_hour": [{"$group": {"_id": {"$hour": "$timestamp"}, "count": {"$sum": 1}}}, {"$sort": {"_id": 1}}],
+            "by_device": _count_by({"$ifNull": ["$device_type", "unknown"]}),
+            "top_pages": [
+                {"$match": {"page_url": {"$nin": [None, ""]}}},
+                *_count_by("$page_url"),
+                {"$limit": USER_ACTIVITY_TOP_PAGES}
+            ],
+            "sessions": [
+                {"$group": {
+                    "_id": {"user_id": "$user_id", "session_id": "$session_id"},
+                    "activities": {"$sum": 1},
+                    "start": {"$min": "$timestamp"},
+                    "end": {"$max": "$timestamp"}
+                }},
+                {"$group": {
+                    "_id": None,
+                    "total_sessions": {"$sum": 1},
+                    "avg_pages": {"$avg": "$activities"},
+                    # Single-activity sessions have no measurable duration; $avg skips the nulls
+                    "avg_duration_ms": {"$avg": {
+                        "$cond": [{"$gt": ["$activities", 1]}, {"$subtract": ["$end", "$start"]}, None]
+                    }}
+                }}
+            ]
+        }}
+    ]
+
 @app.get("/api/analytics/user-activity")
 async def get_user_activity_analytics(
     user_type: Optional[str] = None,
@@ -2149,7 +2470,7 @@ async def get_user_activity_analytics(
     token_payload: dict = Depends(verify_token)
 ):
     """Get user activity analytics"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin", "Manager"]:
+    if not role_allowed(token_payload, MANAGEMENT_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     query = {}
@@ -2163,73 +2484,30 @@ async def get_user_activity_analytics(
         end_dt = datetime.fromisoformat(date_to)
         query["timestamp"] = {"$gte": start_dt, "$lte": end_dt}
     
-    activities = list(user_activity_tracking_col.find(query).sort("timestamp", -1).limit(1000))
-    
-    # Process analytics
-    analytics = {
-        "total_activities": len(activities),
-        "unique_users": len(set(activity["user_id"] for activity in activities)),
-        "activity_by_type": {},
-        "activity_by_hour": {},
-        "device_breakdown": {},
-        "top_pages": {},
-        "user_engagement": {}
-    }
+    facets = (await user_activity_tracking_col.aggregate(
+        user_activity_pipeline(query), max_time_ms=MONGO_REPORT_MAX_TIME_MS, allowDiskUse=True
+    ).to_list(None) or [{}])[0]
     
-    for activity in activities:
-        activity.pop("_id", None)
-        
-        # Activity type breakdown
-        act_type = activity.get("activity_type", "unknown")
-        analytics["activity_by_type"][act_type] = analytics["activity_by_type"].get(act_type, 0) + 1
-        
-        # Activity by hour
-        hour = activity["timestamp"].hour
-        analytics["activity_by_hour"][str(hour)] = analytics["activity_by_hour"].get(str(hour), 0) + 1
-        
-        # Device breakdown
-        device = activity.get("device_type", "unknown")
-        analytics["device_breakdown"][device] = analytics["device_breakdown"].get(device, 0) + 1
-        
-        # Top pages
-        if activity.get("page_url"):
-            page = activity["page_url"]
-            analytics["top_pages"][page] = analytics["top_pages"].get(page, 0) + 1
-    
-    # Calculate engagement metrics
-    user_sessions = {}
-    for activity in activities:
-        user_id = activity["user_id"]
-        session_id = activity["session_id"]
-        
-        if user_id not in user_sessions:
-            user_sessions[user_id] = {}
-        if session_id not in user_sessions[user_id]:
-            user_sessions[user_id][session_id] = []
-        
-        user_sessions[user_id][session_id].append(activity)
-    
-    # Calculate average session duration and pages per session
-    session_durations = []
-    pages_per_session = []
-    
-    for user_id, sessions in user_sessions.items():
-        for session_id, session_activities in sessions.items():
-            if len(session_activities) > 1:
-                start_time = min(activity["timestamp"] for activity in session_activities)
-                end_time = max(activity["timestamp"] for activity in session_activities)
-                duration = (end_time - start_time).total_seconds() / 60  # minutes
-                session_durations.append(duration)
-            
-            pages_per_session.append(len(session_activities))
+    def first(facet: str) -> Dict[str, Any]:
+        return (facets.get(facet) or [{}])[0]
     
-    analytics["user_engagement"] = {
-        "avg_session_duration_minutes": round(sum(session_durations) / len(session_durations), 2) if session_durations else 0,
-        "avg_pages_per_session": round(sum(pages_per_session) / len(pages_per_session), 2) if pages_per_session else 0,
-        "total_sessions": len(pages_per_session)
-    }
+    def counts(facet: str) -> Dict[str, int]:
+        return {str(row["_id"]): row["count"] for row in facets.get(facet, [])}
     
-    return analytics
+    sessions = first("sessions")
+    return {
+        "total_activities": first("totals").get("count", 0),
+        "unique_users": first("unique_users").get("count", 0),
+        "activity_by_type": counts("by_type"),
+        "activity_by_hour": counts("by_hour"),
+        "device_breakdown": counts("by_device"),
+        "top_pages": counts("top_pages"),
+        "user_engagement": {
+            "avg_session_duration_minutes": round((sessions.get("avg_duration_ms") or 0) / 60000, 2),
+            "avg_pages_per_session": round(sessions.get("avg_pages") or 0, 2),
+            "total_sessions": sessions.get("total_sessions", 0)
+        }
+    }
 
 @app.get("/api/analytics/real-time-events")
 async def get_real_time_events(
@@ -2239,10 +2517,12 @@ async def get_real_time_events(
     resolved: Optional[bool] = None,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     token_payload: dict = Depends(verify_token)
 ):
     """Get real-time events"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin", "Manager"]:
+    if not role_allowed(token_payload, MANAGEMENT_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     query = {}
@@ -2255,37 +2535,24 @@ async def get_real_time_events(
     if resolved is not None:
         query["resolved"] = resolved
     
-    events = list(real_time_events_col.find(query).sort("timestamp", -1).skip(skip).limit(limit))
-    total = real_time_events_col.count_documents(query)
+    page = await paginate(real_time_events_col, query, "timestamp", -1, skip=skip, limit=limit, cursor=cursor,
+                          include_total=include_total)
+    events = page.pop("items")
     
     for event in events:
         event.pop("_id", None)
     
     return {
         "events": events,
-        "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
+        **page
     }
 
 @app.post("/api/analytics/real-time-events")
 async def create_real_time_event(event: RealTimeEvent, token_payload: dict = Depends(verify_token)):
     """Create real-time event"""
     event_dict = event.dict()
-    result = real_time_events_col.insert_one(event_dict)
-    
-    # Auto-create notification for critical events
-    if event.severity == "critical" or event.requires_action:
-        notification = Notification(
-            category="system",
-            recipient_type="admin",
-            title=f"Critical Event: {event.title}",
-            content=f"Event: {event.description}\nSource: {event.source}",
-            priority="high" if event.severity == "critical" else "normal",
-            channels=["in_app", "email"]
-        )
-        
-        notifications_col.insert_one(notification.dict())
+    result = await real_time_events_col.insert_one(event_dict)
+    await event_bus.publish("real_time_events.created", event_dict)
     
     return {"id": event.id, "message": "Real-time event created successfully"}
 
@@ -2297,31 +2564,42 @@ async def get_data_retention_policies(
     token_payload: dict = Depends(verify_token)
 ):
     """Get data retention policies"""
-    if token_payload["role"] not in ["SuperAdmin", "GeneralAdmin"]:
+    if not role_allowed(token_payload, ADMIN_ROLES):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
+    cache_key = catalog_cache.key(
+        "data_retention_policies", "/api/data-retention/policies", token_payload["role"],
+        data_category=data_category, status=status
+    )
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return json_bytes(cached)
+    
     query = {}
     if data_category:
         query["data_category"] = data_category
     if status:
         query["status"] = status
     
-    policies = list(data_retention_policies_col.find(query).sort("created_at", -1))
+    policies = await data_retention_policies_col.find(query).sort("created_at", -1).to_list(None)
     
     for policy in policies:
         policy.pop("_id", None)
     
-    return policies
+    body = dumps(policies)
+    catalog_cache.set(cache_key, body)
+    return json_bytes(body)
 
 @app.post("/api/data-retention/policies")
 async def create_data_retention_policy(policy: DataRetentionPolicy, token_payload: dict = Depends(verify_token)):
     """Create data retention policy"""
-    if token_payload["role"] not in ["SuperAdmin"]:
+    if not role_allowed(token_payload, SUPERADMIN_ROLES):
         raise HTTPException(status_code=403, detail="Only SuperAdmin can create retention policies")
     
     policy.created_by = token_payload["user_id"]
     policy_dict = policy.dict()
-    result = data_retention_policies_col.insert_one(policy_dict)
+    result = await data_retention_policies_col.insert_one(policy_dict)
+    await event_bus.publish("data_retention_policies.created", policy_dict)
     
     await log_admin_action(
         token_payload["user_id"], token_payload["sub"],
@@ -2345,9 +2623,10 @@ async def initialize_sample_data():
                 "full_name": "Super Administrator",
                 "role": "SuperAdmin",
                 "department": "IT",
-                "password_hash": pwd_context.hash("admin123"),
+                "password_hash": await hash_password("admin123"),
                 "is_active": True,
                 "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow(),
                 "permissions": ["*"]  # All permissions
             },
             {
@@ -2357,16 +2636,18 @@ async def initialize_sample_data():
                 "full_name": "Casino Manager",
                 "role": "GeneralAdmin",
                 "department": "Operations",
-                "password_hash": pwd_context.hash("manager123"),
+                "password_hash": await hash_password("manager123"),
                 "is_active": True,
                 "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow(),
                 "permissions": ["members:read", "members:write", "gaming:read", "gaming:write", "reports:read"]
             }
         ]
         
         # Clear existing admin users and insert new ones
-        admin_users_col.delete_many({})
-        admin_users_col.insert_many(admin_users)
+        await admin_users_col.delete_many({})
+        await admin_users_col.insert_many(admin_users)
+        user_profiles.clear()
         
         # Create realistic sample members with diverse profiles
         first_names = ["Chaminda", "Priyanka", "Kasun", "Nimali", "Rajesh", "Sanduni", "Thilina", "Madhavi", "Dinesh", "Isuri",
@@ -2380,7 +2661,12 @@ async def initialize_sample_data():
         countries = ["Sri Lanka", "India", "Maldives", "Singapore", "UAE", "Australia", "UK", "Canada", "USA", "Germany"]
         
         sample_members = []
-        for i in range(250):  # Increased to 250 members for more realistic demo
+        member_count = 250  # Increased to 250 members for more realistic demo
+        nic_fields = await encrypt_indexed_batch(
+            "nic_passport",
+            [f"{'19' if i % 2 == 0 else '20'}{(60 + i % 40):02d}{i:07d}V" for i in range(member_count)]
+        )
+        for i in range(member_count):
             tier_weights = [0.5, 0.3, 0.15, 0.05]  # More realistic tier distribution
             tier_choice = ["Ruby", "Sapphire", "Diamond", "VIP"][
                 0 if i < 125 else 1 if i < 200 else 2 if i < 237 else 3
@@ -2398,7 +2684,7 @@ async def initialize_sample_data():
                 phone=f"077{'1234567890'[i % 10]}{i:06d}"[:10],
                 date_of_birth=datetime(1960 + (i % 45), (i % 12) + 1, (i % 28) + 1),
                 nationality=countries[i % len(countries)],
-                nic_passport=encrypt_sensitive_data(f"{'19' if i % 2 == 0 else '20'}{(60 + i % 40):02d}{i:07d}V"),
+                **nic_fields[i],
                 tier=tier_choice,
                 points_balance=float((50 + i * 25) * multiplier + (i * 10)),
                 total_points_earned=float((100 + i * 50) * multiplier + (i * 20)),
@@ -2412,10 +2698,10 @@ async def initialize_sample_data():
                     "communication_preference": ["email", "sms", "phone"][i % 3]
                 }
             )
-            sample_members.append(member.dict())
+            sample_members.append(MEMBER_SEARCH.with_search_fields(member.dict()))
         
-        members_col.delete_many({})
-        members_col.insert_many(sample_members)
+        await members_col.delete_many({})
+        await members_col.insert_many(sample_members)
         
         # Create gaming packages
         gaming_packages_data = [
@@ -2453,8 +2739,8 @@ async def initialize_sample_data():
             )
         ]
         
-        gaming_packages_col.delete_many({})
-        gaming_packages_col.insert_many([pkg.dict() for pkg in gaming_packages_data])
+        await gaming_packages_col.delete_many({})
+        await gaming_packages_col.insert_many([pkg.dict() for pkg in gaming_packages_data])
         
         # Create diverse gaming sessions with realistic patterns
         game_types = ["Blackjack", "Roulette", "Poker", "Baccarat", "Slots", "Dragon Tiger", "Sic Bo", "Craps"]
@@ -2508,8 +2794,12 @@ async def initialize_sample_data():
             )
             sample_sessions.append(session.dict())
         
-        gaming_sessions_col.delete_many({})
-        gaming_sessions_col.insert_many(sample_sessions)
+        await gaming_sessions_col.delete_many({})
+        await gaming_sessions_col.insert_many(sample_sessions)
+        
+        # Rebuild revenue rollups for the new session history
+        await gaming_revenue_rollups_col.delete_many({})
+        await backfill_rollups(db)
         
         # Create rewards catalog
         rewards_data = [
@@ -2547,8 +2837,8 @@ async def initialize_sample_data():
             )
         ]
         
-        rewards_col.delete_many({})
-        rewards_col.insert_many([reward.dict() for reward in rewards_data])
+        await rewards_col.delete_many({})
+        await rewards_col.insert_many([reward.dict() for reward in rewards_data])
         
         # Phase 2 Sample Data - Marketing Intelligence & Travel Management
         
@@ -2631,8 +2921,8 @@ async def initialize_sample_data():
             )
             marketing_campaigns_data.append(campaign.dict())
         
-        marketing_campaigns_col.delete_many({})
-        marketing_campaigns_col.insert_many(marketing_campaigns_data)
+        await marketing_campaigns_col.delete_many({})
+        await marketing_campaigns_col.insert_many(marketing_campaigns_data)
         
         # Enhanced customer analytics with preferences and behaviors
         enhanced_analytics_data = []
@@ -2660,8 +2950,8 @@ async def initialize_sample_data():
             )
             enhanced_analytics_data.append(analytics.dict())
         
-        customer_analytics_col.delete_many({})
-        customer_analytics_col.insert_many(enhanced_analytics_data)
+        await customer_analytics_col.delete_many({})
+        await customer_analytics_col.insert_many(enhanced_analytics_data)
         
         # Generate birthday calendar
         birthday_data = []
@@ -2682,18 +2972,19 @@ async def initialize_sample_data():
             )
             birthday_data.append(birthday.dict())
         
-        birthday_calendar_col.delete_many({})
-        birthday_calendar_col.insert_many(birthday_data)
+        await birthday_calendar_col.delete_many({})
+        await birthday_calendar_col.insert_many(birthday_data)
         
         # Generate walk-in guests data
         walk_in_data = []
+        id_document_fields = await encrypt_indexed_batch("id_document", [f"200{i:07d}V" for i in range(30)])
         for i in range(30):  # 30 walk-in guests
             guest = WalkInGuest(
                 first_name=f"WalkIn{i}",
                 last_name=f"Guest{i}",
                 phone=f"077123{i:04d}",
                 nationality="Sri Lankan",
-                id_document=encrypt_sensitive_data(f"200{i:07d}V"),
+                **id_document_fields[i],
                 visit_date=datetime.utcnow() - timedelta(days=i % 7),
                 entry_time=datetime.utcnow() - timedelta(days=i % 7, hours=i % 12),
                 exit_time=datetime.utcnow() - timedelta(days=i % 7, hours=(i % 12) - 3) if i % 4 == 0 else None,
@@ -2705,8 +2996,8 @@ async def initialize_sample_data():
             )
             walk_in_data.append(guest.dict())
         
-        walk_in_guests_col.delete_many({})
-        walk_in_guests_col.insert_many(walk_in_data)
+        await walk_in_guests_col.delete_many({})
+        await walk_in_guests_col.insert_many(walk_in_data)
         
         # Generate VIP experiences
         vip_experiences_data = []
@@ -2765,8 +3056,8 @@ async def initialize_sample_data():
                 )
                 vip_experiences_enhanced.append(experience.dict())
         
-        vip_experiences_col.delete_many({})
-        vip_experiences_col.insert_many(vip_experiences_enhanced)
+        await vip_experiences_col.delete_many({})
+        await vip_experiences_col.insert_many(vip_experiences_enhanced)
         
         # Create diverse group bookings
         group_types = ["corporate_event", "wedding_celebration", "birthday_party", "anniversary", 
@@ -2812,8 +3103,8 @@ async def initialize_sample_data():
             )
             group_bookings_enhanced.append(booking.dict())
         
-        group_bookings_col.delete_many({})
-        group_bookings_col.insert_many(group_bookings_enhanced)
+        await group_bookings_col.delete_many({})
+        await group_bookings_col.insert_many(group_bookings_enhanced)
         
         # Generate group bookings
         group_bookings_data = []
@@ -2836,8 +3127,8 @@ async def initialize_sample_data():
             )
             group_bookings_data.append(booking.dict())
         
-        group_bookings_col.delete_many({})
-        group_bookings_col.insert_many(group_bookings_data)
+        await group_bookings_col.delete_many({})
+        await group_bookings_col.insert_many(group_bookings_data)
         
         # Generate marketing campaigns
         campaigns_data = [
@@ -2885,8 +3176,8 @@ async def initialize_sample_data():
             )
         ]
         
-        marketing_campaigns_col.delete_many({})
-        marketing_campaigns_col.insert_many([campaign.dict() for campaign in campaigns_data])
+        await marketing_campaigns_col.delete_many({})
+        await marketing_campaigns_col.insert_many([campaign.dict() for campaign in campaigns_data])
         
         # Phase 3 Sample Data - Staff Management & Advanced Analytics
         
@@ -2990,10 +3281,10 @@ async def initialize_sample_data():
                     "phone": f"077{i+3000000:07d}"
                 }
             )
-            enhanced_staff_data.append(staff_member.dict())
+            enhanced_staff_data.append(STAFF_SEARCH.with_search_fields(staff_member.dict()))
         
-        staff_members_col.delete_many({})
-        staff_members_col.insert_many(enhanced_staff_data)
+        await staff_members_col.delete_many({})
+        await staff_members_col.insert_many(enhanced_staff_data)
         
         # Create comprehensive training courses
         training_categories = ["safety", "technical", "customer_service", "compliance", "leadership", "gaming_skills"]
@@ -3058,8 +3349,8 @@ async def initialize_sample_data():
                 )
                 enhanced_training_courses.append(course.dict())
         
-        training_courses_col.delete_many({})
-        training_courses_col.insert_many(enhanced_training_courses)
+        await training_courses_col.delete_many({})
+        await training_courses_col.insert_many(enhanced_training_courses)
         
         # Create training records for staff
         enhanced_training_records = []
@@ -3085,8 +3376,8 @@ async def initialize_sample_data():
                 )
                 enhanced_training_records.append(record.dict())
         
-        training_records_col.delete_many({})
-        training_records_col.insert_many(enhanced_training_records)
+        await training_records_col.delete_many({})
+        await training_records_col.insert_many(enhanced_training_records)
         
         # Generate training courses
         courses_data = [
@@ -3131,8 +3422,8 @@ async def initialize_sample_data():
             )
         ]
         
-        training_courses_col.delete_many({})
-        training_courses_col.insert_many([course.dict() for course in courses_data])
+        await training_courses_col.delete_many({})
+        await training_courses_col.insert_many([course.dict() for course in courses_data])
         
         # Generate training records
         training_records_data = []
@@ -3152,8 +3443,8 @@ async def initialize_sample_data():
             )
             training_records_data.append(record.dict())
         
-        training_records_col.delete_many({})
-        training_records_col.insert_many(training_records_data)
+        await training_records_col.delete_many({})
+        await training_records_col.insert_many(training_records_data)
         
         # Generate performance reviews
         performance_data = []
@@ -3178,8 +3469,8 @@ async def initialize_sample_data():
             )
             performance_data.append(review.dict())
         
-        performance_reviews_col.delete_many({})
-        performance_reviews_col.insert_many(performance_data)
+        await performance_reviews_col.delete_many({})
+        await performance_reviews_col.insert_many(performance_data)
         
         # Generate advanced analytics
         analytics_data = [
@@ -3225,8 +3516,8 @@ async def initialize_sample_data():
             )
         ]
         
-        advanced_analytics_col.delete_many({})
-        advanced_analytics_col.insert_many([analytics.dict() for analytics in analytics_data])
+        await advanced_analytics_col.delete_many({})
+        await advanced_analytics_col.insert_many([analytics.dict() for analytics in analytics_data])
         
         # Generate cost optimization opportunities
         cost_optimization_data = [
@@ -3260,8 +3551,8 @@ async def initialize_sample_data():
             )
         ]
         
-        cost_optimization_col.delete_many({})
-        cost_optimization_col.insert_many([opt.dict() for opt in cost_optimization_data])
+        await cost_optimization_col.delete_many({})
+        await cost_optimization_col.insert_many([opt.dict() for opt in cost_optimization_data])
         
         # Generate predictive models
         models_data = [
@@ -3382,8 +3673,8 @@ async def initialize_sample_data():
             )
             enhanced_analytics_reports.append(analytics_report.dict())
         
-        advanced_analytics_col.delete_many({})
-        advanced_analytics_col.insert_many(enhanced_analytics_reports)
+        await advanced_analytics_col.delete_many({})
+        await advanced_analytics_col.insert_many(enhanced_analytics_reports)
         
         # Create diverse predictive models
         model_types = ["churn_prediction", "demand_forecasting", "price_optimization", "staff_scheduling", 
@@ -3416,8 +3707,8 @@ async def initialize_sample_data():
             )
             enhanced_predictive_models.append(model.dict())
         
-        predictive_models_col.delete_many({})
-        predictive_models_col.insert_many(enhanced_predictive_models)
+        await predictive_models_col.delete_many({})
+        await predictive_models_col.insert_many(enhanced_predictive_models)
         
         # Create comprehensive cost optimization opportunities
         optimization_areas = ["staffing", "energy", "inventory", "marketing", "operations", "technology", "facilities"]
@@ -3494,8 +3785,8 @@ async def initialize_sample_data():
             )
             enhanced_cost_optimization.append(optimization.dict())
         
-        cost_optimization_col.delete_many({})
-        cost_optimization_col.insert_many(enhanced_cost_optimization)
+        await cost_optimization_col.delete_many({})
+        await cost_optimization_col.insert_many(enhanced_cost_optimization)
         
         # Phase 4 Sample Data - Enterprise Features
         
@@ -3543,8 +3834,8 @@ async def initialize_sample_data():
             )
         ]
         
-        notification_templates_col.delete_many({})
-        notification_templates_col.insert_many([template.dict() for template in notification_templates_data])
+        await notification_templates_col.delete_many({})
+        await notification_templates_col.insert_many([template.dict() for template in notification_templates_data])
         
         # Create comprehensive notification data for visual demo
         notification_categories = ["security", "compliance", "marketing", "system", "user_activity"]
@@ -3622,8 +3913,8 @@ async def initialize_sample_data():
             )
             notifications_data.append(notification.dict())
         
-        notifications_col.delete_many({})
-        notifications_col.insert_many(notifications_data)
+        await notifications_col.delete_many({})
+        await notifications_col.insert_many(notifications_data)
         
         # Create system integrations
         integrations_data = [
@@ -3691,8 +3982,8 @@ async def initialize_sample_data():
             )
         ]
         
-        system_integrations_col.delete_many({})
-        system_integrations_col.insert_many([integration.dict() for integration in integrations_data])
+        await system_integrations_col.delete_many({})
+        await system_integrations_col.insert_many([integration.dict() for integration in integrations_data])
         
         # Create comprehensive user activity tracking data
         activity_tracking_data = []
@@ -3740,8 +4031,8 @@ async def initialize_sample_data():
             )
             activity_tracking_data.append(activity.dict())
         
-        user_activity_tracking_col.delete_many({})
-        user_activity_tracking_col.insert_many(activity_tracking_data)
+        await user_activity_tracking_col.delete_many({})
+        await user_activity_tracking_col.insert_many(activity_tracking_data)
         
         # Create realistic real-time events for monitoring dashboard
         event_types = ["user_action", "system_alert", "security_incident", "compliance_violation", "performance_alert"]
@@ -3823,8 +4114,8 @@ async def initialize_sample_data():
             )
             real_time_events_data.append(event.dict())
         
-        real_time_events_col.delete_many({})
-        real_time_events_col.insert_many(real_time_events_data)
+        await real_time_events_col.delete_many({})
+        await real_time_events_col.insert_many(real_time_events_data)
         
         # Create data retention policies
         retention_policies_data = [
@@ -3887,17 +4178,245 @@ async def initialize_sample_data():
                 approved_by=admin_users[0]["id"],
                 approval_date=datetime.utcnow(),
                 next_review_date=datetime.utcnow() + timedelta(days=365)
+            ),
+            DataRetentionPolicy(
+                policy_name="Real-time Event Stream",
+                data_category="system_events",
+                retention_period_days=365,
+                auto_delete=True,
+                encryption_required=False,
+                backup_required=False,
+                legal_basis="Operational monitoring - incidents are escalated to compliance reports",
+                status="active",
+                created_by=admin_users[0]["id"],
+                approved_by=admin_users[0]["id"],
+                approval_date=datetime.utcnow(),
+                next_review_date=datetime.utcnow() + timedelta(days=365)
+            ),
+            DataRetentionPolicy(
+                policy_name="User Activity Tracking",
+                data_category="user_activity",
+                retention_period_days=180,
+                auto_delete=True,
+                encryption_required=False,
+                backup_required=False,
+                legal_basis="PDPA 2022 - Usage analytics kept no longer than necessary",
+                status="active",
+                created_by=admin_users[0]["id"],
+                approved_by=admin_users[0]["id"],
+                approval_date=datetime.utcnow(),
+                next_review_date=datetime.utcnow() + timedelta(days=365)
             )
         ]
         
-        data_retention_policies_col.delete_many({})
-        data_retention_policies_col.insert_many([policy.dict() for policy in retention_policies_data])
+        await data_retention_policies_col.delete_many({})
+        await data_retention_policies_col.insert_many([policy.dict() for policy in retention_policies_data])
+        await apply_retention_ttls(db)
+        
+        # Catalog collections were replaced wholesale
+        catalog_cache.clear()
+        count_cache.clear()
         
         return {"message": "Sample data initialized successfully"}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error initializing data: {str(e)}")
 
+# Live Updates
+LIVE_ROW_LIMIT = int(os.getenv("LIVE_ROW_LIMIT", "100"))  # Rows per list topic
+
+@live_hub.topic("dashboard_metrics")
+async def live_dashboard_metrics():
+    return (await compute_dashboard_metrics()).dict()
+
+@live_hub.topic("active_sessions")
+async def live_active_sessions():
+    sessions = await gaming_sessions_col.find(
+        {"status": "active"},
+        {"_id": 0, "id": 1, "member_id": 1, "game_type": 1, "table_number": 1, "machine_number": 1,
+         "buy_in_amount": 1, "session_start": 1}
+    ).sort([("session_start", -1), ("id", -1)]).limit(LIVE_ROW_LIMIT).to_list(None)
+    return {session["id"]: session for session in sessions}
+
+@live_hub.topic("real_time_events", roles=MANAGEMENT_ROLES)
+async def live_real_time_events():
+    events = await real_time_events_col.find({"resolved": False}, {"_id": 0}).sort(
+        [("timestamp", -1), ("id", -1)]
+    ).limit(LIVE_ROW_LIMIT).to_list(None)
+    return {event["id"]: event for event in events}
+
+@live_hub.topic("notifications", roles=ADMIN_ROLES)
+async def live_notifications():
+    notifications = await notifications_col.find({}, {"_id": 0}).sort(
+        [("created_at", -1), ("id", -1)]
+    ).limit(LIVE_ROW_LIMIT).to_list(None)
+    return {notification["id"]: notification for notification in notifications}
+
+@live_hub.topic("report_jobs", roles=ADMIN_ROLES)
+async def live_report_jobs():
+    jobs = await report_jobs_col.find({}, JOB_STATUS_PROJECTION).sort(
+        [("created_at", -1), ("id", -1)]
+    ).limit(LIVE_ROW_LIMIT).to_list(None)
+    return {job["id"]: job for job in jobs}
+
+@app.websocket("/ws/live")
+async def live_updates(websocket: WebSocket, token: str = ""):
+    """Server-pushed dashboard deltas; authenticate with ?token=<access token>"""
+    try:
+        token_payload = authenticate_token(token)
+    except HTTPException:
+        await websocket.close(code=CLOSE_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    await live_hub.serve(websocket, token_payload)
+
+# Event Subscribers
+# Live topics affected by writes to each collection
+LIVE_TOPICS_BY_COLLECTION = {
+    "gaming_sessions": ("active_sessions",),
+    "real_time_events": ("real_time_events",),
+    "notifications": ("notifications",),
+    REPORT_JOBS_COLLECTION: ("report_jobs",),
+}
+
+@event_bus.on("*", inline=True)
+def invalidate_catalog_cache(event):
+    """Inline so the writer's next request already sees the change"""
+    entity = event.topic.split(".", 1)[0]
+    if entity in catalog_cache.ttls:
+        catalog_cache.invalidate(entity)
+
+@event_bus.on("*", inline=True)
+def invalidate_list_totals(event):
+    count_cache.invalidate(event.topic.split(".", 1)[0])
+
+@event_bus.on("*", inline=True)
+def push_live_views(event):
+    live_hub.refresh_soon(*LIVE_TOPICS_BY_COLLECTION.get(event.topic.split(".", 1)[0], ()))
+
+@event_bus.on("gaming_sessions.completed", inline=True)
+def refresh_revenue_views(event):
+    """The completion route has already updated the rollups; drop what was computed from the old ones"""
+    aggregate_cache.invalidate("dashboard_metrics")
+    live_hub.refresh_soon("dashboard_metrics")
+
+@event_bus.on("data_retention_policies.*")
+async def apply_retention_policy_ttls(event):
+    """Time-series expiry follows the retention policies"""
+    await apply_retention_ttls(db)
+
+@event_bus.on("real_time_events.created")
+async def notify_critical_event(event):
+    """Auto-create an admin notification for critical events"""
+    real_time_event = event.payload
+    if real_time_event["severity"] != "critical" and not real_time_event["requires_action"]:
+        return
+    notification = Notification(
+        category="system",
+        recipient_type="admin",
+        title=f"Critical Event: {real_time_event['title']}",
+        content=f"Event: {real_time_event['description']}\nSource: {real_time_event['source']}",
+        priority="high" if real_time_event["severity"] == "critical" else "normal",
+        channels=["in_app", "email"]
+    )
+    notification_dict = notification.dict()
+    await notifications_col.insert_one(notification_dict)
+    await event_bus.publish("notifications.created", notification_dict)
+
+# Cross-worker Cache Invalidation
+def _invalidate_catalog(entity: str):
+    return lambda ids: catalog_cache.invalidate(entity)
+
+for cached_entity in catalog_cache.ttls:
+    invalidation_watcher.register(cached_entity, _invalidate_catalog(cached_entity))
+
+# Collections with cached list totals -> the indexed timestamp polling can follow (None: change streams only)
+COUNTED_COLLECTIONS: Dict[str, Optional[str]] = {
+    "members": None,
+    "gaming_sessions": None,
+    "rewards": "updated_at",
+    "audit_logs": "timestamp",
+    "marketing_campaigns": "created_at",
+    "walk_in_guests": None,
+    "birthday_calendar": None,
+    "vip_experiences": None,
+    "group_bookings": None,
+    "staff_members": None,
+    "training_records": None,
+    "notifications": "created_at",
+    "compliance_reports": "created_at",
+    REPORT_JOBS_COLLECTION: "created_at",
+    "real_time_events": "timestamp",
+}
+
+def _invalidate_counts(collection: str):
+    return lambda ids: count_cache.invalidate(collection)
+
+for counted_collection, timestamp_field in COUNTED_COLLECTIONS.items():
+    invalidation_watcher.register(
+        counted_collection, _invalidate_counts(counted_collection), timestamp_field=timestamp_field,
+        always_poll=counted_collection in TIME_SERIES_COLLECTIONS
+    )
+
+invalidation_watcher.register("admin_users", lambda ids: user_profiles.clear())
+invalidation_watcher.register(REVOKED_TOKENS_COLLECTION, lambda ids: revocation_list.load(), timestamp_field="revoked_at")
+
+# Monitoring Routes
+@app.get("/api/monitoring/metrics")
+async def get_monitoring_metrics(token_payload: dict = Depends(verify_token)):
+    """Get internal performance counters for monitoring"""
+    if not role_allowed(token_payload, ADMIN_ROLES):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    return {
+        "cache": catalog_cache.metrics(),
+        "counts": count_cache.metrics(),
+        "database_commands": command_counter.metrics(),
+        "audit_writer": audit_writer.metrics(),
+        "activity_writer": activity_writer.metrics(),
+        "auth": {"token_cache": token_cache.metrics(), "revoked_tokens": len(revocation_list)},
+        "live": live_hub.metrics(),
+        "aggregates": aggregate_cache.metrics(),
+        "events": event_bus.metrics(),
+        "invalidation": invalidation_watcher.metrics(),
+        "jobs": job_runner.metrics(),
+        "timestamp": datetime.utcnow()
+    }
+
+# Application Lifecycle
+@app.on_event("startup")
+async def startup_event():
+    """Start background services"""
+    # Stream collections must exist as time-series before the first insert would create them
+    await ensure_time_series_collections(db)
+    # Index builds run in the background so startup is not blocked on large collections
+    app.state.index_bootstrap = asyncio.create_task(ensure_indexes(db))
+    await audit_writer.start()
+    await activity_writer.start()
+    await revocation_list.load()
+    app.state.revocation_refresh = asyncio.create_task(revocation_list.refresh_forever())
+    app.state.rollup_reconciler = asyncio.create_task(reconcile_forever(db))
+    await invalidation_watcher.start()
+    event_bus.start()
+    live_hub.start()
+    job_runner.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release background resources on shutdown"""
+    app.state.revocation_refresh.cancel()
+    app.state.rollup_reconciler.cancel()
+    await job_runner.stop()
+    await invalidation_watcher.stop()
+    await live_hub.stop()
+    await event_bus.stop()
+    await activity_writer.stop()
+    await audit_writer.stop()
+    shutdown_password_pool()
+    shutdown_encryption_pool()
+    shutdown_job_pool()
+    close_client()
+
 # Health check route
 @app.get("/api/health")
 async def health_check():
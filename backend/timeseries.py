@@ -0,0 +1,252 @@
+"""
+Time-series storage for the append-only event streams.
+
+``real_time_events`` and ``user_activity_tracking`` are written once, keyed
+by ``timestamp`` and always read newest-first, so they are stored as MongoDB
+time-series collections (MongoDB 6.0+ for the secondary indexes on
+measurement fields). Documents keep their shape: the metaField is an
+existing top-level field (``event_type`` / ``user_id``), so routes query them
+exactly as before.
+
+Expiry is driven by data retention policies: each collection maps to a
+``DataRetentionPolicy.data_category``, and the longest
+``retention_period_days`` among that category's active, auto-delete
+policies becomes the collection's ``expireAfterSeconds`` (no such policy
+means no expiry). TTLs are re-applied whenever a policy is written.
+
+Existing deployments migrate online: the ordinary collection is renamed
+aside, an empty time-series collection takes its name (so writes continue
+immediately), and history is copied back newest-first in checkpointed
+chunks. Re-running ``migrate`` resumes from the checkpoint.
+
+Usage:
+    python timeseries.py status
+    python timeseries.py migrate <collection> [--chunk-size N] [--pause-ms N] [--drop-legacy]
+    python timeseries.py apply-ttl
+"""
+import asyncio
+import logging
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import DESCENDING
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from database import db
+
+# Collection name -> time-series options and the retention category that drives its TTL
+TIME_SERIES_COLLECTIONS: Dict[str, Dict[str, Any]] = {
+    "real_time_events": {
+        "timeseries": {"timeField": "timestamp", "metaField": "event_type", "granularity": "hours"},
+        "data_category": "system_events",
+    },
+    "user_activity_tracking": {
+        "timeseries": {"timeField": "timestamp", "metaField": "user_id", "granularity": "minutes"},
+        "data_category": "user_activity",
+    },
+}
+
+MIGRATION_STATE_COLLECTION = "timeseries_migrations"
+MIGRATION_CHUNK_SIZE = 5000
+MIGRATION_MAX_RENAME_ATTEMPTS = 5
+SECONDS_PER_DAY = 86400
+
+
+async def collection_type(database, name: str) -> Optional[str]:
+    """``"timeseries"``, ``"collection"`` (or ``"view"``), or None if it does not exist"""
+    infos = await database.motor_database.list_collections(filter={"name": name}).to_list(None)
+    return infos[0].get("type", "collection") if infos else None
+
+
+async def create_time_series(database, name: str):
+    spec = TIME_SERIES_COLLECTIONS[name]
+    options = {"timeseries": spec["timeseries"]}
+    ttl = await retention_ttl_seconds(database, spec["data_category"])
+    if ttl is not None:
+        options["expireAfterSeconds"] = ttl
+    await database.motor_database.create_collection(name, **options)
+    logging.info(f"Created time-series collection {name} (TTL: {ttl or 'none'})")
+
+
+async def ensure_time_series_collections(database=db):
+    """Create missing stream collections as time-series; run before anything can insert into them"""
+    for name in TIME_SERIES_COLLECTIONS:
+        try:
+            kind = await collection_type(database, name)
+            if kind is None:
+                await create_time_series(database, name)
+            elif kind != "timeseries":
+                logging.warning(f"{name} is an ordinary collection; run `python timeseries.py migrate {name}`")
+        except CollectionInvalid:
+            pass  # Created concurrently by another worker
+        except PyMongoError as e:
+            logging.error(f"Could not create time-series collection {name}: {e}")
+    await apply_retention_ttls(database)
+
+
+# Retention
+
+async def retention_ttl_seconds(database, data_category: str) -> Optional[int]:
+    """Longest retention among the category's active auto-delete policies; deleting earlier would break one"""
+    policies = await database.data_retention_policies.find(
+        {"data_category": data_category, "status": "active", "auto_delete": True}, {"retention_period_days": 1}
+    ).to_list(None)
+    days = [policy["retention_period_days"] for policy in policies if policy.get("retention_period_days")]
+    return max(days) * SECONDS_PER_DAY if days else None
+
+
+async def apply_retention_ttls(database=db) -> Dict[str, Optional[int]]:
+    """Set each time-series collection's expireAfterSeconds from its retention policies"""
+    applied = {}
+    for name, spec in TIME_SERIES_COLLECTIONS.items():
+        try:
+            if await collection_type(database, name) != "timeseries":
+                continue
+            ttl = await retention_ttl_seconds(database, spec["data_category"])
+            await database.command({"collMod": name, "expireAfterSeconds": ttl if ttl is not None else "off"})
+            applied[name] = ttl
+        except PyMongoError as e:
+            logging.error(f"Could not apply retention TTL to {name}: {e}")
+    return applied
+
+
+# Online migration
+
+async def _swap_in_time_series(database, name: str) -> List[str]:
+    """Rename the ordinary collection aside and create the time-series one under its name.
+
+    An insert landing between the rename and the create recreates an
+    ordinary collection; that one is renamed aside too and the create retried.
+    """
+    legacy = []
+    for attempt in range(MIGRATION_MAX_RENAME_ATTEMPTS):
+        kind = await collection_type(database, name)
+        if kind == "timeseries":
+            return legacy
+        if kind is not None:
+            legacy_name = f"{name}_legacy_{datetime.utcnow():%Y%m%d%H%M%S}_{attempt}"
+            await database.motor_database.client.admin.command(
+                "renameCollection", f"{database.name}.{name}", to=f"{database.name}.{legacy_name}"
+            )
+            legacy.append(legacy_name)
+        try:
+            await create_time_series(database, name)
+            return legacy
+        except CollectionInvalid:
+            continue
+    raise RuntimeError(f"Could not swap {name} for a time-series collection after {MIGRATION_MAX_RENAME_ATTEMPTS} attempts")
+
+
+# Time-series documents must have a date in the time field; anything else stays behind
+HAS_DATE = {"timestamp": {"$type": "date"}}
+
+
+def _older_than(checkpoint: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not checkpoint:
+        return HAS_DATE
+    return {"$or": [
+        {"timestamp": {"$lt": checkpoint["timestamp"]}},
+        {"timestamp": checkpoint["timestamp"], "_id": {"$lt": checkpoint["_id"]}},
+    ]}
+
+
+async def _copy_chunk(database, name: str, documents: List[Dict[str, Any]]) -> int:
+    """Insert documents not already in the target (a chunk may be retried after a crash)"""
+    timestamps = [document["timestamp"] for document in documents]
+    existing = {
+        document["_id"] async for document in database[name].find(
+            {"timestamp": {"$gte": min(timestamps), "$lte": max(timestamps)},
+             "_id": {"$in": [document["_id"] for document in documents]}},
+            {"_id": 1}
+        )
+    }
+    fresh = [document for document in documents if document["_id"] not in existing]
+    if fresh:
+        await database[name].insert_many(fresh, ordered=False)
+    return len(fresh)
+
+
+async def migrate(database, name: str, chunk_size: int = MIGRATION_CHUNK_SIZE, pause_ms: int = 0,
+                  drop_legacy: bool = False) -> Dict[str, Any]:
+    """Move ``name`` onto a time-series collection without stopping writers; resumable"""
+    if name not in TIME_SERIES_COLLECTIONS:
+        raise ValueError(f"{name} is not a registered time-series collection")
+    states = database[MIGRATION_STATE_COLLECTION]
+    state = await states.find_one({"_id": name}) or {"_id": name, "legacy": [], "checkpoints": {}, "copied": 0,
+                                                       "skipped": 0, "started_at": datetime.utcnow()}
+
+    for legacy_name in await _swap_in_time_series(database, name):
+        if legacy_name not in state["legacy"]:
+            state["legacy"].append(legacy_name)
+    state["status"] = "copying"
+    await states.replace_one({"_id": name}, state, upsert=True)
+
+    for legacy_name in state["legacy"]:
+        # Newest first, so recent list pages are complete after the first chunks
+        while True:
+            checkpoint = state["checkpoints"].get(legacy_name)
+            documents = await database[legacy_name].find(_older_than(checkpoint)).sort(
+                [("timestamp", DESCENDING), ("_id", DESCENDING)]
+            ).limit(chunk_size).to_list(None)
+            if not documents:
+                break
+            state["copied"] += await _copy_chunk(database, name, documents)
+            last = documents[-1]
+            state["checkpoints"][legacy_name] = {"timestamp": last["timestamp"], "_id": last["_id"]}
+            await states.replace_one({"_id": name}, state)
+            print(f"   {name}: {state['copied']} copied from {legacy_name} (down to {last['timestamp']:%Y-%m-%d %H:%M})")
+            if pause_ms:
+                await asyncio.sleep(pause_ms / 1000)
+
+    state["skipped"] = sum([
+        await database[legacy_name].count_documents({"timestamp": {"$not": {"$type": "date"}}})
+        for legacy_name in state["legacy"]
+    ])
+    if drop_legacy and state["skipped"]:
+        logging.warning(f"Keeping legacy {name} collections: {state['skipped']} documents have no timestamp")
+    elif drop_legacy:
+        for legacy_name in state["legacy"]:
+            await database[legacy_name].drop()
+        state["legacy"], state["checkpoints"] = [], {}
+    state["status"] = "complete"
+    state["completed_at"] = datetime.utcnow()
+    await states.replace_one({"_id": name}, state)
+    return state
+
+
+async def _main(argv: List[str]) -> int:
+    from indexes import ensure_indexes
+
+    if not argv or argv[0] not in ("status", "migrate", "apply-ttl"):
+        print(__doc__)
+        return 2
+
+    if argv[0] == "status":
+        for name, spec in TIME_SERIES_COLLECTIONS.items():
+            ttl = await retention_ttl_seconds(db, spec["data_category"])
+            state = await db[MIGRATION_STATE_COLLECTION].find_one({"_id": name}) or {}
+            print(f"{name}: {await collection_type(db, name) or 'missing'}, "
+                  f"retention TTL {ttl // SECONDS_PER_DAY if ttl else 'none'} days, "
+                  f"migration {state.get('status', 'not started')}")
+        return 0
+
+    if argv[0] == "apply-ttl":
+        for name, ttl in (await apply_retention_ttls(db)).items():
+            print(f"{name}: expireAfterSeconds={ttl if ttl is not None else 'off'}")
+        return 0
+
+    if len(argv) < 2:
+        print(__doc__)
+        return 2
+    chunk_size = int(argv[argv.index("--chunk-size") + 1]) if "--chunk-size" in argv else MIGRATION_CHUNK_SIZE
+    pause_ms = int(argv[argv.index("--pause-ms") + 1]) if "--pause-ms" in argv else 0
+    state = await migrate(db, argv[1], chunk_size=chunk_size, pause_ms=pause_ms, drop_legacy="--drop-legacy" in argv)
+    await ensure_indexes(db)
+    print(f"{argv[1]}: {state['status']}, {state['copied']} documents copied, {state['skipped']} skipped "
+          f"(no timestamp), legacy collections: {', '.join(state['legacy']) or 'dropped'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
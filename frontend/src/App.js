@@ -28,6 +28,7 @@ import SecurityMonitoring from './components/SecurityMonitoring';
 import CasinoFloor from './components/CasinoFloor';
 import Settings from './components/Settings';
 import EmergencyBroadcast from './components/EmergencyBroadcast';
+import PageViewTracker from './components/PageViewTracker';
 
 // Mobile App
 import MobileApp from './MobileApp';
@@ -148,6 +149,7 @@ function App() {
     <ThemeProvider>
       <Router>
         <div className="min-h-screen bg-adaptive-bg">
+          <PageViewTracker />
           {!user ? (
             <>
               <Login onLogin={handleLogin} onDirectAccess={handleDirectAccess} loading={loading} />
@@ -8,6 +8,7 @@ import MobileLogin from './components/mobile/MobileLogin';
 import MobileLayout from './components/mobile/MobileLayout';
 import MobileDashboard from './components/mobile/MobileDashboard';
 import MobileCasinoFloor from './components/mobile/MobileCasinoFloor';
+import PageViewTracker from './components/PageViewTracker';
 
 // Regular desktop components (with mobile responsiveness)
 import GamingManagement from './components/GamingManagement';
@@ -90,6 +91,7 @@ function MobileApp() {
     <ThemeProvider>
       <Router>
         <div className="min-h-screen bg-gray-50">
+          <PageViewTracker />
           <Toaster
             position="top-center"
             toastOptions={{
@@ -21,6 +21,7 @@ import {
   ArcElement,
 } from 'chart.js';
 import apiService from '../services/apiService';
+import liveService from '../services/liveService';
 import { toast } from 'react-hot-toast';
 
 // Register Chart.js components
@@ -46,11 +47,22 @@ const Dashboard = ({ user }) => {
 
   useEffect(() => {
     fetchDashboardMetrics();
-    
-    // Set up real-time updates
-    const interval = setInterval(fetchDashboardMetrics, 30000); // Update every 30 seconds
-    
-    return () => clearInterval(interval);
+
+    // Real-time updates are pushed over /ws/live; poll only while the socket is down
+    const unsubscribe = liveService.subscribe('dashboard_metrics', (data) => {
+      setMetrics(data);
+      setLoading(false);
+    });
+    const interval = setInterval(() => {
+      if (!liveService.isConnected) {
+        fetchDashboardMetrics();
+      }
+    }, 30000);
+
+    return () => {
+      unsubscribe();
+      clearInterval(interval);
+    };
   }, []);
 
   const fetchDashboardMetrics = async () => {
@@ -0,0 +1,16 @@
+import { useEffect } from 'react';
+import { useLocation } from 'react-router-dom';
+import activityService from '../services/activityService';
+
+// Records a page view for every route change; renders nothing
+const PageViewTracker = () => {
+  const location = useLocation();
+
+  useEffect(() => {
+    activityService.trackPageView(location.pathname);
+  }, [location.pathname]);
+
+  return null;
+};
+
+export default PageViewTracker;
@@ -0,0 +1,76 @@
+const API_BASE_URL = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
+const FLUSH_INTERVAL_MS = 5000;
+const MAX_BUFFERED_EVENTS = 50;
+
+const newSessionId = () => `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+
+// Buffers page views and actions and posts them to /api/analytics/activity in
+// NDJSON batches: every few seconds, when the buffer fills up, and when the
+// tab is hidden (keepalive lets that last request outlive the page).
+class ActivityService {
+  constructor() {
+    this.buffer = [];
+    this.sessionId = sessionStorage.getItem('activity_session_id') || newSessionId();
+    sessionStorage.setItem('activity_session_id', this.sessionId);
+    this.timer = setInterval(() => this.flush(), FLUSH_INTERVAL_MS);
+    document.addEventListener('visibilitychange', () => {
+      if (document.visibilityState === 'hidden') {
+        this.flush();
+      }
+    });
+  }
+
+  get deviceType() {
+    return /Mobi|Android|iPhone|iPad/i.test(navigator.userAgent) ? 'mobile' : 'desktop';
+  }
+
+  track(activityType, details = {}) {
+    const user = JSON.parse(localStorage.getItem('user_data') || 'null');
+    if (!user) {
+      return;
+    }
+    this.buffer.push({
+      user_type: 'admin',
+      user_id: user.id,
+      session_id: this.sessionId,
+      activity_type: activityType,
+      device_type: this.deviceType,
+      browser: navigator.userAgent,
+      referrer: document.referrer || null,
+      timestamp: new Date().toISOString(),
+      ...details,
+    });
+    if (this.buffer.length >= MAX_BUFFERED_EVENTS) {
+      this.flush();
+    }
+  }
+
+  trackPageView(pageUrl) {
+    this.track('page_view', { page_url: pageUrl });
+  }
+
+  trackAction(actionName, metadata = {}) {
+    this.track('action', { page_url: window.location.pathname, action_name: actionName, metadata });
+  }
+
+  flush() {
+    const token = localStorage.getItem('access_token');
+    if (this.buffer.length === 0 || !token || token === 'temp-mock-token') {
+      return;
+    }
+    const events = this.buffer.splice(0, this.buffer.length);
+    fetch(`${API_BASE_URL}/api/analytics/activity`, {
+      method: 'POST',
+      keepalive: true,
+      headers: {
+        'Content-Type': 'application/x-ndjson',
+        'Authorization': `Bearer ${token}`,
+      },
+      body: events.map((event) => JSON.stringify(event)).join('\n'),
+    }).catch(() => {
+      // Telemetry is best effort; never surface failures to the user
+    });
+  }
+}
+
+export default new ActivityService();
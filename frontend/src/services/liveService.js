@@ -0,0 +1,93 @@
+const API_BASE_URL = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
+const RECONNECT_DELAY_MS = 5000;
+
+// Client for the /ws/live push channel. Keeps one socket per tab, applies
+// snapshots and deltas to a local copy of each topic and calls listeners with
+// the merged state.
+class LiveService {
+  constructor() {
+    this.socket = null;
+    this.listeners = {};   // topic -> Set of callbacks
+    this.state = {};       // topic -> latest merged state
+    this.reconnectTimer = null;
+  }
+
+  get isConnected() {
+    return this.socket !== null && this.socket.readyState === WebSocket.OPEN;
+  }
+
+  connect() {
+    const token = localStorage.getItem('access_token');
+    if (!token || token === 'temp-mock-token' || this.socket) {
+      return;
+    }
+
+    const url = `${API_BASE_URL.replace(/^http/, 'ws')}/ws/live?token=${encodeURIComponent(token)}`;
+    this.socket = new WebSocket(url);
+
+    this.socket.onopen = () => {
+      const topics = Object.keys(this.listeners);
+      if (topics.length > 0) {
+        this.send({ action: 'subscribe', topics });
+      }
+    };
+
+    this.socket.onmessage = (event) => this.handleMessage(JSON.parse(event.data));
+
+    this.socket.onclose = () => {
+      this.socket = null;
+      if (Object.keys(this.listeners).length > 0) {
+        clearTimeout(this.reconnectTimer);
+        this.reconnectTimer = setTimeout(() => this.connect(), RECONNECT_DELAY_MS);
+      }
+    };
+  }
+
+  send(message) {
+    if (this.isConnected) {
+      this.socket.send(JSON.stringify(message));
+    }
+  }
+
+  handleMessage(message) {
+    const { type, topic } = message;
+    if (type === 'snapshot') {
+      this.state[topic] = message.data;
+    } else if (type === 'delta') {
+      const next = { ...(this.state[topic] || {}), ...message.changed };
+      message.removed.forEach((key) => delete next[key]);
+      this.state[topic] = next;
+    } else {
+      return;
+    }
+    (this.listeners[topic] || []).forEach((callback) => callback(this.state[topic]));
+  }
+
+  // Returns an unsubscribe function
+  subscribe(topic, callback) {
+    if (!this.listeners[topic]) {
+      this.listeners[topic] = new Set();
+      this.send({ action: 'subscribe', topics: [topic] });
+    }
+    this.listeners[topic].add(callback);
+    if (this.state[topic]) {
+      callback(this.state[topic]);
+    }
+    this.connect();
+
+    return () => {
+      this.listeners[topic].delete(callback);
+      if (this.listeners[topic].size === 0) {
+        delete this.listeners[topic];
+        delete this.state[topic];
+        this.send({ action: 'unsubscribe', topics: [topic] });
+      }
+      if (Object.keys(this.listeners).length === 0 && this.socket) {
+        clearTimeout(this.reconnectTimer);
+        this.socket.close();
+      }
+    };
+  }
+}
+
+export default new LiveService();
@@ -0,0 +1,795 @@
+#!/usr/bin/env python3
+"""
+Performance & Load Testing Script
+Focus: API latency under concurrency, event loop responsiveness and backend throughput
+
+Usage:
+    python performance_test.py                 # run every scenario
+    python performance_test.py event_loop      # run a single scenario
+
+Scenarios that seed bulk data connect to MongoDB directly using MONGO_URL and
+DATABASE_NAME; point PERF_BASE_URL at the API server that uses that database.
+"""
+
+import json
+import os
+import requests
+import sys
+import time
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of latencies"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class BallyCasinoPerformanceTester:
+    def __init__(self, base_url=os.getenv("PERF_BASE_URL", "https://casino-enterprise.preview.emergentagent.com")):
+        self.base_url = base_url
+        self.token = None
+        self.tests_run = 0
+        self.tests_passed = 0
+        self.results = {}
+
+    def headers(self):
+        test_headers = {'Content-Type': 'application/json'}
+        if self.token:
+            test_headers['Authorization'] = f'Bearer {self.token}'
+        return test_headers
+
+    def check(self, name, condition, detail=""):
+        """Record the outcome of a performance assertion"""
+        self.tests_run += 1
+        if condition:
+            self.tests_passed += 1
+            print(f"✅ {name} {detail}")
+        else:
+            print(f"❌ {name} {detail}")
+        return condition
+
+    def setup(self, username="superadmin", password="admin123"):
+        """Initialize sample data and login"""
+        print("\n🔧 Preparing test environment...")
+        response = requests.post(f"{self.base_url}/api/init/sample-data", timeout=300)
+        if response.status_code != 200:
+            print(f"❌ Sample data initialization failed: {response.status_code}")
+            return False
+
+        response = requests.post(
+            f"{self.base_url}/api/auth/login",
+            json={"username": username, "password": password}
+        )
+        if response.status_code != 200:
+            print(f"❌ Login failed: {response.status_code}")
+            return False
+
+        self.token = response.json()['access_token']
+        print("✅ Sample data initialized and logged in")
+        return True
+
+    def timed_request(self, session, method, endpoint, data=None):
+        """Issue one request and return (latency_ms, status_code)"""
+        url = f"{self.base_url}/{endpoint}"
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, json=data, headers=self.headers(), timeout=120)
+            status_code = response.status_code
+        except Exception:
+            status_code = 0
+        return (time.perf_counter() - start) * 1000, status_code
+
+    def measure_latency(self, endpoint, total_requests=200, concurrency=20, method="GET", data=None):
+        """Fire total_requests at an endpoint with the given concurrency"""
+        local = threading.local()
+
+        def worker(_):
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            return self.timed_request(local.session, method, endpoint, data)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(worker, range(total_requests)))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, status_code in samples]
+        errors = len([1 for latency, status_code in samples if status_code >= 400 or status_code == 0])
+        return {
+            "requests": total_requests,
+            "errors": errors,
+            "throughput_rps": round(total_requests / elapsed, 1) if elapsed else 0,
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+        }
+
+    def mongo_database(self):
+        """Direct database handle for bulk seeding"""
+        from pymongo import MongoClient
+        client = MongoClient(os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+        return client[os.getenv("DATABASE_NAME", "ballys_casino_admin")]
+
+    def seed_gaming_sessions(self, database, target=1_000_000, batch_size=10_000):
+        """Top up gaming_sessions with synthetic rows until it holds target documents"""
+        sessions = database.gaming_sessions
+        existing = sessions.estimated_document_count()
+        member_ids = [m["id"] for m in database.members.find({}, {"id": 1}).limit(1000)] or [str(uuid.uuid4())]
+        game_types = ["Blackjack", "Roulette", "Poker", "Baccarat", "Slots", "Dragon Tiger", "Sic Bo", "Craps"]
+        now = datetime.utcnow()
+
+        to_insert = max(0, target - existing)
+        print(f"   Seeding {to_insert} synthetic gaming sessions...")
+        inserted = 0
+        while inserted < to_insert:
+            batch = []
+            for i in range(inserted, min(inserted + batch_size, to_insert)):
+                buy_in = float(50 + (i % 40) * 25)
+                completed = i % 10 != 0
+                cash_out = buy_in * (0.4 + (i % 17) * 0.075)
+                batch.append({
+                    "id": str(uuid.uuid4()),
+                    "member_id": member_ids[i % len(member_ids)],
+                    "session_start": now - timedelta(minutes=i % (365 * 24 * 60)),
+                    "game_type": game_types[i % len(game_types)],
+                    "table_number": f"T{(i % 25) + 1}",
+                    "buy_in_amount": buy_in,
+                    "cash_out_amount": round(cash_out, 2) if completed else None,
+                    "net_result": round(cash_out - buy_in, 2) if completed else None,
+                    "points_earned": float(int(buy_in / 10)),
+                    "status": "completed" if completed else "active",
+                    "benchmark_seed": True
+                })
+            sessions.insert_many(batch, ordered=False)
+            inserted += len(batch)
+        return sessions.estimated_document_count()
+
+    def rebuild_rollups(self, database, since):
+        """Recompute the revenue rollups from gaming_sessions from since onwards (see backend/rollups.py)"""
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+        import asyncio
+        from database import AsyncDatabase, create_client
+        from rollups import ALL_TIME, ROLLUP_COLLECTION, backfill_rollups, bucket_start
+
+        # Buckets left with no sessions are not touched by the backfill's $merge, so drop them first
+        database[ROLLUP_COLLECTION].delete_many(
+            {"$or": [{"bucket": {"$gte": bucket_start(since, "day")}}, {"granularity": ALL_TIME}]}
+        )
+
+        async def backfill():
+            client = create_client(os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+            try:
+                await backfill_rollups(AsyncDatabase(client[database.name]), since)
+            finally:
+                client.close()
+
+        asyncio.run(backfill())
+
+    def seed_members(self, database, target=500_000, batch_size=10_000):
+        """Top up members with synthetic, search-indexed rows until it holds target documents"""
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+        from search import MEMBER_SEARCH
+
+        members = database.members
+        existing = members.estimated_document_count()
+        first_names = ["Chaminda", "Priyanka", "Kasun", "Nimali", "Rajesh", "Sanduni", "Thilina", "Madhavi", "Dinesh", "Isuri"]
+        last_names = ["Fernando", "Silva", "Perera", "Jayawardena", "Gunasekera", "Wickramasinghe", "Rajapakse", "Mendis"]
+        now = datetime.utcnow()
+
+        to_insert = max(0, target - existing)
+        print(f"   Seeding {to_insert} synthetic members...")
+        inserted = 0
+        while inserted < to_insert:
+            batch = []
+            for i in range(inserted, min(inserted + batch_size, to_insert)):
+                first_name = first_names[i % len(first_names)]
+                last_name = last_names[(i // len(first_names)) % len(last_names)]
+                batch.append(MEMBER_SEARCH.with_search_fields({
+                    "id": str(uuid.uuid4()),
+                    "member_number": f"BM{i:07d}",
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "email": f"{first_name.lower()}.{last_name.lower()}{i}@example.lk",
+                    "tier": ["Ruby", "Sapphire", "Diamond", "VIP"][i % 4],
+                    "is_active": True,
+                    "registration_date": now - timedelta(days=i % 1000),
+                    "last_visit": now - timedelta(days=i % 90),
+                    "benchmark_seed": True
+                }))
+            members.insert_many(batch, ordered=False)
+            inserted += len(batch)
+        return members.estimated_document_count()
+
+    def print_stats(self, label, stats):
+        print(f"   {label}: p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms "
+              f"p99={stats['p99_ms']}ms rps={stats['throughput_rps']} errors={stats['errors']}")
+
+    # Scenarios
+
+    def test_event_loop_responsiveness(self):
+        """Concurrent p99 latency must not collapse while a heavy report runs"""
+        print("\n🔍 Scenario: event loop responsiveness under a heavy report")
+        light_endpoint = "api/members?limit=20"
+
+        baseline = self.measure_latency(light_endpoint, total_requests=300, concurrency=25)
+        self.print_stats("Baseline", baseline)
+
+        stop = threading.Event()
+
+        def heavy_reports():
+            session = requests.Session()
+            while not stop.is_set():
+                self.timed_request(session, "GET", "api/analytics/user-activity")
+                self.timed_request(session, "POST", "api/compliance/reports/generate", {
+                    "report_type": "audit_trail",
+                    "start_date": "2020-01-01T00:00:00",
+                    "end_date": datetime.utcnow().isoformat()
+                })
+
+        heavy_threads = [threading.Thread(target=heavy_reports, daemon=True) for _ in range(4)]
+        for thread in heavy_threads:
+            thread.start()
+        try:
+            under_load = self.measure_latency(light_endpoint, total_requests=300, concurrency=25)
+        finally:
+            stop.set()
+            for thread in heavy_threads:
+                thread.join(timeout=60)
+        self.print_stats("With heavy reports", under_load)
+
+        ratio = under_load["p99_ms"] / baseline["p99_ms"] if baseline["p99_ms"] else 0
+        self.results["event_loop"] = {"baseline": baseline, "under_load": under_load, "p99_ratio": round(ratio, 2)}
+        return self.check(
+            "p99 latency stays within 3x of baseline while reports run",
+            ratio <= 3.0 and under_load["errors"] == 0,
+            f"(ratio {ratio:.2f}x)"
+        )
+
+    def test_dashboard_metrics_at_scale(self, samples=5):
+        """Dashboard metrics latency with one million gaming sessions, each sample computed from the rollups"""
+        print("\n🔍 Scenario: /api/dashboard/metrics at 1M gaming sessions")
+        database = self.mongo_database()
+        since = datetime.utcnow() - timedelta(days=366)  # Seeded sessions span the last year
+        stale_after = float(os.getenv("PERF_AGGREGATE_STALE_SECONDS", "30"))
+        try:
+            total = self.seed_gaming_sessions(database)
+            print(f"   gaming_sessions now holds {total} documents")
+            started = time.perf_counter()
+            self.rebuild_rollups(database, since)
+            print(f"   Revenue rollups rebuilt in {time.perf_counter() - started:.1f}s")
+
+            # Coalesced dashboards are served from cache for stale_after seconds; wait it out before every sample
+            session = requests.Session()
+            latencies, errors, cached = [], 0, 0
+            for sample in range(samples):
+                print(f"   Waiting {stale_after:.0f}s for the cached dashboard to expire ({sample + 1}/{samples})...")
+                time.sleep(stale_after + 1)
+                start = time.perf_counter()
+                response = session.get(f"{self.base_url}/api/dashboard/metrics", headers=self.headers(), timeout=120)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+                elif int(response.headers.get("X-DB-Commands", 0)) == 0:
+                    cached += 1
+            stats = {
+                "samples": samples,
+                "errors": errors,
+                "served_from_cache": cached,
+                "p50_ms": round(percentile(latencies, 50), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "max_ms": round(max(latencies), 1),
+            }
+            print(f"   Dashboard metrics (uncached): p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms "
+                  f"max={stats['max_ms']}ms errors={errors} served_from_cache={cached}")
+            self.results["dashboard_1m"] = stats
+        finally:
+            database.gaming_sessions.delete_many({"benchmark_seed": True})
+            self.rebuild_rollups(database, since)
+
+        return self.check(
+            "Dashboard metrics p95 under 2s at 1M sessions",
+            stats["p95_ms"] < 2000 and stats["errors"] == 0 and stats["served_from_cache"] == 0,
+            f"(p95 {stats['p95_ms']}ms)"
+        )
+
+    def test_constant_db_commands_per_request(self):
+        """Related-document lookups must not scale with page size (no N+1 queries)"""
+        print("\n🔍 Scenario: database commands per request are independent of page size")
+        endpoints = [
+            "api/gaming/sessions",
+            "api/travel/vip-experiences",
+            "api/marketing/inactive-customers?days=1",
+            "api/staff/training/records",
+        ]
+        session = requests.Session()
+        all_constant = True
+        self.results["db_commands"] = {}
+
+        for endpoint in endpoints:
+            counts = {}
+            for page_size in (5, 50):
+                separator = "&" if "?" in endpoint else "?"
+                response = session.get(f"{self.base_url}/{endpoint}{separator}limit={page_size}", headers=self.headers())
+                if response.status_code != 200 or "X-DB-Commands" not in response.headers:
+                    counts[page_size] = None
+                    continue
+                counts[page_size] = int(response.headers["X-DB-Commands"])
+            self.results["db_commands"][endpoint] = counts
+            constant = counts[5] is not None and counts[5] == counts[50]
+            all_constant = all_constant and constant
+            print(f"   {endpoint}: limit=5 -> {counts[5]} commands, limit=50 -> {counts[50]} commands")
+
+        return self.check("DB commands per request are constant across page sizes", all_constant)
+
+    def test_login_burst(self, logins=60, concurrency=20):
+        """Shift-change login burst: throughput, and dashboard latency while bcrypt runs.
+
+        Requires the server to run with a relaxed LOGIN_RATE_LIMIT (e.g. 1000/minute),
+        otherwise the burst is rejected with 429 after five attempts.
+        """
+        print("\n🔍 Scenario: login burst vs /api/dashboard/metrics latency")
+        credentials = {"username": "superadmin", "password": "admin123"}
+
+        baseline = self.measure_latency("api/dashboard/metrics", total_requests=100, concurrency=10)
+        self.print_stats("Dashboard baseline", baseline)
+
+        burst_result = {}
+
+        def login_burst():
+            burst_result["stats"] = self.measure_latency(
+                "api/auth/login", total_requests=logins, concurrency=concurrency, method="POST", data=credentials
+            )
+
+        burst_thread = threading.Thread(target=login_burst)
+        burst_thread.start()
+        during_burst = self.measure_latency("api/dashboard/metrics", total_requests=100, concurrency=10)
+        burst_thread.join()
+
+        burst = burst_result["stats"]
+        self.print_stats("Login burst", burst)
+        self.print_stats("Dashboard during burst", during_burst)
+
+        ratio = during_burst["p95_ms"] / baseline["p95_ms"] if baseline["p95_ms"] else 0
+        self.results["login_burst"] = {"baseline": baseline, "burst": burst, "during_burst": during_burst,
+                                       "p95_ratio": round(ratio, 2)}
+        if burst["errors"]:
+            print(f"   ⚠️  {burst['errors']} login errors - is LOGIN_RATE_LIMIT relaxed on the server?")
+        return self.check(
+            "Dashboard p95 stays within 3x of baseline during a login burst",
+            ratio <= 3.0 and during_burst["errors"] == 0 and burst["errors"] == 0,
+            f"(ratio {ratio:.2f}x, {burst['throughput_rps']} logins/s)"
+        )
+
+    def test_member_search_typeahead(self):
+        """Front-desk typeahead latency with 500k members"""
+        print("\n🔍 Scenario: member search typeahead at 500k members")
+        database = self.mongo_database()
+        keystrokes = ["f", "fe", "fer", "fern", "ferna", "fernando", "kasun fern", "ernand", "fernadno", "BM0123456"]
+        try:
+            total = self.seed_members(database)
+            print(f"   members now holds {total} documents")
+
+            worst_p95 = 0
+            self.results["search_500k"] = {}
+            for text in keystrokes:
+                endpoint = f"api/members?limit=10&search={requests.utils.quote(text)}"
+                self.measure_latency(endpoint, total_requests=2, concurrency=1)  # warm-up
+                stats = self.measure_latency(endpoint, total_requests=40, concurrency=4)
+                self.print_stats(f"search '{text}'", stats)
+                self.results["search_500k"][text] = stats
+                worst_p95 = max(worst_p95, stats["p95_ms"] if not stats["errors"] else float("inf"))
+        finally:
+            database.members.delete_many({"benchmark_seed": True})
+
+        return self.check(
+            "Typeahead p95 under 150ms for every keystroke at 500k members",
+            worst_p95 < 150,
+            f"(worst p95 {worst_p95}ms)"
+        )
+
+    def test_encryption_throughput(self, values=20_000):
+        """In-process micro-benchmark: per-value vs batch PII encryption/decryption"""
+        print("\n🔍 Scenario: PII encryption throughput (serial vs batch)")
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+        import encryption
+
+        plaintexts = [f"{'19' if i % 2 == 0 else '20'}{i:09d}V" for i in range(values)]
+
+        def throughput(function):
+            started = time.perf_counter()
+            result = function()
+            return result, round(values / (time.perf_counter() - started))
+
+        _, serial_encrypt = throughput(lambda: [encryption.encrypt_sensitive_data(v) for v in plaintexts])
+        tokens, batch_encrypt = throughput(lambda: encryption.encrypt_many(plaintexts))
+        _, serial_decrypt = throughput(lambda: [encryption.decrypt_sensitive_data(t) for t in tokens])
+        decrypted, batch_decrypt = throughput(lambda: encryption.decrypt_many(tokens))
+        encryption.shutdown_pool()
+
+        print(f"   encrypt: serial={serial_encrypt}/s batch={batch_encrypt}/s "
+              f"({encryption.ENCRYPTION_WORKERS} workers, {os.cpu_count()} CPUs)")
+        print(f"   decrypt: serial={serial_decrypt}/s batch={batch_decrypt}/s")
+        self.results["encryption"] = {
+            "serial_encrypt_per_s": serial_encrypt, "batch_encrypt_per_s": batch_encrypt,
+            "serial_decrypt_per_s": serial_decrypt, "batch_decrypt_per_s": batch_decrypt,
+        }
+
+        round_trip_ok = decrypted == plaintexts
+        if (os.cpu_count() or 1) < 2:
+            # No parallel speed-up is possible on one core; only check correctness
+            return self.check("Batch encryption round-trips every value", round_trip_ok)
+        return self.check(
+            "Batch decrypt round-trips and outperforms per-value calls",
+            round_trip_ok and batch_decrypt > serial_decrypt,
+            f"({batch_decrypt / serial_decrypt:.2f}x)"
+        )
+
+    def test_live_websocket_fanout(self, sockets=500, connect_concurrency=50, timeout=30):
+        """500 dashboards on /ws/live: every socket gets the snapshot and each delta, fanned out from one computation"""
+        print(f"\n🔍 Scenario: {sockets} concurrent /ws/live subscribers")
+        import asyncio
+        import json
+        import websockets
+
+        ws_url = self.base_url.replace("https://", "wss://").replace("http://", "ws://") + f"/ws/live?token={self.token}"
+        topics = ["dashboard_metrics", "active_sessions", "real_time_events"]
+
+        async def subscriber(index, gate, ready, marker, arrivals):
+            async with gate:
+                socket = await websockets.connect(ws_url, max_queue=None, open_timeout=timeout)
+            try:
+                await socket.send(json.dumps({"action": "subscribe", "topics": topics}))
+                snapshots = set()
+                while snapshots != set(topics):
+                    message = json.loads(await socket.recv())
+                    if message["type"] == "snapshot":
+                        snapshots.add(message["topic"])
+                ready.release()
+                event_id = await marker
+                while True:
+                    message = json.loads(await socket.recv())
+                    if message.get("topic") == "real_time_events" and event_id in message.get("changed", message.get("data", {})):
+                        arrivals[index] = time.perf_counter()
+                        return
+            finally:
+                await socket.close()
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            gate = asyncio.Semaphore(connect_concurrency)
+            ready = asyncio.Semaphore(0)
+            marker = loop.create_future()
+            arrivals = {}
+            started = time.perf_counter()
+            tasks = [asyncio.create_task(subscriber(i, gate, ready, marker, arrivals)) for i in range(sockets)]
+            for _ in range(sockets):
+                await asyncio.wait_for(ready.acquire(), timeout)
+            connected_in = time.perf_counter() - started
+
+            live = (await loop.run_in_executor(None, lambda: requests.get(
+                f"{self.base_url}/api/monitoring/metrics", headers=self.headers()
+            ))).json().get("live", {})
+
+            event = {"event_type": "system_alert", "source": "performance_test", "title": "fan-out probe",
+                     "description": "ws_500 delta latency probe", "severity": "info"}
+            response = await loop.run_in_executor(None, lambda: requests.post(
+                f"{self.base_url}/api/analytics/real-time-events", json=event, headers=self.headers()
+            ))
+            published = time.perf_counter()
+            marker.set_result(response.json()["id"])
+            done, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            latencies = [(arrival - published) * 1000 for arrival in arrivals.values()]
+            return connected_in, live, latencies
+
+        connected_in, live, latencies = asyncio.run(scenario())
+        stats = {
+            "sockets": sockets,
+            "connect_s": round(connected_in, 2),
+            "delivered": len(latencies),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "max_ms": round(max(latencies), 2) if latencies else 0.0,
+            "server_clients": live.get("clients"),
+            "server_overflows": live.get("overflows"),
+        }
+        print(f"   {sockets} sockets subscribed in {stats['connect_s']}s; server sees {stats['server_clients']} clients")
+        print(f"   delta delivered to {stats['delivered']}/{sockets}: p50={stats['p50_ms']}ms "
+              f"p95={stats['p95_ms']}ms max={stats['max_ms']}ms (includes up to one tick of wait)")
+        self.results["ws_500"] = stats
+        return self.check(
+            f"Every one of {sockets} live subscribers receives the delta",
+            stats["delivered"] == sockets,
+            f"(p95 {stats['p95_ms']}ms)"
+        )
+
+    def test_dashboard_thundering_herd(self, herd=40):
+        """Shift-briefing herd: concurrent identical dashboard loads share one computation"""
+        print(f"\n🔍 Scenario: {herd} concurrent loads of each aggregate dashboard")
+        endpoints = ["api/dashboard/metrics", "api/marketing/dashboard", "api/staff/dashboard", "api/travel/vip-dashboard"]
+        stale_after = float(os.getenv("PERF_AGGREGATE_STALE_SECONDS", "30"))
+        print(f"   Waiting {stale_after:.0f}s for cached dashboards to expire...")
+        time.sleep(stale_after + 1)
+
+        def server_commands():
+            response = requests.get(f"{self.base_url}/api/monitoring/metrics", headers=self.headers())
+            return response.json()["database_commands"]["total"]
+
+        all_coalesced = True
+        self.results["dashboard_herd"] = {}
+        for endpoint in endpoints:
+            barrier = threading.Barrier(herd)
+            local = threading.local()
+
+            def stampede(_):
+                if not hasattr(local, "session"):
+                    local.session = requests.Session()
+                barrier.wait()
+                start = time.perf_counter()
+                response = local.session.get(f"{self.base_url}/{endpoint}", headers=self.headers(), timeout=120)
+                latency = (time.perf_counter() - start) * 1000
+                return latency, response.status_code, int(response.headers.get("X-DB-Commands", 0))
+
+            before = server_commands()
+            with ThreadPoolExecutor(max_workers=herd) as pool:
+                samples = list(pool.map(stampede, range(herd)))
+            herd_commands = server_commands() - before - 1  # Minus the metrics call itself
+
+            latencies = [latency for latency, _, _ in samples]
+            errors = len([1 for _, status_code, _ in samples if status_code != 200])
+            computations = len([1 for _, _, commands in samples if commands > 0])
+            per_computation = max([commands for _, _, commands in samples] or [0])
+            stats = {
+                "errors": errors,
+                "computations": computations,
+                "db_commands": herd_commands,
+                "uncoalesced_estimate": per_computation * herd,
+                "p50_ms": round(percentile(latencies, 50), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+            }
+            self.results["dashboard_herd"][endpoint] = stats
+            print(f"   {endpoint}: {computations} computation(s), {herd_commands} DB commands "
+                  f"(vs ~{stats['uncoalesced_estimate']} uncoalesced), p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms")
+            all_coalesced = all_coalesced and errors == 0 and computations <= 1
+
+        return self.check(f"{herd} concurrent dashboard loads run each aggregation once", all_coalesced)
+
+    def test_json_encoding(self, rounds=200):
+        """In-process micro-benchmark: jsonable_encoder + json.dumps vs the orjson response path, per endpoint"""
+        print("\n🔍 Scenario: response encoding time per endpoint (before vs after)")
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+        from fastapi.encoders import jsonable_encoder
+        from starlette.responses import JSONResponse
+        from responses import dumps
+        from server import DashboardMetrics
+
+        now = datetime.utcnow()
+        audit_page = {"audit_logs": [{
+            "id": str(uuid.uuid4()), "timestamp": now - timedelta(minutes=i), "admin_user_id": str(uuid.uuid4()),
+            "admin_username": "superadmin", "action": "update", "resource": "member", "resource_id": str(uuid.uuid4()),
+            "details": {"fields": ["tier", "points_balance"], "previous_tier": "Ruby", "new_tier": "Sapphire"},
+            "ip_address": "10.0.0.1", "user_agent": "Mozilla/5.0", "risk_score": 12.5, "created_at": now,
+        } for i in range(100)], "total": 100000, "page": 1, "pages": 1000, "next_cursor": "abc", "prev_cursor": None}
+        members_page = {"members": [{
+            "id": str(uuid.uuid4()), "member_number": f"BM{i:07d}", "first_name": "Kasun", "last_name": "Fernando",
+            "email": f"member{i}@example.lk", "tier": "Ruby", "points_balance": 1250.0, "total_spend": 48000.0,
+            "registration_date": now - timedelta(days=i), "last_visit": now - timedelta(hours=i),
+            "date_of_birth": now - timedelta(days=12000 + i), "is_active": True, "preferred_games": ["Blackjack", "Roulette"],
+        } for i in range(50)], "total": 500000, "page": 1, "pages": 10000, "next_cursor": None, "prev_cursor": None}
+        dashboard = DashboardMetrics(
+            total_members=250, members_by_tier={"Ruby": 125, "Sapphire": 75, "Diamond": 37, "VIP": 13},
+            active_sessions=42, daily_revenue=45750.0, weekly_revenue=312000.0, monthly_revenue=1250000.0,
+            top_games=[{"game_type": game, "sessions": 120, "revenue": 8800.0} for game in ["Blackjack", "Roulette", "Poker", "Baccarat", "Slots"]],
+            recent_registrations=12
+        )
+
+        payloads = {
+            "GET /api/audit/enhanced (100 rows)": (audit_page, lambda: JSONResponse(jsonable_encoder(audit_page)).body),
+            "GET /api/members (50 rows)": (members_page, lambda: JSONResponse(jsonable_encoder(members_page)).body),
+            # response_model path: re-validate the returned model, then encode
+            "GET /api/dashboard/metrics": (dashboard, lambda: JSONResponse(jsonable_encoder(
+                DashboardMetrics.model_validate(dashboard.dict()))).body),
+        }
+
+        def per_call_us(function):
+            started = time.perf_counter()
+            for _ in range(rounds):
+                function()
+            return (time.perf_counter() - started) / rounds * 1_000_000
+
+        all_faster = True
+        self.results["json_encoding"] = {}
+        for endpoint, (payload, before) in payloads.items():
+            before_us = per_call_us(before)
+            after_us = per_call_us(lambda: dumps(payload))
+            speedup = before_us / after_us if after_us else 0
+            self.results["json_encoding"][endpoint] = {
+                "before_us": round(before_us, 1), "after_us": round(after_us, 1), "speedup": round(speedup, 1)
+            }
+            print(f"   {endpoint}: {before_us:.1f}µs -> {after_us:.1f}µs ({speedup:.1f}x)")
+            all_faster = all_faster and after_us < before_us
+
+        return self.check("orjson path encodes every endpoint faster than jsonable_encoder", all_faster)
+
+    def test_activity_ingestion(self, requests_total=400, events_per_request=500, concurrency=16,
+                                target_events_per_second=20_000, landing_timeout=60):
+        """Batched activity ingestion: accepted events/s on one worker, and how fast they reach MongoDB"""
+        print("\n🔍 Scenario: user activity ingestion throughput (JSON array + NDJSON batches)")
+        database = self.mongo_database()
+        run_id = f"perf-{uuid.uuid4()}"
+
+        def batch(request_index):
+            return [{
+                "user_type": "member", "user_id": f"member-{(request_index * events_per_request + i) % 5000}",
+                "session_id": f"{run_id}-{request_index}", "activity_type": "page_view", "device_type": "mobile",
+                "page_url": f"/m/{['dashboard', 'gaming', 'rewards', 'members'][i % 4]}",
+                "metadata": {"benchmark_run": run_id}
+            } for i in range(events_per_request)]
+
+        # Build the bodies up front so the client side does not limit throughput
+        bodies = []
+        for request_index in range(requests_total):
+            events = batch(request_index)
+            if request_index % 2:
+                bodies.append(("application/x-ndjson", "\n".join(json.dumps(event) for event in events)))
+            else:
+                bodies.append(("application/json", json.dumps(events)))
+
+        local = threading.local()
+
+        def send(body):
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            content_type, payload = body
+            start = time.perf_counter()
+            try:
+                response = local.session.post(f"{self.base_url}/api/analytics/activity", data=payload, timeout=120,
+                                              headers={**self.headers(), "Content-Type": content_type})
+                accepted = response.json().get("accepted", 0) if response.status_code == 202 else 0
+                status_code = response.status_code
+            except Exception:
+                accepted, status_code = 0, 0
+            return (time.perf_counter() - start) * 1000, status_code, accepted
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(send, bodies))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, _, _ in samples]
+        errors = len([1 for _, status_code, _ in samples if status_code != 202])
+        accepted = sum(count for _, _, count in samples)
+        accepted_per_second = accepted / elapsed if elapsed else 0
+
+        landed = 0
+        deadline = time.monotonic() + landing_timeout
+        while time.monotonic() < deadline:
+            landed = database.user_activity_tracking.count_documents({"metadata.benchmark_run": run_id})
+            if landed >= accepted:
+                break
+            time.sleep(0.5)
+        landed_per_second = landed / (time.perf_counter() - started)
+        database.user_activity_tracking.delete_many({"metadata.benchmark_run": run_id})
+
+        self.results["activity_ingest"] = {
+            "events": requests_total * events_per_request, "accepted": accepted, "landed": landed, "errors": errors,
+            "accepted_per_second": round(accepted_per_second), "landed_per_second": round(landed_per_second),
+            "p50_ms": round(percentile(latencies, 50), 1), "p95_ms": round(percentile(latencies, 95), 1),
+        }
+        print(f"   {accepted} events accepted in {elapsed:.1f}s ({accepted_per_second:,.0f}/s), "
+              f"{landed} in MongoDB ({landed_per_second:,.0f}/s end to end), request p95={percentile(latencies, 95):.1f}ms")
+        return self.check(
+            f"Activity ingestion sustains {target_events_per_second:,} events/s with every accepted event stored",
+            errors == 0 and accepted_per_second >= target_events_per_second and landed >= accepted,
+            f"({accepted_per_second:,.0f}/s accepted, {landed}/{accepted} stored)"
+        )
+
+    def test_report_jobs(self, herd=20, completion_timeout=120):
+        """Background report jobs: identical submissions share one job, submit returns at once, cancel works"""
+        print(f"\n🔍 Scenario: {herd} concurrent submissions of the same audit trail report job")
+        # A period no earlier run has used, so there is no recent result to reuse
+        body = {"type": "compliance_report", "params": {
+            "report_type": "audit_trail", "start_date": "2020-01-01T00:00:00", "end_date": datetime.utcnow().isoformat()
+        }}
+        barrier = threading.Barrier(herd)
+        local = threading.local()
+
+        def submit(_):
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            barrier.wait()
+            start = time.perf_counter()
+            response = local.session.post(f"{self.base_url}/api/jobs/reports", json=body, headers=self.headers(),
+                                          timeout=120)
+            latency = (time.perf_counter() - start) * 1000
+            job_id = response.json()["job"]["id"] if response.status_code == 202 else None
+            return latency, response.status_code, job_id
+
+        with ThreadPoolExecutor(max_workers=herd) as pool:
+            samples = list(pool.map(submit, range(herd)))
+        latencies = [latency for latency, _, _ in samples]
+        errors = len([1 for _, status_code, _ in samples if status_code != 202])
+        job_ids = {job_id for _, _, job_id in samples if job_id}
+
+        job, started = {}, time.perf_counter()
+        while job_ids and time.perf_counter() - started < completion_timeout:
+            job = requests.get(f"{self.base_url}/api/jobs/{next(iter(job_ids))}", headers=self.headers()).json()
+            if job.get("status") not in ("queued", "running"):
+                break
+            time.sleep(0.25)
+        completion_s = time.perf_counter() - started
+        result = requests.get(f"{self.base_url}/api/jobs/{job.get('id')}/result", headers=self.headers())
+
+        # A job cancelled straight after submission must stop; a quick one may already have completed
+        cancel_body = {"type": "analytics_report", "params": {"analysis_type": "churn_prediction",
+                                                              "time_period": f"perf-{uuid.uuid4()}"}}
+        cancel_job = requests.post(f"{self.base_url}/api/jobs/reports", json=cancel_body, headers=self.headers()).json()["job"]
+        requests.post(f"{self.base_url}/api/jobs/{cancel_job['id']}/cancel", headers=self.headers())
+        cancelled = {}
+        for _ in range(40):
+            cancelled = requests.get(f"{self.base_url}/api/jobs/{cancel_job['id']}", headers=self.headers()).json()
+            if cancelled.get("status") not in ("queued", "running"):
+                break
+            time.sleep(0.25)
+
+        self.results["report_jobs"] = {
+            "submissions": herd, "errors": errors, "distinct_jobs": len(job_ids), "final_status": job.get("status"),
+            "completion_s": round(completion_s, 2), "cancelled_status": cancelled.get("status"),
+            "submit_p50_ms": round(percentile(latencies, 50), 1), "submit_p95_ms": round(percentile(latencies, 95), 1),
+        }
+        print(f"   {herd} submissions -> {len(job_ids)} job(s), submit p95={percentile(latencies, 95):.1f}ms, "
+              f"{job.get('status')} after {completion_s:.1f}s; cancelled job ended {cancelled.get('status')}")
+        return self.check(
+            "Identical report submissions share one job that completes, and a cancelled job stops",
+            errors == 0 and len(job_ids) == 1 and job.get("status") == "completed" and result.status_code == 200
+            and cancelled.get("status") in ("cancelled", "completed"),
+            f"(submit p95 {percentile(latencies, 95):.1f}ms)"
+        )
+
+    def run(self, scenario=None):
+        scenarios = {
+            "event_loop": self.test_event_loop_responsiveness,
+            "dashboard_1m": self.test_dashboard_metrics_at_scale,
+            "db_commands": self.test_constant_db_commands_per_request,
+            "login_burst": self.test_login_burst,
+            "search_500k": self.test_member_search_typeahead,
+            "encryption": self.test_encryption_throughput,
+            "ws_500": self.test_live_websocket_fanout,
+            "dashboard_herd": self.test_dashboard_thundering_herd,
+            "json_encoding": self.test_json_encoding,
+            "activity_ingest": self.test_activity_ingestion,
+            "report_jobs": self.test_report_jobs,
+        }
+
+        print("🚀 Starting Bally's Casino Performance Tests")
+        print(f"📍 Base URL: {self.base_url}")
+        print("=" * 80)
+
+        if not self.setup():
+            return 1
+
+        selected = [scenario] if scenario else list(scenarios.keys())
+        for name in selected:
+            if name not in scenarios:
+                print(f"❌ Unknown scenario: {name}")
+                return 1
+            scenarios[name]()
+
+        print("\n" + "=" * 80)
+        print(f"📊 Performance Results: {self.tests_passed}/{self.tests_run} checks passed")
+        print(f"Completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print("=" * 80)
+        return 0 if self.tests_passed == self.tests_run else 1
+
+
+if __name__ == "__main__":
+    tester = BallyCasinoPerformanceTester()
+    sys.exit(tester.run(sys.argv[1] if len(sys.argv) > 1 else None))